@@ -0,0 +1,112 @@
+"""Benchmark: ORM ingest vs the single-round-trip fast path (migration 013).
+
+Run against a SCRATCH database with all migrations applied and an active
+client row:
+
+    ENV=bench DATABASE_URL=postgresql+asyncpg://... \\
+        python benchmarks/bench_ingest_paths.py --client-id <uuid> [-n 200]
+
+Each path first commits one warm-up ingest (so the customer and an open
+conversation exist and both paths measure the hot case), then runs ``-n``
+ingests that are each ROLLED BACK — the database is left as it was apart
+from the two warm-up messages. Reports latency percentiles and SQL
+statements per ingest (one statement = one round trip). ENV=anything but
+"dev" keeps the engine from echoing every statement.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../sales_agent_api"))
+
+from sqlalchemy import event
+
+from app.core.database import AsyncSessionLocal, dispose_engine, init_engine
+from app.services import ingest_fastpath
+from app.services.ingest import ingest_message
+from app.services.tenant_config import tenant_configs
+
+_statements = 0
+
+
+def _count_statement(*_args, **_kwargs) -> None:
+    global _statements
+    _statements += 1
+
+
+async def _ingest_once(client_id: uuid.UUID, phone: str, commit: bool) -> None:
+    async with AsyncSessionLocal() as session:
+        await ingest_message(
+            session,
+            client_id,
+            chakra_message_id=f"bench.{uuid.uuid4()}",
+            content="hola, ¿tienen café de origen?",
+            phone_number=phone,
+            display_name="Bench",
+        )
+        if commit:
+            await session.commit()
+        else:
+            await session.rollback()
+
+
+async def _run_path(client_id: uuid.UUID, n: int, fast: bool) -> dict:
+    global _statements
+    ingest_fastpath.INGEST_FAST_PATH = fast
+    phone = "57300" + ("1" if fast else "2") + f"{uuid.uuid4().int % 10**6:06d}"
+
+    await _ingest_once(client_id, phone, commit=True)  # warm-up: customer + conversation
+    tenant_configs.clear()
+    await _ingest_once(client_id, phone, commit=False)  # warm the tenant cache + pool
+
+    latencies = []
+    _statements = 0
+    for _ in range(n):
+        started = time.perf_counter()
+        await _ingest_once(client_id, phone, commit=False)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "mean_ms": statistics.fmean(latencies),
+        # ROLLBACK is not a cursor execute, so this is the pre-commit work.
+        "statements": _statements / n,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--client-id", type=uuid.UUID, required=True)
+    parser.add_argument("-n", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = await init_engine()
+    event.listen(engine.sync_engine, "before_cursor_execute", _count_statement)
+    try:
+        results = {
+            "orm": await _run_path(args.client_id, args.n, fast=False),
+            "fast": await _run_path(args.client_id, args.n, fast=True),
+        }
+    finally:
+        await dispose_engine()
+
+    print(f"{'path':<6} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'stmts':>6}")
+    for path, r in results.items():
+        print(
+            f"{path:<6} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+            f"{r['mean_ms']:>8.2f} {r['statements']:>6.1f}"
+        )
+    speedup = results["orm"]["p50_ms"] / results["fast"]["p50_ms"]
+    print(f"fast path p50 speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
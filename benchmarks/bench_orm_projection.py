@@ -0,0 +1,183 @@
+"""Microbenchmark: full ORM entity loads vs column-projected selects.
+
+Measures the hot-path reads that moved to projections — the last-20
+messages of a turn, the full transcript the summarizer reads, and the
+profile read of _merge_profile / _persist_to_profile — both ways, on the
+same rows. It runs on in-memory SQLite on purpose: the database side of the
+two queries is the same, so what's left is exactly the ORM cost (identity
+map, instrumentation, per-entity state) this change removes.
+
+    python benchmarks/bench_orm_projection.py [--messages 200] [--repeat 300]
+
+Reports mean µs per read and tracemalloc peak KiB allocated per read.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../sales_agent_api"))
+
+from sqlalchemy import MetaData, create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.core import ClientUser, Message
+
+CLIENT_ID = uuid.uuid4()
+CONV_ID = uuid.uuid4()
+USER_ID = uuid.uuid4()
+
+
+def _seed(engine, n_messages: int) -> None:
+    # Postgres server defaults (uuid_generate_v4(), '{}'::jsonb) don't parse
+    # on SQLite; every row below supplies its values explicitly anyway.
+    metadata = MetaData()
+    tables = [t.to_metadata(metadata) for t in (Message.__table__, ClientUser.__table__)]
+    for table in tables:
+        for column in table.columns:
+            column.server_default = None
+        table.foreign_keys.clear()
+        table.constraints = {c for c in table.constraints if not c.__class__.__name__.startswith("Foreign")}
+    metadata.create_all(engine)
+
+    t0 = datetime(2026, 8, 1, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(tables[0]),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "conversation_id": CONV_ID,
+                    "client_id": CLIENT_ID,
+                    "direction": "inbound" if i % 2 == 0 else "outbound",
+                    "message_type": "text",
+                    "content": f"mensaje {i} — quiero 2 bolsas de café en grano, envío a Cali",
+                    "chakra_message_id": f"wamid.{i}",
+                    "ai_model_used": None if i % 2 == 0 else "gpt-4o-mini",
+                    "ai_prompt_tokens": None if i % 2 == 0 else 1800,
+                    "ai_completion_tokens": None if i % 2 == 0 else 120,
+                    "ai_latency_ms": None if i % 2 == 0 else 900,
+                    "created_at": t0 + timedelta(seconds=i),
+                }
+                for i in range(n_messages)
+            ],
+        )
+        conn.execute(
+            insert(tables[1]),
+            {
+                "id": USER_ID,
+                "client_id": CLIENT_ID,
+                "phone_number": "573001234567",
+                "display_name": "Ana",
+                "profile": {"full_name": "Ana Gómez", "city": "Cali", "purchase_count": 2},
+                "first_contact_at": t0,
+                "last_contact_at": t0,
+                "is_blocked": False,
+                "lifecycle_stage": "customer",
+                "created_at": t0,
+                "updated_at": t0,
+            },
+        )
+
+
+# Each read: (entity version, projected version). Both build what the
+# service actually uses from the result.
+def _recent_entity(session):
+    rows = session.execute(
+        select(Message).where(Message.conversation_id == CONV_ID)
+        .order_by(Message.created_at.desc()).limit(20)
+    ).scalars().all()
+    return [(str(m.id), m.direction, m.content, m.message_type, m.created_at.isoformat()) for m in rows]
+
+
+def _recent_projected(session):
+    rows = session.execute(
+        select(Message.id, Message.direction, Message.content, Message.message_type, Message.created_at)
+        .where(Message.conversation_id == CONV_ID)
+        .order_by(Message.created_at.desc()).limit(20)
+    ).all()
+    return [(str(m.id), m.direction, m.content, m.message_type, m.created_at.isoformat()) for m in rows]
+
+
+def _transcript_entity(session):
+    rows = session.execute(
+        select(Message).where(Message.conversation_id == CONV_ID).order_by(Message.created_at)
+    ).scalars().all()
+    return [(m.direction, m.content) for m in rows]
+
+
+def _transcript_projected(session):
+    rows = session.execute(
+        select(Message.direction, Message.content)
+        .where(Message.conversation_id == CONV_ID).order_by(Message.created_at)
+    ).all()
+    return [(m.direction, m.content) for m in rows]
+
+
+def _profile_entity(session):
+    return dict(session.execute(select(ClientUser).where(ClientUser.id == USER_ID)).scalar_one().profile)
+
+
+def _profile_projected(session):
+    return dict(session.execute(select(ClientUser.profile).where(ClientUser.id == USER_ID)).one().profile)
+
+
+READS = {
+    "recent_messages (20)": (_recent_entity, _recent_projected),
+    "transcript (all)": (_transcript_entity, _transcript_projected),
+    "profile": (_profile_entity, _profile_projected),
+}
+
+
+def _measure(engine, read, repeat: int) -> tuple[float, float]:
+    """Mean µs and peak bytes allocated per read. A fresh Session per read, like a request."""
+    def once():
+        with Session(engine) as session:
+            read(session)
+
+    for _ in range(20):  # warm statement caches
+        once()
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        once()
+    mean_us = (time.perf_counter() - started) / repeat * 1e6
+
+    samples = min(repeat, 50)
+    peak_bytes = 0
+    tracemalloc.start()
+    for _ in range(samples):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        once()
+        peak_bytes += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return mean_us, peak_bytes / samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    _seed(engine, args.messages)
+
+    print(f"{'read':<22} {'entity µs':>10} {'proj µs':>9} {'speedup':>8} {'entity KiB':>11} {'proj KiB':>9}")
+    for name, (entity, projected) in READS.items():
+        e_us, e_bytes = _measure(engine, entity, args.repeat)
+        p_us, p_bytes = _measure(engine, projected, args.repeat)
+        print(
+            f"{name:<22} {e_us:>10.1f} {p_us:>9.1f} {e_us / p_us:>7.2f}x "
+            f"{e_bytes / 1024:>11.1f} {p_bytes / 1024:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Microbenchmarks for the pure services, with a stored baseline.
+
+Every case runs on realistic-to-large inputs — a 200-product catalog with
+descriptions and images, a returning customer's full profile, a complete
+order context, a 2 000-character message — so a change to prompt
+formatting or to the DAG shows what it costs per turn.
+
+    python benchmarks/bench_pure.py                 # compare with the baseline
+    python benchmarks/bench_pure.py --save          # (re)write the baseline
+    python benchmarks/bench_pure.py --threshold 0.5 --only prompt_context
+
+Timing is timeit-style: loops auto-calibrated to ~0.1 s, best of
+``--repeat``, reported in µs per call. Each run also times a fixed
+reference workload; before comparing, results are scaled by
+baseline-reference / current-reference, so a CPU that is busier or slower
+today doesn't read as a regression. The comparison exits 1 when any case
+is slower than its baseline by more than ``--threshold`` (default 25 %).
+The file records where the baseline was taken and the run warns when that
+isn't here; re-save after moving machines.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import uuid
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../sales_agent_api"))
+
+from app.services.agent_action import compute_context_updates, detect_outbound_loop
+from app.services.goal_strategy import GoalStrategyEngine, _compile
+from app.services.language import detect_language
+from app.services.prompt_context import (
+    format_business_context,
+    format_conversation_summary,
+    format_customer_profile,
+)
+from app.services.state_machine import STATES, is_valid_state, validate_transition
+from app.services.validation import is_plausible_phone
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "bench_pure.json")
+
+
+# ---------------------------------------------------------------------------
+# Inputs
+# ---------------------------------------------------------------------------
+def _catalog(n: int) -> list[dict]:
+    return [
+        {
+            "id": str(uuid.UUID(int=i + 1)),
+            "name": f"Café de origen #{i} — Huila, lavado",
+            "sku": f"CAFE-{i:04d}",
+            "price": 38000 + 500 * i,
+            "description": "Notas a panela, cítricos y cacao. Tueste medio. " * 3,
+            "ai_description": "Café de especialidad de finca familiar, 1 800 msnm. " * 2,
+            "image_url": f"https://cdn.example.com/products/{i}.jpg",
+        }
+        for i in range(n)
+    ]
+
+
+BUSINESS_RULES = {
+    "currency": "COP",
+    "shipping_rules": {
+        **{
+            f"Ciudad {i}": {"method": "mensajería", "cost": 9000 + 250 * i, "cost_note": ""}
+            for i in range(30)
+        },
+        "other": {"method": "transportadora", "cost_note": "según destino"},
+        "zones": {
+            f"Zona {z}": {"method": "transportadora", "cost_range": "12.000–25.000 COP"}
+            for z in "ABCDEF"
+        },
+        "international": "No hacemos envíos internacionales por ahora.",
+    },
+    "payment_methods": [
+        {"type": "bank_transfer", "bank": "Bancolombia", "account_type": "ahorros", "account": "123-456789-01"},
+        {"type": "nequi", "number": "3001234567"},
+        {"type": "daviplata", "number": "3007654321"},
+    ],
+    "discount_rules": {
+        "no_discount_message": "El precio es el mismo para 1 o 2 bolsas.",
+        "bulk_threshold": 10,
+        "bulk_message": "Para 10+ bolsas hay precio mayorista: escríbele al asesor.",
+    },
+}
+
+FULL_PROFILE = {
+    "full_name": "Ana María Gómez Restrepo",
+    "email": "ana@example.com",
+    "city": "Cali",
+    "shipping_address": "Calle 5 # 38-25, apto 402, San Fernando",
+    "preferences": {"grind": "grano", "roast": "medio"},
+    "purchase_count": 7,
+    "purchase_history": [
+        {"product_id": str(uuid.UUID(int=i + 1)), "quantity": 2, "total": 76000} for i in range(20)
+    ],
+    "last_conversation_summary": {
+        "summary": "Preguntó por el Huila lavado y el envío a Cali; quedó de confirmar el viernes. " * 2,
+        "outcome": "pending",
+        "interest_level": "high",
+        "objections": ["precio del envío", "tiempo de entrega", "molido fino"],
+        "pending_intent": {"product_id": str(uuid.UUID(int=3)), "quantity": 2, "notes": "en grano"},
+    },
+    "language": "es",
+    "communication_style": "casual",
+}
+
+FULL_CONTEXT = {
+    "product_id": str(uuid.UUID(int=3)),
+    "quantity": 2,
+    "grind_preference": "grano",
+    "roast_preference": "medio",
+    "full_name": "Ana María Gómez Restrepo",
+    "phone": "3001234567",
+    "shipping_city": "Cali",
+    "shipping_address": "Calle 5 # 38-25, apto 402",
+}
+
+EXTRACTED_TURN = {
+    **FULL_CONTEXT,
+    "user_confirmation": True,
+    "payment_confirmation": True,  # dropped: operator-only
+    "send_image_url": "https://cdn.example.com/products/3.jpg",
+    "mood": "happy",  # unknown field: ignored
+}
+
+LONG_MESSAGE = (
+    "Hola buenas tardes, quería preguntar si todavía tienen el café de Huila que "
+    "compré el mes pasado, me gustó mucho y quiero pedir dos bolsas en grano para "
+    "enviar a Cali, ¿cuánto sale el envío y en cuántos días llega? "
+) * 9
+LONG_MESSAGE_EN = "Hi! I'd like two bags of the washed Huila beans shipped to Cali, how long does it take? " * 20
+
+PHONES = ["3001234567", "+57 300 123 4567", "573001234567", "12345", "abc", "(300) 123-4567", "", None]
+OUTBOUNDS = ["Lo siento, pero aquí solo hablamos de café. ¿Te interesa algo del menú?" * 4] * 2
+
+DECLARED_RULES = {
+    "goals": {
+        "book_appointment": {
+            "checkpoints": [
+                {"name": "service_chosen", "required_fields": ["service_id"]},
+                {"name": "client_known", "required_fields": ["full_name", "phone"]},
+                {"name": "slot_booked", "required_fields": ["date", "time"],
+                 "blocked_by": ["service_chosen", "client_known"]},
+                {"name": "deposit_paid", "required_fields": ["deposit_receipt"], "blocked_by": ["slot_booked"]},
+            ]
+        }
+    }
+}
+
+_engine = GoalStrategyEngine()
+_catalog_200 = _catalog(200)
+_catalog_20 = _catalog(20)
+_half_context = {k: FULL_CONTEXT[k] for k in ("product_id", "quantity", "full_name")}
+# A backfill's worth of conversations at every stage of the DAG.
+_backfill = [dict(list(FULL_CONTEXT.items())[: i % (len(FULL_CONTEXT) + 1)]) for i in range(10_000)]
+
+
+def _state_machine_round() -> None:
+    for current, targets in STATES.items():
+        is_valid_state(current)
+        for target in targets:
+            validate_transition(current, target)
+
+
+CASES: dict[str, Callable[[], object]] = {
+    "goal_strategy.compute[empty]": lambda: _engine.compute("close_sale", {}, BUSINESS_RULES),
+    "goal_strategy.compute[half]": lambda: _engine.compute("close_sale", _half_context, BUSINESS_RULES),
+    "goal_strategy.compute[full]": lambda: _engine.compute("close_sale", FULL_CONTEXT, BUSINESS_RULES),
+    "goal_strategy.compute[declared, half]": lambda: _engine.compute(
+        "book_appointment", {"service_id": "corte", "full_name": "Ana"}, DECLARED_RULES
+    ),
+    "goal_strategy.compute_loop[10k]": lambda: [
+        _engine.compute("close_sale", data, BUSINESS_RULES) for data in _backfill
+    ],
+    "goal_strategy.compute_batch[10k]": lambda: _engine.compute_batch("close_sale", _backfill, BUSINESS_RULES),
+    # Plan compilation on a cache miss — what compute() paid every turn before plans were memoized.
+    "goal_strategy.compile[close_sale, cold]": lambda: _compile.__wrapped__("close_sale", ()),
+    "goal_strategy.to_prompt[half]": lambda: _engine.compute("close_sale", _half_context, BUSINESS_RULES).to_prompt(),
+    "prompt_context.business_context[20]": lambda: format_business_context(BUSINESS_RULES, _catalog_20),
+    "prompt_context.business_context[200]": lambda: format_business_context(BUSINESS_RULES, _catalog_200),
+    "prompt_context.customer_profile[full]": lambda: format_customer_profile("Ana", FULL_PROFILE, "es"),
+    "prompt_context.conversation_summary[full]": lambda: format_conversation_summary(
+        {"display_name": "Ana", "profile": FULL_PROFILE}, FULL_CONTEXT, "es"
+    ),
+    "language.detect[2k es]": lambda: detect_language(LONG_MESSAGE),
+    "language.detect[2k en]": lambda: detect_language(LONG_MESSAGE_EN),
+    "language.detect[short]": lambda: detect_language("hola, ¿tienen café?"),
+    "validation.is_plausible_phone[x8]": lambda: [is_plausible_phone(p) for p in PHONES],
+    "state_machine.all_transitions": _state_machine_round,
+    "agent_action.compute_context_updates[full]": lambda: compute_context_updates(EXTRACTED_TURN, {}),
+    "agent_action.detect_outbound_loop[long]": lambda: detect_outbound_loop(OUTBOUNDS[0], OUTBOUNDS),
+}
+
+
+# ---------------------------------------------------------------------------
+# Measure / compare
+# ---------------------------------------------------------------------------
+def measure(fn: Callable[[], object], repeat: int, target_s: float = 0.1) -> float:
+    """Best-of-``repeat`` µs per call, loops calibrated to ~``target_s``."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= target_s / 10:
+            break
+        loops *= 10
+    loops = max(1, int(loops * target_s / max(elapsed, 1e-9)))
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best * 1e6
+
+
+def _reference_workload() -> None:
+    # Plain interpreter work — dict, str, list — like the cases themselves.
+    parts = []
+    for i in range(200):
+        row = {"id": i, "name": f"item {i}"}
+        parts.append(f"- {row['name']} ({row['id']})".upper())
+    "\n".join(parts)
+
+
+def compare(baseline: dict[str, float], current: dict[str, float], threshold: float) -> list[str]:
+    """Names of the cases slower than baseline × (1 + threshold)."""
+    return [
+        name
+        for name, us in current.items()
+        if name in baseline and us > baseline[name] * (1 + threshold)
+    ]
+
+
+def _machine() -> dict:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--only", default="", help="run only cases whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    cases = {name: fn for name, fn in CASES.items() if args.only in name}
+    reference_us = measure(_reference_workload, args.repeat)
+    current = {name: measure(fn, args.repeat) for name, fn in cases.items()}
+
+    baseline: dict[str, float] = {}
+    scale = 1.0
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            stored = json.load(f)
+        baseline = stored.get("cases", {})
+        if stored.get("reference_us"):
+            scale = stored["reference_us"] / reference_us
+        if stored.get("machine") != _machine():
+            print(f"warning: baseline taken on {stored.get('machine')}, this is {_machine()}")
+    print(f"reference workload {reference_us:.2f} µs (scale to baseline ×{scale:.2f})")
+
+    scaled = {name: us * scale for name, us in current.items()}
+    regressions = compare(baseline, scaled, args.threshold)
+    print(f"{'case':<46} {'µs/call':>10} {'baseline':>10} {'change':>8}")
+    for name, us in current.items():
+        base = baseline.get(name)
+        change = f"{(scaled[name] / base - 1) * 100:+7.1f}%" if base else "     new"
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<46} {us:>10.2f} {base or float('nan'):>10.2f} {change}{flag}")
+
+    if args.save:
+        # Cases outside --only keep their stored numbers, rescaled to now.
+        merged = {**{n: us / scale for n, us in baseline.items()}, **current}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(
+                {"machine": _machine(), "reference_us": reference_us, "cases": merged},
+                f, indent=2, sort_keys=True,
+            )
+            f.write("\n")
+        print(f"baseline written: {os.path.relpath(args.baseline)}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
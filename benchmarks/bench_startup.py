@@ -0,0 +1,112 @@
+"""Benchmark: cold-start cost of the API — import, then secrets + engine.
+
+No database or vault needed: Key Vault is a fake reader with ``--kv-ms`` of
+latency per secret, and the engine is created but never connects.
+
+    python benchmarks/bench_startup.py [--kv-ms 150] [--runs 5]
+
+Reports, p50 over ``--runs``:
+  - import:     ``import app.main`` in a fresh interpreter, with
+                KEY_VAULT_URL set to an unreachable vault and no DATABASE_URL
+                (before the lazy engine, this import read four secrets and
+                built the engine; now it must not touch the vault at all);
+  - sequential: the old startup order — the four DB secrets one after the
+                other, then the OpenAI key — against the fake vault;
+  - concurrent: ``main.startup()`` — every secret at once, then the engine.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../sales_agent_api")
+sys.path.insert(0, APP_DIR)
+
+os.environ.setdefault("ENV", "bench")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.pop("DATABASE_URL", None)
+os.environ["KEY_VAULT_URL"] = "https://bench.vault.invalid/"
+
+from app import main  # noqa: E402
+from app.core import database, keyvault  # noqa: E402
+
+_SECRETS = {
+    "DBUSERNAME": "bench",
+    "DBPASSWORD": "bench",
+    "DBHOST": "127.0.0.1",
+    "DBNAME": "bench",
+    "openai-key": "sk-bench",
+}
+
+
+def _time_import() -> float:
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    env["KEY_VAULT_URL"] = "https://unreachable.vault.invalid/"
+    code = (
+        "import time; t = time.perf_counter(); import app.main; "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=APP_DIR, env=env,
+        capture_output=True, text=True, check=True, timeout=120,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _fresh_store(kv_ms: float) -> keyvault.SecretStore:
+    def read(name: str) -> str:
+        time.sleep(kv_ms / 1000)
+        return _SECRETS[name]
+
+    store = keyvault.SecretStore(os.environ["KEY_VAULT_URL"], fetch=read)
+    keyvault.set_secret_store(store)
+    os.environ.pop("OPENAI_API_KEY", None)
+    return store
+
+
+async def _sequential(kv_ms: float) -> float:
+    store = _fresh_store(kv_ms)
+    started = time.perf_counter()
+    for name in ("DBUSERNAME", "DBPASSWORD", "DBHOST", "DBNAME", "openai-key"):
+        await store.get(name)
+    await database.init_engine()
+    elapsed = (time.perf_counter() - started) * 1000
+    await database.dispose_engine()
+    return elapsed
+
+
+async def _concurrent(kv_ms: float) -> float:
+    _fresh_store(kv_ms)
+    elapsed = await main.startup()
+    await database.dispose_engine()
+    return elapsed
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kv-ms", type=float, default=150, help="fake Key Vault latency per secret")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {
+        "import": [_time_import() for _ in range(args.runs)],
+        "sequential": [asyncio.run(_sequential(args.kv_ms)) for _ in range(args.runs)],
+        "concurrent": [asyncio.run(_concurrent(args.kv_ms)) for _ in range(args.runs)],
+    }
+    keyvault.set_secret_store(None)
+
+    print(f"Key Vault latency: {args.kv_ms:.0f} ms per secret, {len(_SECRETS)} secrets")
+    print(f"{'stage':<11} {'p50 ms':>8} {'min ms':>8}")
+    for stage, samples in results.items():
+        print(f"{stage:<11} {statistics.median(samples):>8.1f} {min(samples):>8.1f}")
+    speedup = statistics.median(results["sequential"]) / statistics.median(results["concurrent"])
+    print(f"secrets + engine speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
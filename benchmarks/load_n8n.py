@@ -0,0 +1,345 @@
+"""Load harness: n8n-shaped traffic against the API, in-process.
+
+Run against a SCRATCH database with all migrations applied and an active
+client row — the harness writes customers, conversations and messages:
+
+    ENV=bench DATABASE_URL=postgresql+asyncpg://... \\
+        python benchmarks/load_n8n.py --client-id <uuid> [--customers 40] [--concurrency 20]
+
+The app runs in this process behind httpx's ASGI transport: the real
+middleware, routers, services and connection pool, minus uvicorn and the
+network hop. That is what lets the summarizer be a fake plugged in through
+the SummarizerLLM protocol (``--llm-ms`` of simulated latency): the harness
+runs the compaction worker in-process with it (the ASGI transport skips the
+app lifespan), and overrides get_summarizer_llm for COMPACTION_MODE=inline. Postgres is required — advisory locks,
+ON CONFLICT upserts and JSONB are the code under test, and nothing
+containerless stands in for them faithfully.
+
+Customer shapes, assigned round-robin:
+  burst      3 messages 150 ms apart, then one /turn poll per message as
+             n8n's per-message executions do (exactly one wins), then
+             /agent/action
+  bsuid      BSUID-only customer (number privacy) who confirms the order in
+             /agent/action; the operator then calls /confirm-payment
+  returning  customer seeded with a conversation older than 24 h: the first
+             /message enqueues its compaction and the worker runs it through
+             the fake summarizer (inline mode: /message runs it itself)
+  stale      /agent/action with the previous strategy_version (409), then
+             the retry with the fresh one
+
+DEBOUNCE_SECONDS defaults to 0.3 here so a run takes seconds, not minutes.
+Reports p50/p95/p99 latency per endpoint, throughput and the status mix.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+os.environ.setdefault("ENV", "bench")
+os.environ.setdefault("DEBOUNCE_SECONDS", "0.3")
+os.environ.setdefault("SALES_AI_SERVICE_TOKEN", "load-service-token")
+os.environ.setdefault("SALES_AI_OPERATOR_TOKEN", "load-operator-token")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../sales_agent_api"))
+
+import httpx
+from httpx import ASGITransport, AsyncClient
+
+from app.api.v1.ingest import get_summarizer_llm
+from app.core.database import AsyncSessionLocal, dispose_engine, init_engine
+from app.main import app
+from app.services import compaction
+from app.models.core import ClientUser, Conversation, Message
+
+MESSAGE = "/api/v1/ingest/message"
+TURN = "/api/v1/ingest/turn"
+ACTION = "/api/v1/agent/action"
+CONFIRM = "/api/v1/operator/confirm-payment"
+
+SHAPES = ("burst", "bsuid", "returning", "stale")
+MAX_POLLS = 5
+
+
+class Recorder:
+    """Latency and status of every call, per endpoint."""
+
+    def __init__(self, client: AsyncClient, client_id: uuid.UUID) -> None:
+        self.client = client
+        self.client_id = client_id
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    async def post(self, endpoint: str, payload: dict, operator: bool = False) -> httpx.Response:
+        token = os.environ["SALES_AI_OPERATOR_TOKEN" if operator else "SALES_AI_SERVICE_TOKEN"]
+        started = time.perf_counter()
+        response = await self.client.post(
+            endpoint,
+            json=payload,
+            headers={"Authorization": f"Bearer {token}", "X-Client-ID": str(self.client_id)},
+        )
+        self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+        self.statuses[endpoint][response.status_code] += 1
+        return response
+
+
+def make_fake_summarizer(latency_ms: float):
+    async def fake_summarizer(system_prompt: str, user_prompt: str) -> dict:
+        await asyncio.sleep(latency_ms / 1000)
+        return {
+            "summary": "Preguntó por café en grano y el envío a Cali.",
+            "outcome": "no_purchase",
+            "interest_level": "medium",
+            "objections": [],
+            "language": "es",
+            "communication_style": "casual",
+        }
+
+    return fake_summarizer
+
+
+# ---------------------------------------------------------------------------
+# n8n steps
+# ---------------------------------------------------------------------------
+async def _sleep_until(respond_after: Optional[str]) -> None:
+    if respond_after:
+        delay = (datetime.fromisoformat(respond_after) - datetime.now(timezone.utc)).total_seconds()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _turn(rec: Recorder, ack: dict, chakra_message_id: str) -> Optional[dict]:
+    """Poll /turn like n8n: wait for respond_after, re-poll while pending."""
+    body = ack
+    for _ in range(MAX_POLLS):
+        await _sleep_until(body.get("respond_after"))
+        response = await rec.post(
+            TURN,
+            {"conversation_id": ack["conversation_id"], "chakra_message_id": chakra_message_id},
+        )
+        if response.status_code != 200:
+            return None
+        body = response.json()
+        if body.get("reason") != "debounce_pending":
+            return body
+    return None
+
+
+async def _action(rec: Recorder, turn: dict, version: Optional[int] = None, **extra) -> httpx.Response:
+    return await rec.post(
+        ACTION,
+        {
+            "conversation_id": turn["conversation_id"],
+            "strategy_version": turn["strategy_version"] if version is None else version,
+            "response_text": f"¡Claro! Te cuento del café. ({uuid.uuid4().hex[:6]})",
+            "ai_model": "fake",
+            **extra,
+        },
+    )
+
+
+async def _send_and_claim(rec: Recorder, content: str, **identity) -> Optional[dict]:
+    """One message, then its turn."""
+    chakra_message_id = f"load.{uuid.uuid4()}"
+    response = await rec.post(
+        MESSAGE, {"chakra_message_id": chakra_message_id, "content": content, **identity}
+    )
+    if response.status_code != 200:
+        return None
+    return await _turn(rec, response.json(), chakra_message_id)
+
+
+# ---------------------------------------------------------------------------
+# Customer shapes
+# ---------------------------------------------------------------------------
+async def burst(rec: Recorder, phone: str) -> None:
+    sent = []
+    for content in ("hola", "buenas", "quiero 2 bolsas de café en grano"):
+        chakra_message_id = f"load.{uuid.uuid4()}"
+        response = await rec.post(
+            MESSAGE,
+            {"chakra_message_id": chakra_message_id, "content": content, "phone_number": phone},
+        )
+        if response.status_code == 200:
+            sent.append((response.json(), chakra_message_id))
+        await asyncio.sleep(0.15)
+    if not sent:
+        return
+    # Every execution polls with ITS message once the newest window closes.
+    newest_ack = sent[-1][0]
+    turns = await asyncio.gather(
+        *(_turn(rec, {**ack, "respond_after": newest_ack["respond_after"]}, mid) for ack, mid in sent)
+    )
+    for turn in turns:
+        if turn and turn.get("should_respond"):
+            await _action(rec, turn)
+
+
+async def bsuid_only(rec: Recorder, bsuid: str) -> None:
+    turn = await _send_and_claim(rec, "hola, ¿tienen café de origen?", bsuid=bsuid)
+    if not (turn and turn.get("should_respond")):
+        return
+    response = await _action(
+        rec,
+        turn,
+        extracted_data={
+            "full_name": "Cliente Carga",
+            "phone": "3001234567",
+            "shipping_address": "Calle 1 # 2-3",
+            "shipping_city": "Cali",
+            "user_confirmation": True,
+        },
+    )
+    if response.status_code == 200:
+        await rec.post(CONFIRM, {"conversation_id": turn["conversation_id"]}, operator=True)
+
+
+async def returning(rec: Recorder, phone: str) -> None:
+    turn = await _send_and_claim(rec, "hola de nuevo, ¿qué tostiones tienen?", phone_number=phone)
+    if turn and turn.get("should_respond"):
+        await _action(rec, turn)
+
+
+async def stale(rec: Recorder, phone: str) -> None:
+    turn = await _send_and_claim(rec, "¿cuánto vale el envío?", phone_number=phone)
+    if not (turn and turn.get("should_respond")):
+        return
+    await _action(rec, turn, version=turn["strategy_version"] - 1)  # → 409
+    await _action(rec, turn)
+
+
+async def seed_returning(client_id: uuid.UUID, phone: str) -> None:
+    """A customer whose last conversation went quiet three days ago."""
+    then = datetime.now(timezone.utc) - timedelta(days=3)
+    async with AsyncSessionLocal() as session:
+        user = ClientUser(client_id=client_id, phone_number=phone, display_name="Vuelve", profile={})
+        session.add(user)
+        await session.flush()
+        conversation = Conversation(
+            client_id=client_id,
+            client_user_id=user.id,
+            state="active",
+            extracted_context={},
+            strategy_version=1,
+            last_message_at=then,
+            message_count=4,
+        )
+        session.add(conversation)
+        await session.flush()
+        for k, (direction, content) in enumerate([
+            ("inbound", "hola, ¿tienen café en grano?"),
+            ("outbound", "¡Sí! Tenemos Huila y Nariño."),
+            ("inbound", "¿y el envío a Cali?"),
+            ("outbound", "Sale en 2 días hábiles."),
+        ]):
+            session.add(
+                Message(
+                    conversation_id=conversation.id,
+                    client_id=client_id,
+                    direction=direction,
+                    message_type="text",
+                    content=content,
+                    chakra_message_id=f"load.seed.{uuid.uuid4()}" if direction == "inbound" else None,
+                    created_at=then - timedelta(minutes=10 - k),
+                )
+            )
+        await session.commit()
+
+
+# ---------------------------------------------------------------------------
+# Run + report
+# ---------------------------------------------------------------------------
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(max(math.ceil(q * len(ordered)) - 1, 0), len(ordered) - 1)]
+
+
+async def run(args: argparse.Namespace) -> tuple[Recorder, float]:
+    tag = f"{random.randrange(1000):03d}"
+    customers = []
+    for i in range(args.customers):
+        shape = SHAPES[i % len(SHAPES)]
+        phone = f"573{tag}{i:06d}"
+        customers.append((shape, phone, f"CO.load{tag}.{i}"))
+
+    for shape, phone, _ in customers:
+        if shape == "returning":
+            await seed_returning(args.client_id, phone)
+
+    app.dependency_overrides[get_summarizer_llm] = lambda: make_fake_summarizer(args.llm_ms)
+    gate = asyncio.Semaphore(args.concurrency)
+    stop = asyncio.Event()
+    worker = asyncio.create_task(
+        compaction.run_worker(stop, llm=make_fake_summarizer(args.llm_ms), poll_seconds=0.2)
+    )
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://load") as client:
+        rec = Recorder(client, args.client_id)
+
+        async def one(shape: str, phone: str, bsuid: str) -> None:
+            async with gate:
+                if shape == "burst":
+                    await burst(rec, phone)
+                elif shape == "bsuid":
+                    await bsuid_only(rec, bsuid)
+                elif shape == "returning":
+                    await returning(rec, phone)
+                else:
+                    await stale(rec, phone)
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(one(*customer) for customer in customers))
+        finally:
+            stop.set()
+        wall = time.perf_counter() - started
+    await worker
+    return rec, wall
+
+
+def report(rec: Recorder, wall: float) -> None:
+    print(f"{'endpoint':<34} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    total = 0
+    for endpoint in (MESSAGE, TURN, ACTION, CONFIRM):
+        latencies = rec.latencies.get(endpoint)
+        if not latencies:
+            continue
+        total += len(latencies)
+        mix = " ".join(f"{code}:{n}" for code, n in sorted(rec.statuses[endpoint].items()))
+        print(
+            f"{endpoint:<34} {len(latencies):>5} {percentile(latencies, 0.50):>8.1f} "
+            f"{percentile(latencies, 0.95):>8.1f} {percentile(latencies, 0.99):>8.1f}  {mix}"
+        )
+    errors = sum(n for s in rec.statuses.values() for code, n in s.items() if code >= 500)
+    print(f"{total} requests in {wall:.2f} s → {total / wall:.1f} req/s; 5xx: {errors}")
+    print("expected non-2xx: 409 on /agent/action (stale shape).")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--client-id", type=uuid.UUID, required=True)
+    parser.add_argument("--customers", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--llm-ms", type=float, default=800, help="fake summarizer latency")
+    args = parser.parse_args()
+
+    # ASGITransport does not run the lifespan: bring the engine up here.
+    await init_engine()
+    try:
+        rec, wall = await run(args)
+    finally:
+        await dispose_engine()
+    report(rec, wall)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
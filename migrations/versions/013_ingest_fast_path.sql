@@ -0,0 +1,186 @@
+-- Migration 013: ingest en un solo round trip (función server-side)
+--
+-- Contexto: un ingest por el ORM hace ~8 viajes secuenciales a la DB antes del
+-- commit (dup check, búsqueda de identidad por bsuid y por teléfono, upsert,
+-- búsqueda de conversación, advisory lock, INSERT del mensaje, UPDATE de
+-- contadores, INSERT del audit). Con la DB en otra zona cada viaje cuesta
+-- 1–3 ms, y el ingest está en el camino crítico de cada mensaje de WhatsApp.
+--
+-- ingest_message_fast() hace los pasos 1–8 de services/ingest.py dentro de
+-- Postgres y devuelve un JSONB con todo lo que Python necesita (el ack). Es
+-- OPCIONAL: solo se usa con INGEST_FAST_PATH=1 (services/ingest_fastpath.py),
+-- y el camino ORM sigue siendo el de referencia.
+--
+-- Qué NO hace, a propósito — devuelve status='fallback' y Python sigue por el
+-- ORM dentro de la MISMA transacción:
+--   - Crear una conversación para un cliente que ya tuvo otras. Ese camino
+--     puede necesitar la compactación lazy (una llamada al LLM) y siembra
+--     extracted_context desde el profile (_seed_context_from_profile). Duplicar
+--     esa lógica en SQL sería tener dos fuentes de verdad. Solo se crea aquí la
+--     conversación de un cliente SIN conversaciones previas ni profile (semilla
+--     vacía, nada que compactar).
+--
+-- Advisory lock: la llave DEBE ser la misma que usa Python (_conversation_lock_key:
+-- sha1(uuid) mod 2^63), porque claim_turn sigue tomándola desde Python. sha1
+-- mod 2^63 son los 63 bits bajos del hash = los últimos 16 hex con el bit de
+-- signo apagado. sha1 no es builtin en Postgres: requiere pgcrypto (en Azure
+-- Flexible Server hay que permitirlo antes en azure.extensions).
+--
+-- Applied: pendiente.
+
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+-- ---------------------------------------------------------------------------
+-- 1. Llave del advisory lock por conversación (idéntica a la de Python)
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION conversation_lock_key(p_conversation_id UUID)
+RETURNS BIGINT AS $$
+    SELECT ('x' || right(encode(digest(p_conversation_id::text, 'sha1'), 'hex'), 16))::bit(64)::bigint
+           & 9223372036854775807;
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- ---------------------------------------------------------------------------
+-- 2. Pasos 1–8 del ingest
+-- ---------------------------------------------------------------------------
+-- p_now es el reloj del INGEST (Python), no now(): el debounce se ancla a él y
+-- claim_turn lo compara contra su propio reloj. p_reason / p_respond_after los
+-- calcula Python (debounce.py) para que el ack guardado en audit_log sea el
+-- mismo que devuelve el camino ORM.
+--
+-- status: ok | client_not_found | duplicate | blocked | fallback
+CREATE OR REPLACE FUNCTION ingest_message_fast(
+    p_client_id          UUID,
+    p_chakra_message_id  TEXT,
+    p_content            TEXT,
+    p_bsuid              TEXT,
+    p_phone_number       TEXT,
+    p_display_name       TEXT,
+    p_message_type       TEXT,
+    p_message_at         TIMESTAMPTZ,
+    p_now                TIMESTAMPTZ,
+    p_identity_masked    TEXT,
+    p_reason             TEXT,
+    p_respond_after      TIMESTAMPTZ
+) RETURNS JSONB AS $$
+DECLARE
+    v_user        client_users%ROWTYPE;
+    v_conv        conversations%ROWTYPE;
+    v_message_id  UUID;
+    v_response    JSONB;
+BEGIN
+    -- 1. Tenant
+    PERFORM 1 FROM clients WHERE id = p_client_id AND is_active;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'client_not_found');
+    END IF;
+
+    -- 2. Idempotencia
+    PERFORM 1 FROM messages WHERE chakra_message_id = p_chakra_message_id;
+    IF FOUND THEN
+        RETURN jsonb_build_object('status', 'duplicate');
+    END IF;
+
+    -- 3. Identidad, BSUID primero (mismo orden que _resolve_client_user)
+    IF coalesce(p_bsuid, '') <> '' THEN
+        SELECT * INTO v_user FROM client_users
+         WHERE client_id = p_client_id AND bsuid = p_bsuid;
+        IF NOT FOUND AND coalesce(p_phone_number, '') <> '' THEN
+            SELECT * INTO v_user FROM client_users
+             WHERE client_id = p_client_id AND phone_number = p_phone_number;
+        END IF;
+
+        IF v_user.id IS NOT NULL THEN
+            -- Fila legacy por teléfono: NO se le escribe el bsuid (ver 012).
+            UPDATE client_users
+               SET display_name    = coalesce(nullif(p_display_name, ''), display_name),
+                   last_contact_at = p_now
+             WHERE id = v_user.id
+            RETURNING * INTO v_user;
+        ELSE
+            INSERT INTO client_users
+                (client_id, bsuid, phone_number, display_name, first_contact_at, last_contact_at)
+            VALUES
+                (p_client_id, p_bsuid, p_phone_number, p_display_name, p_now, p_now)
+            ON CONFLICT (client_id, bsuid) DO UPDATE
+               SET display_name = EXCLUDED.display_name,
+                   last_contact_at = EXCLUDED.last_contact_at
+            RETURNING * INTO v_user;
+        END IF;
+    ELSE
+        INSERT INTO client_users
+            (client_id, phone_number, display_name, first_contact_at, last_contact_at)
+        VALUES
+            (p_client_id, p_phone_number, p_display_name, p_now, p_now)
+        ON CONFLICT ON CONSTRAINT uq_client_user_phone DO UPDATE
+           SET display_name = EXCLUDED.display_name,
+               last_contact_at = EXCLUDED.last_contact_at
+        RETURNING * INTO v_user;
+    END IF;
+
+    -- 4. Bloqueo
+    IF v_user.is_blocked THEN
+        RETURN jsonb_build_object('status', 'blocked');
+    END IF;
+
+    -- 5. Conversación abierta dentro de la ventana de 24 h
+    SELECT * INTO v_conv FROM conversations
+     WHERE client_id = p_client_id
+       AND client_user_id = v_user.id
+       AND state <> 'closed'
+       AND last_message_at >= p_now - interval '24 hours'
+     ORDER BY last_message_at DESC
+     LIMIT 1;
+
+    IF NOT FOUND THEN
+        IF coalesce(v_user.profile, '{}'::jsonb) <> '{}'::jsonb
+           OR EXISTS (SELECT 1 FROM conversations
+                       WHERE client_id = p_client_id AND client_user_id = v_user.id) THEN
+            RETURN jsonb_build_object('status', 'fallback');
+        END IF;
+        INSERT INTO conversations
+            (client_id, client_user_id, state, extracted_context, strategy_version)
+        VALUES
+            (p_client_id, v_user.id, 'active', '{}'::jsonb, 0)
+        RETURNING * INTO v_conv;
+    END IF;
+
+    -- 6. Advisory lock (misma llave que Python)
+    PERFORM pg_advisory_xact_lock(conversation_lock_key(v_conv.id));
+
+    -- 7. Mensaje
+    INSERT INTO messages
+        (conversation_id, client_id, direction, message_type, content, chakra_message_id, created_at)
+    VALUES
+        (v_conv.id, p_client_id, 'inbound', p_message_type, p_content, p_chakra_message_id, p_message_at)
+    RETURNING id INTO v_message_id;
+
+    -- 8. Contadores + ack (guardado también en audit_log para replay_ingest)
+    UPDATE conversations
+       SET message_count = message_count + 1,
+           last_message_at = p_now
+     WHERE id = v_conv.id
+    RETURNING * INTO v_conv;
+
+    v_response := jsonb_build_object(
+        'should_respond',     false,
+        'reason',             p_reason,
+        'conversation_id',    v_conv.id,
+        'conversation_state', v_conv.state,
+        'strategy_version',   v_conv.strategy_version,
+        'respond_after',      p_respond_after
+    );
+
+    INSERT INTO audit_log (client_id, event_type, entity_type, entity_id, actor_type, new_value)
+    VALUES (
+        p_client_id, 'message_ingest', 'message', v_message_id, 'system',
+        jsonb_build_object(
+            'chakra_message_id', p_chakra_message_id,
+            'identity',          p_identity_masked,
+            'conversation_id',   v_conv.id,
+            'response',          v_response
+        )
+    );
+
+    RETURN jsonb_build_object('status', 'ok', 'response', v_response);
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,150 @@
+-- Migration 014: validar los goals declarados en clients.business_rules
+--
+-- Contexto: un tenant puede declarar sus propios goals (reserva de citas,
+-- triage de soporte, ...) en business_rules->'goals' sin deploy; el
+-- GoalStrategyEngine los compila a un plan cacheado (services/goal_strategy.py,
+-- validate_goal_definitions). Un goal mal formado — sin checkpoints, con un
+-- blocked_by a un checkpoint que no existe, o con un ciclo — no tiene orden
+-- posible: el engine lo degrada a la directiva "unknown goal" y lo loguea,
+-- pero eso es descubrirlo en el turno de un cliente.
+--
+-- Este trigger hace las MISMAS validaciones al escribir la fila, así un
+-- UPDATE con un goal inválido falla (check_violation) y no llega nunca a un
+-- turno. Si se cambian las reglas en Python, cambiarlas aquí también.
+--
+-- Forma de cada goal:
+--   {"checkpoints": [{"name": "...", "required_fields": ["..."],
+--                     "blocked_by": ["..."], "label": "...",
+--                     "hints": {"campo": "texto"}}, ...]}
+--
+-- Applied: pendiente.
+
+CREATE OR REPLACE FUNCTION validate_goal_definitions(rules JSONB)
+RETURNS VOID AS $$
+DECLARE
+    goal_name   TEXT;
+    goal_def    JSONB;
+    cp          JSONB;
+    names       TEXT[];
+    placed      TEXT[];
+    progressed  BOOLEAN;
+BEGIN
+    IF rules IS NULL OR NOT rules ? 'goals' THEN
+        RETURN;
+    END IF;
+    IF jsonb_typeof(rules->'goals') <> 'object' THEN
+        RAISE EXCEPTION '''goals'' must be an object of goal name → definition'
+            USING ERRCODE = 'check_violation';
+    END IF;
+
+    FOR goal_name, goal_def IN SELECT key, value FROM jsonb_each(rules->'goals') LOOP
+        IF jsonb_typeof(goal_def) <> 'object'
+           OR jsonb_typeof(goal_def->'checkpoints') IS DISTINCT FROM 'array'
+           OR jsonb_array_length(goal_def->'checkpoints') = 0 THEN
+            RAISE EXCEPTION 'goal %: ''checkpoints'' must be a non-empty list', goal_name
+                USING ERRCODE = 'check_violation';
+        END IF;
+
+        -- Forma de cada checkpoint
+        FOR cp IN SELECT value FROM jsonb_array_elements(goal_def->'checkpoints') LOOP
+            IF jsonb_typeof(cp) <> 'object'
+               OR jsonb_typeof(cp->'name') IS DISTINCT FROM 'string'
+               OR cp->>'name' = '' THEN
+                RAISE EXCEPTION 'goal %: every checkpoint needs a ''name''', goal_name
+                    USING ERRCODE = 'check_violation';
+            END IF;
+            IF jsonb_typeof(cp->'required_fields') IS DISTINCT FROM 'array'
+               OR jsonb_array_length(cp->'required_fields') = 0
+               OR EXISTS (
+                   SELECT 1 FROM jsonb_array_elements(cp->'required_fields') f
+                   WHERE jsonb_typeof(f) <> 'string' OR f #>> '{}' = ''
+               ) THEN
+                RAISE EXCEPTION 'goal %: checkpoint %: needs a non-empty ''required_fields'' list',
+                    goal_name, cp->>'name'
+                    USING ERRCODE = 'check_violation';
+            END IF;
+            IF cp ? 'blocked_by' AND (
+                   jsonb_typeof(cp->'blocked_by') <> 'array'
+                   OR EXISTS (
+                       SELECT 1 FROM jsonb_array_elements(cp->'blocked_by') d
+                       WHERE jsonb_typeof(d) <> 'string'
+                   )
+               ) THEN
+                RAISE EXCEPTION 'goal %: checkpoint %: ''blocked_by'' must be a list of names',
+                    goal_name, cp->>'name'
+                    USING ERRCODE = 'check_violation';
+            END IF;
+            IF cp ? 'hints' AND (
+                   jsonb_typeof(cp->'hints') <> 'object'
+                   OR EXISTS (
+                       SELECT 1 FROM jsonb_each(cp->'hints') h
+                       WHERE jsonb_typeof(h.value) <> 'string'
+                   )
+               ) THEN
+                RAISE EXCEPTION 'goal %: checkpoint %: ''hints'' must map field → text',
+                    goal_name, cp->>'name'
+                    USING ERRCODE = 'check_violation';
+            END IF;
+            IF cp ? 'label' AND jsonb_typeof(cp->'label') <> 'string' THEN
+                RAISE EXCEPTION 'goal %: checkpoint %: ''label'' must be text',
+                    goal_name, cp->>'name'
+                    USING ERRCODE = 'check_violation';
+            END IF;
+        END LOOP;
+
+        names := ARRAY(
+            SELECT c->>'name' FROM jsonb_array_elements(goal_def->'checkpoints') c
+        );
+        IF (SELECT count(DISTINCT n) FROM unnest(names) n) <> cardinality(names) THEN
+            RAISE EXCEPTION 'goal %: duplicate checkpoint names', goal_name
+                USING ERRCODE = 'check_violation';
+        END IF;
+        IF EXISTS (
+            SELECT 1
+            FROM jsonb_array_elements(goal_def->'checkpoints') c,
+                 jsonb_array_elements_text(COALESCE(c->'blocked_by', '[]')) d
+            WHERE NOT d = ANY(names)
+        ) THEN
+            RAISE EXCEPTION 'goal %: a checkpoint is blocked by an unknown checkpoint', goal_name
+                USING ERRCODE = 'check_violation';
+        END IF;
+
+        -- Orden topológico (Kahn): colocar mientras haya checkpoints con todas
+        -- sus dependencias colocadas. Lo que sobra está en un ciclo.
+        placed := '{}';
+        LOOP
+            progressed := FALSE;
+            FOR cp IN SELECT value FROM jsonb_array_elements(goal_def->'checkpoints') LOOP
+                IF NOT (cp->>'name') = ANY(placed) AND NOT EXISTS (
+                    SELECT 1 FROM jsonb_array_elements_text(COALESCE(cp->'blocked_by', '[]')) d
+                    WHERE NOT d = ANY(placed)
+                ) THEN
+                    placed := placed || (cp->>'name');
+                    progressed := TRUE;
+                END IF;
+            END LOOP;
+            EXIT WHEN NOT progressed;
+        END LOOP;
+        IF cardinality(placed) < cardinality(names) THEN
+            RAISE EXCEPTION 'goal %: checkpoint cycle among %',
+                goal_name,
+                ARRAY(SELECT n FROM unnest(names) n WHERE NOT n = ANY(placed))
+                USING ERRCODE = 'check_violation';
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+
+CREATE OR REPLACE FUNCTION trigger_validate_client_goals()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM validate_goal_definitions(NEW.business_rules);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_clients_validate_goals ON clients;
+CREATE TRIGGER trg_clients_validate_goals
+    BEFORE INSERT OR UPDATE OF business_rules ON clients
+    FOR EACH ROW EXECUTE FUNCTION trigger_validate_client_goals();
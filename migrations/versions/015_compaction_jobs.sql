@@ -0,0 +1,91 @@
+-- Migration 015: cola de compactación (resúmenes de conversación en background)
+--
+-- Contexto: hasta ahora la compactación era lazy — cuando un cliente volvía,
+-- ingest_message llamaba a summarize_conversation() DENTRO del ingest y
+-- esperaba el round trip a OpenAI (1–4 s, y sus fallas) antes de guardar el
+-- primer mensaje del cliente.
+--
+-- Ahora la compactación es eager y sale del camino del mensaje:
+--   - Cuando una conversación pasa a 'closed' o 'human_handoff', el trigger de
+--     abajo encola un job (misma transacción que el cambio de estado).
+--   - Las conversaciones que quedan quietas >24 h las encola un barrido
+--     periódico del worker (services/compaction.py, sweep_quiet).
+--   - Si aun así un cliente vuelve con la conversación anterior sin resumir,
+--     ingest encola un job con reason='returning' y sigue SIN esperar.
+--
+-- El worker reclama jobs con FOR UPDATE SKIP LOCKED y un lease
+-- (locked_until), así varias réplicas trabajan la misma cola sin pisarse. Un
+-- job por conversación (UNIQUE conversation_id): re-encolar una conversación
+-- que ya tiene job lo vuelve a dejar 'pending'. El trigger lo hace AUN si el
+-- job está 'running' — el worker solo marca 'done' si el job sigue siendo
+-- suyo (mismo status y attempts), así el cambio de estado tiene su propia
+-- corrida con los mensajes nuevos.
+--
+-- Applied: pendiente.
+
+-- ---------------------------------------------------------------------------
+-- 1. Tabla de jobs
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS compaction_jobs (
+    id                  UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    client_id           UUID NOT NULL REFERENCES clients(id),
+    conversation_id     UUID NOT NULL REFERENCES conversations(id),
+    reason              VARCHAR(20) NOT NULL,
+    status              VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts            INTEGER NOT NULL DEFAULT 0,
+    run_after           TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_until        TIMESTAMPTZ,
+    last_error          TEXT,
+    created_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT uq_compaction_jobs_conversation UNIQUE (conversation_id),
+    CONSTRAINT ck_compaction_jobs_status CHECK (
+        status IN ('pending', 'running', 'done', 'failed')
+    ),
+    CONSTRAINT ck_compaction_jobs_reason CHECK (
+        reason IN ('closed', 'handed_off', 'quiet', 'returning')
+    )
+);
+
+-- El claim solo mira jobs pendientes y vencidos: índice parcial, chico.
+CREATE INDEX IF NOT EXISTS ix_compaction_jobs_pending
+    ON compaction_jobs (run_after) WHERE status = 'pending';
+-- Reclamo de leases vencidos (worker caído a mitad de un job).
+CREATE INDEX IF NOT EXISTS ix_compaction_jobs_running
+    ON compaction_jobs (locked_until) WHERE status = 'running';
+
+DROP TRIGGER IF EXISTS trg_compaction_jobs_updated_at ON compaction_jobs;
+CREATE TRIGGER trg_compaction_jobs_updated_at
+    BEFORE UPDATE ON compaction_jobs
+    FOR EACH ROW EXECUTE FUNCTION trigger_set_updated_at();
+
+-- ---------------------------------------------------------------------------
+-- 2. Encolar al cerrar / escalar una conversación
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION trigger_enqueue_compaction()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO compaction_jobs (client_id, conversation_id, reason)
+    VALUES (
+        NEW.client_id,
+        NEW.id,
+        CASE NEW.state WHEN 'closed' THEN 'closed' ELSE 'handed_off' END
+    )
+    ON CONFLICT (conversation_id) DO UPDATE
+        SET status = 'pending',
+            reason = EXCLUDED.reason,
+            attempts = 0,
+            run_after = NOW(),
+            locked_until = NULL,
+            last_error = NULL;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_conversations_enqueue_compaction ON conversations;
+CREATE TRIGGER trg_conversations_enqueue_compaction
+    AFTER UPDATE OF state ON conversations
+    FOR EACH ROW
+    WHEN (NEW.state IN ('closed', 'human_handoff')
+          AND OLD.state IS DISTINCT FROM NEW.state)
+    EXECUTE FUNCTION trigger_enqueue_compaction();
@@ -0,0 +1,38 @@
+-- Migration 016: resumen incremental (rolling) por conversación
+--
+-- Contexto: summarize_conversation mandaba la transcripción COMPLETA en cada
+-- compactación (cada mensaje truncado a 500 caracteres, sin tope de
+-- mensajes). Una conversación de soporte larga producía prompts enormes y
+-- llamadas lentas y caras, y una conversación escalada y luego cerrada se
+-- resumía dos veces desde cero.
+--
+-- Ahora cada conversación guarda su último resumen y hasta qué mensaje
+-- cubre (high-water mark). La siguiente compactación manda solo el resumen
+-- previo + los mensajes nuevos, y esos mensajes van en bloques que respetan
+-- un presupuesto de tokens (SUMMARY_TRANSCRIPT_TOKEN_BUDGET en
+-- services/conversation_summary.py).
+--
+-- El high-water mark es el par (created_at, id) del último mensaje resumido:
+-- created_at ordena la transcripción y el id desempata mensajes con el mismo
+-- timestamp. Las tres columnas son NULL hasta la primera compactación.
+--
+-- Applied: pendiente.
+
+ALTER TABLE conversations
+  ADD COLUMN IF NOT EXISTS rolling_summary JSONB,
+  ADD COLUMN IF NOT EXISTS summarized_through_at TIMESTAMPTZ,
+  ADD COLUMN IF NOT EXISTS summarized_through_message_id UUID;
+
+COMMENT ON COLUMN conversations.rolling_summary IS
+  'Último resumen estructurado de ESTA conversación (mismo shape que
+   client_users.profile->last_conversation_summary). Lo escribe
+   conversation_summary.py; la siguiente compactación parte de aquí.';
+COMMENT ON COLUMN conversations.summarized_through_at IS
+  'created_at del último mensaje cubierto por rolling_summary.';
+COMMENT ON COLUMN conversations.summarized_through_message_id IS
+  'id del último mensaje cubierto por rolling_summary (desempate de created_at).';
+
+-- El delta se lee con (created_at, id) > high-water mark dentro de la
+-- conversación: el índice deja que sea un range scan.
+CREATE INDEX IF NOT EXISTS ix_messages_conversation_created_id
+  ON messages (conversation_id, created_at, id);
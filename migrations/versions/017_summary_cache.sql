@@ -0,0 +1,31 @@
+-- Migration 017: cache de resúmenes direccionado por contenido
+--
+-- Contexto: needs_summary solo compara conversation_id. Si la escritura del
+-- profile pierde una carrera o un rollback se lleva el resumen, la misma
+-- conversación se vuelve a resumir — otra llamada al LLM con EXACTAMENTE el
+-- mismo prompt. Y dos transcripciones idénticas nunca se deduplican.
+--
+-- summary_cache guarda la salida del LLM bajo el sha256 de las entradas
+-- exactas del prompt (schema, modelo, system prompt con el catálogo,
+-- transcripción, extracted_context y resumen previo — ver
+-- summary_cache_key en services/conversation_summary.py). Si el prompt no
+-- cambió, la respuesta sale de aquí: cero llamadas al LLM. Cualquier cambio
+-- en las entradas cambia la llave, así que nunca hay que invalidar.
+--
+-- Desalojo: el worker de compactación borra las entradas sin hits en
+-- SUMMARY_CACHE_TTL_DAYS y, si aún sobran, las menos usadas recientemente
+-- por encima de SUMMARY_CACHE_MAX_ROWS (evict_summary_cache).
+--
+-- Applied: pendiente.
+
+CREATE TABLE IF NOT EXISTS summary_cache (
+    key             VARCHAR(64) PRIMARY KEY,
+    summary         JSONB NOT NULL,
+    hits            INTEGER NOT NULL DEFAULT 0,
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_hit_at     TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Desalojo por antigüedad y por LRU.
+CREATE INDEX IF NOT EXISTS ix_summary_cache_last_hit
+    ON summary_cache (last_hit_at);
@@ -0,0 +1,20 @@
+-- Migration 018: claim de compactación por turnos entre tenants
+--
+-- Contexto: el claim de compaction_jobs tomaba los jobs vencidos más viejos
+-- (ORDER BY run_after). Un tenant que reactiva miles de clientes de golpe
+-- (un broadcast) llenaba todos los lotes hasta vaciar su backlog, y las
+-- compactaciones de los demás tenants esperaban detrás.
+--
+-- Ahora el claim (services/compaction.py, claim_stmt) toma por turnos: el job
+-- vencido más viejo de cada tenant antes que el segundo de cualquiera. Para
+-- eso busca, por cada tenant con jobs vencidos, sus jobs más viejos
+-- (LATERAL ... ORDER BY run_after LIMIT lote). Este índice hace de esa
+-- búsqueda un range scan por tenant.
+--
+-- Dentro de cada proceso, services/summary_scheduler.py reparte los slots del
+-- summarizer entre tenants con pesos (SUMMARY_TENANT_WEIGHTS).
+--
+-- Applied: pendiente.
+
+CREATE INDEX IF NOT EXISTS ix_compaction_jobs_pending_client
+    ON compaction_jobs (client_id, run_after) WHERE status = 'pending';
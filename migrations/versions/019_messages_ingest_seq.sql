@@ -0,0 +1,47 @@
+-- Migration 019: orden de ingesta de los mensajes (ingest_seq)
+--
+-- Contexto: claim_turn decide qué mensaje cerró la ráfaga con
+-- ORDER BY created_at DESC LIMIT 1. Pero created_at es el timestamp de
+-- WhatsApp, con resolución de SEGUNDOS: los mensajes de una ráfaga suelen
+-- compartir el mismo segundo y Postgres devuelve cualquiera de ellos. Cada
+-- poll podía ver "el otro" como el más nuevo, todos recibían
+-- debounce_superseded y el cliente se quedaba sin respuesta.
+--
+-- ingest_seq es un bigint de una secuencia, asignado al INSERT. Los inbound
+-- de una conversación se insertan bajo su advisory lock (ingest.py y la
+-- función de 013), así que dentro de la conversación ingest_seq sigue el
+-- orden en que se persistieron y no se repite. La función
+-- ingest_message_fast() no cambia: el DEFAULT llena la columna.
+--
+-- Backfill: las filas existentes se numeran por (created_at, id), lo mejor
+-- que se sabe del orden previo. Reescribe la tabla: correr en una ventana
+-- de bajo tráfico.
+--
+-- Applied: pendiente.
+
+CREATE SEQUENCE IF NOT EXISTS messages_ingest_seq_seq AS BIGINT;
+
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS ingest_seq BIGINT;
+
+UPDATE messages m
+   SET ingest_seq = o.seq
+  FROM (SELECT id, row_number() OVER (ORDER BY created_at, id) AS seq
+          FROM messages) o
+ WHERE m.id = o.id
+   AND m.ingest_seq IS NULL;
+
+SELECT setval('messages_ingest_seq_seq', coalesce((SELECT max(ingest_seq) FROM messages), 0) + 1, false);
+
+ALTER TABLE messages
+  ALTER COLUMN ingest_seq SET DEFAULT nextval('messages_ingest_seq_seq'),
+  ALTER COLUMN ingest_seq SET NOT NULL;
+ALTER SEQUENCE messages_ingest_seq_seq OWNED BY messages.ingest_seq;
+
+COMMENT ON COLUMN messages.ingest_seq IS
+  'Orden de persistencia (secuencia). created_at es el reloj del remitente:
+   no sirve para saber qué mensaje llegó último.';
+
+-- claim_turn: el inbound más nuevo de la conversación es un index scan
+-- hacia atrás.
+CREATE INDEX IF NOT EXISTS ix_messages_conversation_ingest_seq
+  ON messages (conversation_id, ingest_seq);
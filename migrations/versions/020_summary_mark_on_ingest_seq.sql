@@ -0,0 +1,39 @@
+-- Migration 020: high-water mark del resumen por orden de ingesta
+--
+-- Contexto: el high-water mark de 016 era el par (created_at, id) del último
+-- mensaje resumido. created_at es el reloj del REMITENTE (WhatsApp) y el id
+-- es un uuid4 aleatorio: el par no sigue el orden de inserción. Un mensaje
+-- guardado después de una compactación pero con timestamp anterior o igual
+-- al mark (entrega tardía de WhatsApp, un flush de backlog por
+-- /ingest/messages) quedaba fuera de todos los deltas siguientes y nunca
+-- llegaba al resumen.
+--
+-- Ahora el mark es messages.ingest_seq (019) del último mensaje resumido.
+-- Todo INSERT en messages de una conversación se hace bajo su advisory lock
+-- (services/conversation_lock.py), así que dentro de la conversación un
+-- ingest_seq visible no tiene uno menor todavía sin commit: lo que está por
+-- encima del mark es exactamente lo que falta resumir.
+--
+-- Backfill: el mark pasa al ingest_seq del mensaje que apuntaba el par. El
+-- índice (conversation_id, created_at, id) de 016 ya no lo usa nadie; el
+-- delta se lee con (conversation_id, ingest_seq) de 019.
+--
+-- Applied: pendiente.
+
+ALTER TABLE conversations
+  ADD COLUMN IF NOT EXISTS summarized_through_seq BIGINT;
+
+UPDATE conversations c
+   SET summarized_through_seq = m.ingest_seq
+  FROM messages m
+ WHERE m.id = c.summarized_through_message_id
+   AND c.summarized_through_seq IS NULL;
+
+COMMENT ON COLUMN conversations.summarized_through_seq IS
+  'messages.ingest_seq del último mensaje cubierto por rolling_summary.';
+
+ALTER TABLE conversations
+  DROP COLUMN IF EXISTS summarized_through_at,
+  DROP COLUMN IF EXISTS summarized_through_message_id;
+
+DROP INDEX IF EXISTS ix_messages_conversation_created_id;
@@ -0,0 +1,161 @@
+-- Migration 021: last_message_at se fecha con el lock tomado
+--
+-- Contexto: el ingest fechaba last_message_at con el reloj del INICIO del
+-- request. Si el ingest esperaba el advisory lock mientras un claim_turn
+-- reclamaba el turno, persistía después de ese claim pero con un
+-- last_message_at ANTERIOR a su last_strategy_at: el poll del mensaje nuevo
+-- (el más nuevo por ingest_seq) recibía already_claimed y el cliente se
+-- quedaba sin respuesta.
+--
+-- Ahora la llegada se fecha después de tomar el lock, y last_message_at
+-- nunca retrocede (greatest). El camino ORM (services/ingest.py) lee el
+-- reloj de Python tras lock_conversation. La función de 013 sigue recibiendo
+-- p_now de Python y le suma lo que lleva la llamada (clock_timestamp() -
+-- statement_timestamp(), espera del lock incluida): solo se usa un
+-- intervalo del reloj de Postgres, así que no se mezclan relojes con
+-- claim_turn. respond_after del ack se corre lo mismo.
+--
+-- Misma firma que 013: CREATE OR REPLACE, sin cambios en Python.
+--
+-- Applied: pendiente.
+
+CREATE OR REPLACE FUNCTION ingest_message_fast(
+    p_client_id          UUID,
+    p_chakra_message_id  TEXT,
+    p_content            TEXT,
+    p_bsuid              TEXT,
+    p_phone_number       TEXT,
+    p_display_name       TEXT,
+    p_message_type       TEXT,
+    p_message_at         TIMESTAMPTZ,
+    p_now                TIMESTAMPTZ,
+    p_identity_masked    TEXT,
+    p_reason             TEXT,
+    p_respond_after      TIMESTAMPTZ
+) RETURNS JSONB AS $$
+DECLARE
+    v_user        client_users%ROWTYPE;
+    v_conv        conversations%ROWTYPE;
+    v_message_id  UUID;
+    v_response    JSONB;
+    v_arrived_at  TIMESTAMPTZ;
+BEGIN
+    -- 1. Tenant
+    PERFORM 1 FROM clients WHERE id = p_client_id AND is_active;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'client_not_found');
+    END IF;
+
+    -- 2. Idempotencia
+    PERFORM 1 FROM messages WHERE chakra_message_id = p_chakra_message_id;
+    IF FOUND THEN
+        RETURN jsonb_build_object('status', 'duplicate');
+    END IF;
+
+    -- 3. Identidad, BSUID primero (mismo orden que _resolve_client_user)
+    IF coalesce(p_bsuid, '') <> '' THEN
+        SELECT * INTO v_user FROM client_users
+         WHERE client_id = p_client_id AND bsuid = p_bsuid;
+        IF NOT FOUND AND coalesce(p_phone_number, '') <> '' THEN
+            SELECT * INTO v_user FROM client_users
+             WHERE client_id = p_client_id AND phone_number = p_phone_number;
+        END IF;
+
+        IF v_user.id IS NOT NULL THEN
+            -- Fila legacy por teléfono: NO se le escribe el bsuid (ver 012).
+            UPDATE client_users
+               SET display_name    = coalesce(nullif(p_display_name, ''), display_name),
+                   last_contact_at = p_now
+             WHERE id = v_user.id
+            RETURNING * INTO v_user;
+        ELSE
+            INSERT INTO client_users
+                (client_id, bsuid, phone_number, display_name, first_contact_at, last_contact_at)
+            VALUES
+                (p_client_id, p_bsuid, p_phone_number, p_display_name, p_now, p_now)
+            ON CONFLICT (client_id, bsuid) DO UPDATE
+               SET display_name = EXCLUDED.display_name,
+                   last_contact_at = EXCLUDED.last_contact_at
+            RETURNING * INTO v_user;
+        END IF;
+    ELSE
+        INSERT INTO client_users
+            (client_id, phone_number, display_name, first_contact_at, last_contact_at)
+        VALUES
+            (p_client_id, p_phone_number, p_display_name, p_now, p_now)
+        ON CONFLICT ON CONSTRAINT uq_client_user_phone DO UPDATE
+           SET display_name = EXCLUDED.display_name,
+               last_contact_at = EXCLUDED.last_contact_at
+        RETURNING * INTO v_user;
+    END IF;
+
+    -- 4. Bloqueo
+    IF v_user.is_blocked THEN
+        RETURN jsonb_build_object('status', 'blocked');
+    END IF;
+
+    -- 5. Conversación abierta dentro de la ventana de 24 h
+    SELECT * INTO v_conv FROM conversations
+     WHERE client_id = p_client_id
+       AND client_user_id = v_user.id
+       AND state <> 'closed'
+       AND last_message_at >= p_now - interval '24 hours'
+     ORDER BY last_message_at DESC
+     LIMIT 1;
+
+    IF NOT FOUND THEN
+        IF coalesce(v_user.profile, '{}'::jsonb) <> '{}'::jsonb
+           OR EXISTS (SELECT 1 FROM conversations
+                       WHERE client_id = p_client_id AND client_user_id = v_user.id) THEN
+            RETURN jsonb_build_object('status', 'fallback');
+        END IF;
+        INSERT INTO conversations
+            (client_id, client_user_id, state, extracted_context, strategy_version)
+        VALUES
+            (p_client_id, v_user.id, 'active', '{}'::jsonb, 0)
+        RETURNING * INTO v_conv;
+    END IF;
+
+    -- 6. Advisory lock (misma llave que Python)
+    PERFORM pg_advisory_xact_lock(conversation_lock_key(v_conv.id));
+    -- El reloj de Python más lo que tardó esta llamada, espera del lock
+    -- incluida: la llegada se fecha con el lock ya tomado.
+    v_arrived_at := p_now + (clock_timestamp() - statement_timestamp());
+
+    -- 7. Mensaje
+    INSERT INTO messages
+        (conversation_id, client_id, direction, message_type, content, chakra_message_id, created_at)
+    VALUES
+        (v_conv.id, p_client_id, 'inbound', p_message_type, p_content, p_chakra_message_id, p_message_at)
+    RETURNING id INTO v_message_id;
+
+    -- 8. Contadores + ack (guardado también en audit_log para replay_ingest)
+    UPDATE conversations
+       SET message_count = message_count + 1,
+           last_message_at = greatest(last_message_at, v_arrived_at)
+     WHERE id = v_conv.id
+    RETURNING * INTO v_conv;
+
+    v_response := jsonb_build_object(
+        'should_respond',     false,
+        'reason',             p_reason,
+        'conversation_id',    v_conv.id,
+        'conversation_state', v_conv.state,
+        'strategy_version',   v_conv.strategy_version,
+        'respond_after',      p_respond_after + (v_conv.last_message_at - p_now)
+    );
+
+    INSERT INTO audit_log (client_id, event_type, entity_type, entity_id, actor_type, new_value)
+    VALUES (
+        p_client_id, 'message_ingest', 'message', v_message_id, 'system',
+        jsonb_build_object(
+            'chakra_message_id', p_chakra_message_id,
+            'identity',          p_identity_masked,
+            'conversation_id',   v_conv.id,
+            'response',          v_response
+        )
+    );
+
+    RETURN jsonb_build_object('status', 'ok', 'response', v_response);
+END;
+$$ LANGUAGE plpgsql;
@@ -1,24 +1,60 @@
-"""POST /api/v1/ingest/message — ingest an inbound WhatsApp message."""
+"""Ingest surface — inbound WhatsApp messages and their debounced turn.
+
+  - POST /api/v1/ingest/message — persist an inbound message, return at once.
+  - POST /api/v1/ingest/turn    — claim the turn once the quiet window closes.
+  - POST /api/v1/ingest/messages — a backlog of messages in one request
+    (services/ingest_batch.py); turns are claimed in the same call.
+
+n8n flow per inbound (P7, see services/debounce.py): call /message, wait
+until ``respond_after``, call /turn with the same chakra_message_id. Only
+``should_respond=true`` goes on to the LLM; ``reason=debounce_pending`` means
+poll again after the new ``respond_after``; any other reason means stop —
+another execution is answering this burst.
+
+A retried /message (timeout, webhook redelivery) gets the ORIGINAL ack back —
+same conversation_id and respond_after — from a short-lived in-process copy,
+else from the DB (replay_ingest). Concurrent duplicates wait for the first
+request instead of racing it. /turn is never replayed: the single-claim rule
+is what keeps a duplicated execution from answering twice.
+"""
 from __future__ import annotations
 
+import os
 import uuid
 from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, Field, model_validator
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import ReplayStore
 from app.core.database import get_session
+from app.core.metrics import CACHE_COUNTERS, REGISTRY
+from app.services.conversation_summary import SummarizerLLM
 from app.services.ingest import (
     ClientNotFoundError,
+    ConversationNotFoundError,
     DuplicateMessageError,
     UserBlockedError,
+    claim_turn,
     ingest_message,
+    remember_message_id,
+    replay_ingest,
 )
+from app.services.ingest_batch import BATCH_ACCEPTED, ingest_batch
 
 router = APIRouter()
 
+INGEST_REPLAY_TTL_SECONDS = float(os.getenv("INGEST_REPLAY_TTL_SECONDS", "600"))
+INGEST_REPLAY_MAX = int(os.getenv("INGEST_REPLAY_MAX", "5000"))
+INGEST_BATCH_MAX = int(os.getenv("INGEST_BATCH_MAX", "500"))
+
+# (client_id, chakra_message_id) → the ack /message returned.
+_ingest_replies: ReplayStore[tuple[uuid.UUID, str], "IngestMessageResponse"] = ReplayStore(
+    maxsize=INGEST_REPLAY_MAX, ttl_seconds=INGEST_REPLAY_TTL_SECONDS
+)
+
 
 # ---------------------------------------------------------------------------
 # Request / Response schemas
@@ -47,79 +83,222 @@ class IngestMessageRequest(BaseModel):
         return self
 
 
+class IngestTurnRequest(BaseModel):
+    """Turn poll from n8n: the message whose /message call scheduled it."""
+
+    conversation_id: uuid.UUID
+    chakra_message_id: str
+
+
 class IngestMessageResponse(BaseModel):
+    """Shared by /message and /turn.
+
+    The LLM context fields are only filled when ``should_respond`` is true;
+    otherwise ``reason`` says why (and ``respond_after`` when to poll).
+    """
+
     should_respond: bool
     conversation_id: uuid.UUID
     conversation_state: str
-    strategy_directive: str
-    strategy_meta: dict
-    strategy_version: int
-    client_config: dict
-    user_context: dict
+    reason: Optional[str] = None
+    respond_after: Optional[datetime] = None
+    strategy_directive: str = ""
+    strategy_meta: dict = {}
+    strategy_version: int = 0
+    client_config: dict = {}
+    user_context: dict = {}
     product_catalog: list[dict] = []
     business_context: str = ""
     conversation_summary: str = ""
-    recent_messages: list[dict]
+    recent_messages: list[dict] = []
+
+
+class IngestBatchRequest(BaseModel):
+    """A backlog of inbound messages, any mix of customers."""
+
+    messages: list[IngestMessageRequest] = Field(min_length=1, max_length=INGEST_BATCH_MAX)
+
+
+class IngestBatchItem(BaseModel):
+    """Outcome of one message, in request order.
+
+    ``status``: accepted | duplicate | blocked | failed. ``response`` is the
+    message's ack (or, for the newest message of each conversation, the
+    turn with ``should_respond=true``); absent when blocked or failed.
+    """
+
+    chakra_message_id: str
+    status: str
+    error: Optional[str] = None
+    response: Optional[IngestMessageResponse] = None
+
+
+class IngestBatchResponse(BaseModel):
+    results: list[IngestBatchItem]
 
 
 # ---------------------------------------------------------------------------
 # Endpoint
 # ---------------------------------------------------------------------------
+def get_summarizer_llm() -> Optional[SummarizerLLM]:
+    """The LLM behind in-ingest compaction (COMPACTION_MODE=inline; the queue
+    worker has its own); None means the default OpenAI caller.
+
+    A dependency so it can be swapped through app.dependency_overrides —
+    benchmarks/load_n8n.py plugs in a fake with a fixed latency.
+    """
+    return None
+
+
 @router.post("/message", response_model=IngestMessageResponse)
 async def ingest_message_endpoint(
     request: Request,
     body: IngestMessageRequest,
     session: AsyncSession = Depends(get_session),
+    summarizer_llm: Optional[SummarizerLLM] = Depends(get_summarizer_llm),
+) -> IngestMessageResponse:
+    """Persist an inbound WhatsApp message; the turn is claimed via /turn.
+
+    Requires:
+      - Authorization: Bearer <SALES_AI_SERVICE_TOKEN>
+      - X-Client-ID: <uuid of the tenant client>
+    """
+    client_id: uuid.UUID = request.state.client_id  # set by auth middleware
+
+    async def ingest_once() -> IngestMessageResponse:
+        try:
+            result = await ingest_message(
+                session=session,
+                client_id=client_id,
+                chakra_message_id=body.chakra_message_id,
+                bsuid=body.bsuid,
+                phone_number=body.phone_number,
+                content=body.content,
+                display_name=body.display_name,
+                message_type=body.message_type,
+                timestamp=body.timestamp,
+                summarizer_llm=summarizer_llm,
+            )
+            await session.commit()
+            remember_message_id(body.chakra_message_id)
+            return IngestMessageResponse(**result)
+
+        except DuplicateMessageError:
+            # Idempotent — no side effects; replay the original ack.
+            await session.rollback()
+            original = await replay_ingest(session, client_id, body.chakra_message_id)
+            if original is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Message {body.chakra_message_id} belongs to another client",
+                )
+            return IngestMessageResponse(**original)
+
+        except ClientNotFoundError as exc:
+            await session.rollback()
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+
+        except UserBlockedError as exc:
+            await session.rollback()
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(exc))
+
+        except Exception as exc:
+            await session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Ingest failed: {exc}",
+            )
+
+    return await _ingest_replies.run((client_id, body.chakra_message_id), ingest_once)
+
+
+def get_ingest_replay_stats() -> dict:
+    """Replayed / coalesced / computed /message acks since process start."""
+    return _ingest_replies.stats()
+
+
+REGISTRY.register_stats(
+    "sales_ai_cache", "cache", lambda: {"ingest_replay": get_ingest_replay_stats()}, CACHE_COUNTERS
+)
+
+
+@router.post("/turn", response_model=IngestMessageResponse)
+async def claim_turn_endpoint(
+    request: Request,
+    body: IngestTurnRequest,
+    session: AsyncSession = Depends(get_session),
 ) -> IngestMessageResponse:
-    """Process an inbound WhatsApp message.
+    """Claim the "ready to respond" turn of a conversation (debounce).
 
     Requires:
       - Authorization: Bearer <SALES_AI_SERVICE_TOKEN>
       - X-Client-ID: <uuid of the tenant client>
+
+    Exactly one poll per burst of inbound messages gets should_respond=true.
     """
     client_id: uuid.UUID = request.state.client_id  # set by auth middleware
 
     try:
-        result = await ingest_message(
+        result = await claim_turn(
             session=session,
             client_id=client_id,
+            conversation_id=body.conversation_id,
             chakra_message_id=body.chakra_message_id,
-            bsuid=body.bsuid,
-            phone_number=body.phone_number,
-            content=body.content,
-            display_name=body.display_name,
-            message_type=body.message_type,
-            timestamp=body.timestamp,
         )
         await session.commit()
         return IngestMessageResponse(**result)
 
-    except DuplicateMessageError:
-        # Idempotent — return a minimal response without side effects
+    except (ConversationNotFoundError, ClientNotFoundError) as exc:
         await session.rollback()
-        return IngestMessageResponse(
-            should_respond=False,
-            conversation_id=uuid.uuid4(),  # dummy — caller should check should_respond
-            conversation_state="active",
-            strategy_directive="",
-            strategy_meta={},
-            strategy_version=0,
-            client_config={},
-            user_context={},
-            recent_messages=[],
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+
+    except Exception as exc:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Turn claim failed: {exc}",
         )
 
+
+@router.post("/messages", response_model=IngestBatchResponse)
+async def ingest_batch_endpoint(
+    request: Request,
+    body: IngestBatchRequest,
+    session: AsyncSession = Depends(get_session),
+    summarizer_llm: Optional[SummarizerLLM] = Depends(get_summarizer_llm),
+) -> IngestBatchResponse:
+    """Persist a backlog of inbound messages with one connection.
+
+    Requires:
+      - Authorization: Bearer <SALES_AI_SERVICE_TOKEN>
+      - X-Client-ID: <uuid of the tenant client>
+
+    Exactly one message per conversation comes back with should_respond=true
+    (its newest); n8n does not poll /turn for messages of a batch.
+    """
+    client_id: uuid.UUID = request.state.client_id  # set by auth middleware
+
+    try:
+        outcomes = await ingest_batch(
+            session,
+            client_id,
+            [message.model_dump() for message in body.messages],
+            summarizer_llm=summarizer_llm,
+        )
+        await session.commit()
+
     except ClientNotFoundError as exc:
         await session.rollback()
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
 
-    except UserBlockedError as exc:
-        await session.rollback()
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(exc))
-
     except Exception as exc:
         await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ingest failed: {exc}",
+            detail=f"Batch ingest failed: {exc}",
         )
+
+    for outcome in outcomes:
+        if outcome["status"] == BATCH_ACCEPTED:
+            remember_message_id(outcome["chakra_message_id"])
+    return IngestBatchResponse(results=outcomes)
@@ -0,0 +1,259 @@
+"""In-process caches for per-tenant data that almost never changes.
+
+One process, one event loop: plain dicts, no locks. Concurrent misses for
+the same key may both load — harmless, the last write wins and both values
+are equivalent snapshots.
+
+VersionedTTLCache
+  Entries carry the *version* of the source row(s) they were built from
+  (e.g. ``clients.updated_at``). Within the TTL an entry is served with no
+  I/O at all. Past the TTL the caller's cheap ``probe`` is asked for the
+  current version: unchanged → the entry is renewed (a revalidation, one
+  tiny query instead of a full reload); changed or gone → ``load`` runs.
+  ``invalidate`` drops an entry immediately, optionally only if it is older
+  than a given version (so a late, out-of-order invalidation is a no-op).
+
+RecentKeys
+  A bounded LRU *set* of keys seen recently (e.g. webhook delivery ids).
+  Membership is exact — no false positives — and the oldest key is evicted
+  once ``maxsize`` is reached, so memory stays flat under any traffic.
+
+ReplayStore
+  Short-lived LRU of computed responses, plus single-flight: while the first
+  request for a key is still running, identical requests await ITS result
+  instead of redoing the work. If that first attempt fails, each waiter
+  runs the work itself (failures are never shared or stored).
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    version: Any
+    loaded_at: float
+
+
+class VersionedTTLCache(Generic[K, V]):
+    def __init__(
+        self,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: dict[K, _Entry[V]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.invalidations = 0
+
+    async def get(
+        self,
+        key: K,
+        *,
+        probe: Callable[[], Awaitable[Any]],
+        load: Callable[[], Awaitable[Optional[tuple[V, Any]]]],
+    ) -> Optional[V]:
+        """Return the cached value for ``key``, revalidating or loading as needed.
+
+        ``probe()`` returns the source's current version (None if it's gone).
+        ``load()`` returns ``(value, version)`` or None if there's nothing to
+        cache — absences are never cached, so a new tenant works at once.
+        """
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now - entry.loaded_at < self.ttl_seconds:
+                self.hits += 1
+                return entry.value
+            version = await probe()
+            if version is not None and version == entry.version:
+                self.revalidations += 1
+                entry.loaded_at = now
+                return entry.value
+
+        self.misses += 1
+        loaded = await load()
+        if loaded is None:
+            self._entries.pop(key, None)
+            return None
+        value, version = loaded
+        self._entries[key] = _Entry(value=value, version=version, loaded_at=now)
+        return value
+
+    def put(self, key: K, value: V, version: Any) -> None:
+        """Store a value built outside ``get`` (e.g. derived from a cached one)."""
+        self._entries[key] = _Entry(value=value, version=version, loaded_at=self._clock())
+
+    def invalidate(self, key: K, version: Any = None) -> None:
+        """Drop ``key``. With ``version``, only if the cached copy is older."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        if version is not None and entry.version is not None and entry.version >= version:
+            return
+        del self._entries[key]
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.revalidations + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            # Revalidations cost one probe query but no reload — count as hits.
+            "hit_ratio": (
+                (self.hits + self.revalidations) / lookups if lookups else 0.0
+            ),
+        }
+
+
+class RecentKeys(Generic[K]):
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._keys: OrderedDict[K, None] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: K) -> bool:
+        """Membership test; counts toward stats and refreshes the key's recency."""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, key: K) -> None:
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+
+    def discard(self, key: K) -> None:
+        self._keys.pop(key, None)
+
+    def clear(self) -> None:
+        self._keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._keys),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_FAILED = object()
+
+
+class ReplayStore(Generic[K, V]):
+    def __init__(
+        self,
+        maxsize: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self._inflight: dict[K, asyncio.Future] = {}
+        self.replays = 0
+        self.coalesced = 0
+        self.computed = 0
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if self._clock() - stored_at >= self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        self._entries[key] = (value, self._clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def run(
+        self,
+        key: K,
+        compute: Callable[[], Awaitable[V]],
+        *,
+        store_if: Callable[[V], bool] = lambda value: True,
+    ) -> V:
+        """Replay the stored value for ``key``, join the in-flight one, or compute.
+
+        Only values passing ``store_if`` are kept for later replays; in-flight
+        waiters get whatever the first attempt returned.
+        """
+        while True:
+            value = self.get(key)
+            if value is not None:
+                self.replays += 1
+                return value
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            self.coalesced += 1
+            value = await asyncio.shield(pending)
+            if value is not _FAILED:
+                return value
+            # First attempt failed: loop and try on our own.
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        value = _FAILED
+        try:
+            value = await compute()
+            self.computed += 1
+            if store_if(value):
+                self.put(key, value)
+            return value
+        finally:
+            del self._inflight[key]
+            future.set_result(value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._inflight),
+            "replays": self.replays,
+            "coalesced": self.coalesced,
+            "computed": self.computed,
+        }
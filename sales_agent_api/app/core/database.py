@@ -2,45 +2,57 @@
 
 Connection string resolution order:
   1. DATABASE_URL env var (direct connection string)
-  2. KEY_VAULT_URL → fetch secrets from Azure Key Vault
+  2. KEY_VAULT_URL → fetch secrets from Azure Key Vault (app/core/keyvault.py)
   3. Individual env vars: DBUSERNAME / DBPASSWORD / DBHOST / DBNAME
+
+Nothing is resolved at import time: ``await init_engine()`` (main.py's
+lifespan, the CLIs) reads the secrets — concurrently, off the event loop —
+and creates the engine. ``AsyncSessionLocal`` is importable before that and
+is bound by init_engine. With Key Vault, each new connection takes the
+current cached DBPASSWORD, so a rotated password (keyvault refresher) is used
+without rebuilding the engine.
 """
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
-from typing import AsyncGenerator
+import time
+from typing import Any, AsyncGenerator, Awaitable, Callable, Optional
 
 from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy import text
 
+from app.core.keyvault import get_secret_store
+from app.core.metrics import REGISTRY
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+_DB_SECRETS = ("DBUSERNAME", "DBPASSWORD", "DBHOST", "DBNAME")
+
 
-def _build_database_url() -> str:
+async def resolve_database_url() -> str:
     # Option 1: direct DATABASE_URL
     url = os.getenv("DATABASE_URL")
     if url:
         return url
 
-    # Option 2: Azure Key Vault
-    kv_url = os.getenv("KEY_VAULT_URL")
-    if kv_url:
-        from azure.identity import DefaultAzureCredential
-        from azure.keyvault.secrets import SecretClient
-
-        credential = DefaultAzureCredential(exclude_shared_token_cache_credential=True)
-        kv = SecretClient(vault_url=kv_url, credential=credential)
-        db_user = kv.get_secret("DBUSERNAME").value
-        db_pass = kv.get_secret("DBPASSWORD").value
-        db_host = kv.get_secret("DBHOST").value
-        db_name = kv.get_secret("DBNAME").value
+    # Option 2: Azure Key Vault — the four secrets in one concurrent round
+    store = get_secret_store()
+    if store is not None:
+        secrets = await store.get_many(_DB_SECRETS)
         db_port = os.getenv("DBPORT", "5432")
-        return f"postgresql+asyncpg://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}?sslmode=require"
+        return (
+            f"postgresql+asyncpg://{secrets['DBUSERNAME']}:{secrets['DBPASSWORD']}"
+            f"@{secrets['DBHOST']}:{db_port}/{secrets['DBNAME']}?sslmode=require"
+        )
 
     # Option 3: individual env vars
     db_user = os.getenv("DBUSERNAME")
@@ -58,36 +70,102 @@ def _build_database_url() -> str:
     )
 
 
-DATABASE_URL = _build_database_url()
+def _split_ssl(url: str) -> tuple[str, dict]:
+    """asyncpg does not support ?sslmode= query param — pass ssl via connect_args."""
+    ssl_required = "sslmode=require" in url or "ssl=require" in url
+    clean_url = (
+        url
+        .replace("?sslmode=require", "")
+        .replace("&sslmode=require", "")
+        .replace("?ssl=require", "")
+        .replace("&ssl=require", "")
+    )
+    return clean_url, ({"ssl": "require"} if ssl_required else {})
+
 
-# asyncpg does not support ?sslmode= query param — pass ssl via connect_args
-_ssl_required = "sslmode=require" in DATABASE_URL or "ssl=require" in DATABASE_URL
-_clean_url = (
-    DATABASE_URL
-    .replace("?sslmode=require", "")
-    .replace("&sslmode=require", "")
-    .replace("?ssl=require", "")
-    .replace("&ssl=require", "")
+_checkout_ms = REGISTRY.histogram(
+    "sales_ai_db_pool_checkout_ms",
+    "Time to get a pooled connection (queue wait + pre-ping), in ms.",
 )
-_connect_args: dict = {"ssl": "require"} if _ssl_required else {}
-
-engine = create_async_engine(
-    _clean_url,
-    echo=os.getenv("ENV", "dev") == "dev",
-    pool_size=5,
-    max_overflow=10,
-    pool_recycle=3600,
-    pool_pre_ping=True,
-    connect_args=_connect_args,
+_checkout_timeouts = REGISTRY.counter(
+    "sales_ai_db_pool_checkout_timeouts_total",
+    "Checkouts that gave up waiting for a connection.",
 )
 
+
+class _TimedQueuePool(AsyncAdaptedQueuePool):
+    """The default async pool, with checkout wait measured for /metrics."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except sa_exc.TimeoutError:
+            _checkout_timeouts.inc()
+            raise
+        finally:
+            _checkout_ms.observe((time.perf_counter() - started) * 1000)
+
+
+engine: Optional[AsyncEngine] = None
+
+# Bound to the engine by init_engine; importable (and injectable) before.
 AsyncSessionLocal = sessionmaker(
-    engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
 
 
+def create_engine_for(url: str) -> AsyncEngine:
+    clean_url, connect_args = _split_ssl(url)
+    return create_async_engine(
+        clean_url,
+        echo=os.getenv("ENV", "dev") == "dev",
+        poolclass=_TimedQueuePool,
+        pool_size=5,
+        max_overflow=10,
+        pool_recycle=3600,
+        pool_pre_ping=True,
+        connect_args=connect_args,
+    )
+
+
+async def init_engine() -> AsyncEngine:
+    """Resolve the connection string and create the engine (once)."""
+    global engine
+    if engine is not None:
+        return engine
+    url = await resolve_database_url()
+    if engine is not None:  # another caller finished first
+        return engine
+    engine = create_engine_for(url)
+    store = get_secret_store()
+    if store is not None and not os.getenv("DATABASE_URL"):
+        @event.listens_for(engine.sync_engine, "do_connect")
+        def _current_password(dialect, conn_rec, cargs, cparams):
+            password = store.cached("DBPASSWORD")
+            if password:
+                cparams["password"] = password
+
+    AsyncSessionLocal.configure(bind=engine)
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    if engine is None:
+        raise RuntimeError("database engine not initialised — await init_engine() first")
+    return engine
+
+
+async def dispose_engine() -> None:
+    """Close the pool's connections (lifespan shutdown, CLIs). A later
+    init_engine builds a fresh engine."""
+    global engine
+    current, engine = engine, None
+    if current is not None:
+        await current.dispose()
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
@@ -95,9 +173,122 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
 
 async def ping_db() -> bool:
     try:
-        async with engine.connect() as conn:
+        async with get_engine().connect() as conn:
             await conn.execute(text("SELECT 1"))
         return True
     except Exception as exc:
         logger.error("Database ping failed: %s", exc)
         return False
+
+
+# ---------------------------------------------------------------------------
+# Concurrent independent reads
+# ---------------------------------------------------------------------------
+ReadFn = Callable[[AsyncSession], Awaitable[Any]]
+
+# stage → {"fanouts", "sequential", "reads_ms", "wall_ms", "saved_ms"}
+_fanout_stats: dict[str, dict] = {}
+
+
+def _lendable_connections() -> int:
+    """Connections the pool can hand out right now without making anyone wait."""
+    if engine is None:
+        return 0
+    pool = engine.pool
+    return pool.size() + getattr(pool, "_max_overflow", 0) - pool.checkedout()
+
+
+async def gather_reads(
+    session: AsyncSession,
+    reads: dict[str, ReadFn],
+    *,
+    stage: str,
+    session_factory: Optional[Callable[[], AsyncSession]] = None,
+    lendable: Callable[[], int] = _lendable_connections,
+) -> dict[str, Any]:
+    """Run independent reads concurrently; results keyed like ``reads``.
+
+    One AsyncSession can't run two statements at once, so the FIRST read
+    runs on ``session`` — the only one that sees this transaction's own
+    writes — and each other read gets its own short-lived pooled session.
+    Those must therefore only read committed data (catalog, tenant config,
+    rows an earlier request wrote).
+
+    When the pool can't lend the extra connections without waiting, the
+    reads run one after another on ``session`` instead: queueing for a
+    connection would cost more than the overlap saves.
+
+    Per-stage timings (sum of reads vs wall clock) go to get_fanout_stats().
+    """
+    names = list(reads)
+    stats = _fanout_stats.setdefault(
+        stage,
+        {"fanouts": 0, "sequential": 0, "reads_ms": 0.0, "wall_ms": 0.0, "saved_ms": 0.0},
+    )
+    factory = session_factory or AsyncSessionLocal
+    elapsed: dict[str, float] = {}
+
+    async def timed(name: str, read: ReadFn, on: AsyncSession) -> Any:
+        started = time.perf_counter()
+        try:
+            return await read(on)
+        finally:
+            elapsed[name] = (time.perf_counter() - started) * 1000
+
+    async def on_own_session(name: str, read: ReadFn) -> Any:
+        async with factory() as side:
+            return await timed(name, read, side)
+
+    started = time.perf_counter()
+    if len(names) > 1 and lendable() >= len(names) - 1:
+        stats["fanouts"] += 1
+        values = await asyncio.gather(
+            timed(names[0], reads[names[0]], session),
+            *(on_own_session(name, reads[name]) for name in names[1:]),
+        )
+    else:
+        stats["sequential"] += 1
+        values = [await timed(name, reads[name], session) for name in names]
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    reads_ms = sum(elapsed.values())
+    stats["reads_ms"] += reads_ms
+    stats["wall_ms"] += wall_ms
+    stats["saved_ms"] += max(reads_ms - wall_ms, 0.0)
+    logger.debug(
+        "gather_reads[%s]: %s — wall %.2f ms, saved %.2f ms",
+        stage,
+        ", ".join(f"{name} {ms:.2f} ms" for name, ms in elapsed.items()),
+        wall_ms,
+        max(reads_ms - wall_ms, 0.0),
+    )
+    return dict(zip(names, values))
+
+
+def get_fanout_stats() -> dict[str, dict]:
+    """Cumulative per-stage timings of gather_reads since process start."""
+    return {stage: dict(stats) for stage, stats in _fanout_stats.items()}
+
+
+def get_pool_stats() -> dict:
+    """The pool's current shape: size, checked out, overflow in use."""
+    if engine is None:
+        return {}
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": getattr(pool, "_max_overflow", 0),
+        "lendable": _lendable_connections(),
+    }
+
+
+REGISTRY.register_stats(
+    "sales_ai_db_pool", "pool", lambda: {"default": get_pool_stats()} if engine is not None else {}
+)
+# Cumulative since process start, every one of them.
+REGISTRY.register_stats(
+    "sales_ai_fanout", "stage", get_fanout_stats,
+    ("fanouts", "sequential", "reads_ms", "wall_ms", "saved_ms"),
+)
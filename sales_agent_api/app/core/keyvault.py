@@ -0,0 +1,161 @@
+"""Azure Key Vault secrets — fetched concurrently, cached, refreshed in the
+background.
+
+Startup used to read the vault synchronously: four sequential get_secret
+calls at IMPORT time of app.core.database (before FastAPI even started) and
+one more inside the lifespan for the OpenAI key — each a blocking HTTPS round
+trip, several seconds of cold start on every scale-out.
+
+Now:
+  - ``SecretStore.get_many`` fetches every name at once, each blocking SDK
+    call in a worker thread (``asyncio.to_thread``): the event loop never
+    blocks, and startup waits for the slowest secret, not the sum. The sync
+    SecretClient is thread-safe; the SDK's aio client would need aiohttp,
+    which this service does not ship.
+  - Values are cached per process. ``run_refresher`` re-reads the cached
+    names every SECRETS_REFRESH_SECONDS so a rotated secret is picked up
+    without a restart; a failed refresh keeps the old value.
+  - Nothing touches the vault at import time: database.init_engine and the
+    lifespan ask for what they need.
+
+``get_secret_store()`` is None when KEY_VAULT_URL is unset (local dev, CI).
+``fetch`` injects a fake reader (tests, the startup benchmark).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Iterable, Optional
+
+from app.core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SECRETS_REFRESH_SECONDS = float(os.getenv("SECRETS_REFRESH_SECONDS", "3600"))
+
+_fetch_ms = REGISTRY.histogram(
+    "sales_ai_keyvault_fetch_ms",
+    "Key Vault secret reads, in ms, by outcome.",
+    ("outcome",),
+)
+_refresh_failures = REGISTRY.counter(
+    "sales_ai_keyvault_refresh_failures_total",
+    "Background secret refreshes that failed (the cached value was kept).",
+)
+
+SecretFetch = Callable[[str], str]
+OnChange = Callable[[set[str]], Awaitable[None]]
+
+
+class SecretStore:
+    """Process-wide cache of Key Vault secrets."""
+
+    def __init__(self, vault_url: str, *, fetch: Optional[SecretFetch] = None) -> None:
+        self.vault_url = vault_url
+        self._fetch = fetch
+        self._client = None
+        self._values: dict[str, str] = {}
+
+    def _build_client(self) -> None:
+        # No network: the credential gets its token on the first read.
+        from azure.identity import DefaultAzureCredential
+        from azure.keyvault.secrets import SecretClient
+
+        credential = DefaultAzureCredential(exclude_shared_token_cache_credential=True)
+        self._client = SecretClient(vault_url=self.vault_url, credential=credential)
+
+    def _read(self, name: str) -> str:
+        # Runs in a worker thread.
+        if self._fetch is not None:
+            return self._fetch(name)
+        return self._client.get_secret(name).value
+
+    async def _fetch_one(self, name: str) -> str:
+        if self._fetch is None and self._client is None:
+            # Built on the loop thread, once, before any read fans out.
+            self._build_client()
+        started = time.perf_counter()
+        try:
+            value = await asyncio.to_thread(self._read, name)
+        except Exception:
+            _fetch_ms.observe((time.perf_counter() - started) * 1000, "error")
+            raise
+        _fetch_ms.observe((time.perf_counter() - started) * 1000, "ok")
+        self._values[name] = value
+        return value
+
+    def cached(self, name: str) -> Optional[str]:
+        """The cached value, without I/O (None if never fetched)."""
+        return self._values.get(name)
+
+    async def get(self, name: str) -> str:
+        value = self._values.get(name)
+        return value if value is not None else await self._fetch_one(name)
+
+    async def get_many(self, names: Iterable[str]) -> dict[str, str]:
+        """All of ``names``, the uncached ones fetched concurrently."""
+        names = list(dict.fromkeys(names))
+        missing = [name for name in names if name not in self._values]
+        if missing:
+            await asyncio.gather(*(self._fetch_one(name) for name in missing))
+        return {name: self._values[name] for name in names}
+
+    async def refresh(self) -> set[str]:
+        """Re-read every cached secret; returns the names whose value changed.
+        A failed read keeps the cached value."""
+        names = list(self._values)
+        before = dict(self._values)
+        results = await asyncio.gather(
+            *(self._fetch_one(name) for name in names), return_exceptions=True
+        )
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                _refresh_failures.inc()
+                logger.warning("keyvault: refresh of %s failed, keeping cached value: %s", name, result)
+        return {name for name in names if self._values.get(name) != before.get(name)}
+
+    async def run_refresher(
+        self,
+        stop: asyncio.Event,
+        *,
+        interval: float = SECRETS_REFRESH_SECONDS,
+        on_change: Optional[OnChange] = None,
+    ) -> None:
+        """Refresh every ``interval`` seconds until ``stop`` is set; rotated
+        names are passed to ``on_change``."""
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                changed = await self.refresh()
+                if changed:
+                    logger.info("keyvault: rotated secret(s): %s", ", ".join(sorted(changed)))
+                    if on_change is not None:
+                        await on_change(changed)
+            except Exception:
+                logger.exception("keyvault: refresh failed")
+
+
+_store: Optional[SecretStore] = None
+
+
+def get_secret_store() -> Optional[SecretStore]:
+    """The process-wide store for KEY_VAULT_URL, or None if it is unset."""
+    global _store
+    kv_url = os.getenv("KEY_VAULT_URL")
+    if not kv_url:
+        return None
+    if _store is None or _store.vault_url != kv_url:
+        _store = SecretStore(kv_url)
+    return _store
+
+
+def set_secret_store(store: Optional[SecretStore]) -> None:
+    """Install a store (tests, benchmarks); None drops the cached one."""
+    global _store
+    _store = store
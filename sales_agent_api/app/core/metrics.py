@@ -0,0 +1,255 @@
+"""In-process metrics primitives.
+
+Fixed-bucket histograms: O(log buckets) to observe, constant memory, and
+cumulative bucket counts in the shape Prometheus expects, so exporting them
+is a formatting job. Quantiles are estimated the way histogram_quantile()
+does it — linear interpolation inside the bucket the rank falls in — which
+is exact enough to tell a 5 ms stage from a 500 ms one.
+
+REGISTRY holds the labelled counters / gauges / histograms the services
+update, plus scrape-time views of the caches' stats dicts; GET /metrics
+(main.py) renders it in the Prometheus text format.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+from typing import Callable, Collection, Iterator, Optional, Sequence
+
+# Milliseconds. Spans a cache hit (<1 ms) to a slow LLM-backed compaction.
+DEFAULT_BUCKETS_MS: tuple[float, ...] = (
+    1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000,
+)
+
+
+class Histogram:
+    """Counts of observations per upper bound, plus their sum."""
+
+    __slots__ = ("bounds", "_counts", "count", "sum")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS_MS) -> None:
+        self.bounds = tuple(sorted(bounds))
+        self._counts = [0] * (len(self.bounds) + 1)  # last slot: +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """[(upper bound, observations <= bound)], ending with (inf, count)."""
+        out, running = [], 0
+        for bound, n in zip((*self.bounds, math.inf), self._counts):
+            running += n
+            out.append((bound, running))
+        return out
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated q-quantile (0 < q < 1); None before any observation."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        lower, below = 0.0, 0
+        for bound, running in self.cumulative():
+            if running >= rank:
+                if bound == math.inf:
+                    return lower  # beyond the last bound: all we know is ">= lower"
+                in_bucket = running - below
+                return lower + (bound - lower) * (rank - below) / in_bucket
+            lower, below = bound, running
+        return lower
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Labelled families + Prometheus text exposition (GET /metrics)
+# ---------------------------------------------------------------------------
+# Hand-rolled on purpose: the hot path pays one dict lookup and an add per
+# update — labels are positional tuples, no locks (one event loop), nothing
+# is formatted until a scrape asks for it.
+class Counter:
+    """Monotonic count per label tuple."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterator[tuple[str, tuple, float]]:
+        for labels, value in self._values.items():
+            yield self.name, labels, value
+
+
+class Gauge(Counter):
+    """Current level per label tuple; goes up and down."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class HistogramFamily:
+    """One Histogram per label tuple, all with the same bounds."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        bounds: Sequence[float] = DEFAULT_BUCKETS_MS,
+    ) -> None:
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.bounds = tuple(bounds)
+        self._children: dict[tuple, Histogram] = {}
+
+    def labels(self, *labels: str) -> Histogram:
+        child = self._children.get(labels)
+        if child is None:
+            child = self._children[labels] = Histogram(self.bounds)
+        return child
+
+    def observe(self, value: float, *labels: str) -> None:
+        self.labels(*labels).observe(value)
+
+    def children(self) -> dict[tuple, Histogram]:
+        return dict(self._children)
+
+    def samples(self) -> Iterator[tuple[str, tuple, float]]:
+        for labels, h in self._children.items():
+            for bound, running in h.cumulative():
+                le = "+Inf" if bound == math.inf else _format_value(bound)
+                yield f"{self.name}_bucket", (*labels, le), running
+            yield f"{self.name}_sum", labels, h.sum
+            yield f"{self.name}_count", labels, h.count
+
+
+StatsSource = Callable[[], dict[str, dict]]
+
+# The caches' stats that only ever grow (core/cache.py and friends). The rest
+# — entries, maxsize, in_flight, hit_ratio — are point-in-time values.
+CACHE_COUNTERS = frozenset({
+    "hits", "misses", "revalidations", "invalidations", "stores", "evicted",
+    "replays", "coalesced", "computed",
+})
+
+
+class Registry:
+    """Metric families plus scrape-time collectors of existing stats dicts."""
+
+    def __init__(self) -> None:
+        self._families: dict[str, object] = {}
+        self._stats: list[tuple[str, str, StatsSource, frozenset[str]]] = []
+
+    def _family(self, cls, name: str, *args, **kwargs):
+        # Idempotent: a module imported twice gets the family it registered.
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = cls(name, *args, **kwargs)
+        return family
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._family(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._family(Gauge, name, help, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        bounds: Sequence[float] = DEFAULT_BUCKETS_MS,
+    ) -> HistogramFamily:
+        return self._family(HistogramFamily, name, help, labelnames, bounds)
+
+    def register_stats(
+        self,
+        prefix: str,
+        label: str,
+        source: StatsSource,
+        counters: Collection[str] = (),
+    ) -> None:
+        """Export ``source()`` — {label value: {stat: number}} — at scrape time.
+
+        Each numeric stat becomes gauge ``<prefix>_<stat>{<label>="..."}``,
+        except the monotonic ones named in ``counters``: those become counter
+        ``<prefix>_<stat>_total``, so rate() and reset detection work on them.
+        The get_*_stats() functions the caches already have plug in as-is.
+        """
+        self._stats.append((prefix, label, source, frozenset(counters)))
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4."""
+        lines: list[str] = []
+        for family in self._families.values():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            names = family.labelnames
+            if family.kind == "histogram":
+                names = (*names, "le")
+            for sample, labels, value in family.samples():
+                lines.append(f"{sample}{_format_labels(names, labels)} {_format_value(value)}")
+
+        # Several sources may share a prefix (every cache → sales_ai_cache_*):
+        # each metric name gets ONE TYPE line with all its samples under it.
+        stats_families: dict[tuple[str, str], list[str]] = {}
+        for prefix, label, source, counters in self._stats:
+            for label_value, stats in source().items():
+                labels = _format_labels((label,), (label_value,))
+                for stat, value in stats.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        if stat in counters:
+                            name, kind = f"{prefix}_{stat}_total", "counter"
+                        else:
+                            name, kind = f"{prefix}_{stat}", "gauge"
+                        stats_families.setdefault((name, kind), []).append(
+                            f"{name}{labels} {_format_value(value)}"
+                        )
+        for (name, kind), samples in stats_families.items():
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = Registry()
@@ -0,0 +1,98 @@
+"""Per-request stage timing — Server-Timing header, log fields, histograms.
+
+The HTTP middleware (main.py) binds a StageTimer to each request; services
+mark their steps with ``with stage("lock"):`` without the timer being passed
+down — it travels in a ContextVar, which asyncio copies into the tasks
+gather_reads starts, so overlapped reads report into the same timer. A stage
+that runs more than once in a request (a batch ingest) is summed. With no
+timer bound (tests, scripts) ``stage`` only feeds the histograms.
+
+Every finished stage — raised or not — is also observed into a per-stage
+histogram (get_stage_histograms), so a lock-wait spike and a slow catalog
+query show up as different lines instead of one fat request latency.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Iterator, Optional
+
+from app.core.metrics import REGISTRY, Histogram
+
+
+class StageTimer:
+    """Stage durations of one request, in the order stages first ran."""
+
+    __slots__ = ("started", "_stages")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._stages: dict[str, list] = {}  # name → [total ms, runs]
+
+    def record(self, name: str, ms: float) -> None:
+        entry = self._stages.setdefault(name, [0.0, 0])
+        entry[0] += ms
+        entry[1] += 1
+
+    def stages(self) -> dict[str, float]:
+        """Total ms per stage. A stage that ran more than once is summed."""
+        return {name: entry[0] for name, entry in self._stages.items()}
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value: every stage plus ``total``."""
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.stages().items()]
+        parts.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(parts)
+
+    def log_fields(self) -> dict[str, float]:
+        """Flat ``<stage>_ms`` fields for structured logs."""
+        fields = {f"{name}_ms": round(ms, 1) for name, ms in self.stages().items()}
+        fields["total_ms"] = round(self.total_ms(), 1)
+        return fields
+
+
+_current: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+_stage_duration = REGISTRY.histogram(
+    "sales_ai_stage_duration_ms", "Duration of one pipeline stage, in ms.", ("stage",)
+)
+
+
+def bind_timer(timer: StageTimer) -> Token:
+    """Make ``timer`` the current request's; undo with ``unbind_timer``."""
+    return _current.set(timer)
+
+
+def unbind_timer(token: Token) -> None:
+    _current.reset(token)
+
+
+def current_timer() -> Optional[StageTimer]:
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the block as stage ``name`` of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - started) * 1000
+        _stage_duration.observe(ms, name)
+        timer = _current.get()
+        if timer is not None:
+            timer.record(name, ms)
+
+
+def get_stage_histograms() -> dict[str, Histogram]:
+    """Per-stage latency histograms (ms) since process start."""
+    return {labels[0]: h for labels, h in _stage_duration.children().items()}
+
+
+def get_stage_stats() -> dict[str, dict]:
+    """count / sum / p50 / p95 / p99 per stage, in ms."""
+    return {name: h.snapshot() for name, h in get_stage_histograms().items()}
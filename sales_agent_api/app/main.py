@@ -9,21 +9,51 @@ Authentication:
 Tenant identification:
   - X-Client-ID header (UUID) — injected into request.state.client_id
 
+Timing:
+  - Every response carries a Server-Timing header with the stages the
+    request went through (app/core/timing.py); requests that recorded any
+    stage also log them as structured fields (extra={"timing": ...})
+  - GET /metrics (no auth) — Prometheus text format: per-route latency and
+    in-flight, pool checkout wait/shape, summarizer calls, debounce skips,
+    breaker fires, stale-context 409s, cache counters (app/core/metrics.py)
+
+Startup:
+  - Nothing blocks at import. The lifespan resolves the database secrets and
+    the OpenAI key concurrently (app/core/keyvault.py), then creates the
+    engine (database.init_engine)
+
+Background work:
+  - Conversation compaction worker (app/services/compaction.py), started in
+    the lifespan unless COMPACTION_WORKER=0
+  - Key Vault refresher: re-reads cached secrets every
+    SECRETS_REFRESH_SECONDS so rotations apply without a restart
+
 Docs:
   - Enabled when ENV != "production"
 """
 from __future__ import annotations
 
+import asyncio
 import hmac
 import logging
 import os
+import time
 import uuid
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-
-from app.core.database import ping_db
+from fastapi.responses import PlainTextResponse
+
+from app.core.database import dispose_engine, init_engine, ping_db
+from app.core.keyvault import get_secret_store
+from app.core.metrics import REGISTRY
+from app.core.timing import StageTimer, bind_timer, unbind_timer
+from app.services import compaction
+from app.services.conversation_summary import (
+    close_default_summarizer,
+    rotate_default_summarizer,
+)
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -40,53 +70,119 @@ OPERATOR_TOKEN = os.getenv("SALES_AI_OPERATOR_TOKEN", "")
 
 _OPERATOR_PATH_PREFIX = "/api/v1/operator/"
 
-# Endpoints that bypass auth
-_NO_AUTH_PATHS = {"/health", "/", "/api/docs", "/openapi.json"}
+# Endpoints that bypass auth. /metrics is for the in-cluster scraper; it
+# carries counts and latencies only, never tenant data.
+_NO_AUTH_PATHS = {"/health", "/", "/api/docs", "/openapi.json", "/metrics"}
+
+_METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_requests = REGISTRY.counter(
+    "sales_ai_http_requests_total",
+    "HTTP requests by method, route template and status.",
+    ("method", "route", "status"),
+)
+_request_ms = REGISTRY.histogram(
+    "sales_ai_http_request_duration_ms",
+    "HTTP request latency by method and route template, in ms.",
+    ("method", "route"),
+)
+_in_flight = REGISTRY.gauge(
+    "sales_ai_http_requests_in_flight",
+    "Requests being served right now, by route template.",
+    ("route",),
+)
+# Paths that routed to an endpoint. Only those become route labels — a
+# scanner hitting random URLs lands in "unmatched" — so the label set stays
+# bounded by the app's routes (none of which takes path parameters).
+_known_routes: set[str] = set()
 
 
 # ---------------------------------------------------------------------------
 # Lifespan
 # ---------------------------------------------------------------------------
-def _bootstrap_openai_key() -> None:
+_OPENAI_SECRET = "openai-key"
+
+
+async def _bootstrap_openai_key() -> None:
     """Resolve OPENAI_API_KEY from Key Vault on boot if not already set.
 
     Order:
       1. OPENAI_API_KEY env var (local dev / CI)
       2. Azure Key Vault secret named 'openai-key' (production)
 
-    No-op if neither is available — conversation_summary.py degrades gracefully
-    (logs a warning and returns None instead of summarising).
+    No-op if neither is available — conversation_summary.py degrades to the
+    local extractive summarizer (extractive_summary.py).
     """
     if os.getenv("OPENAI_API_KEY"):
         logger.info("OpenAI key: loaded from environment")
         return
 
-    kv_url = os.getenv("KEY_VAULT_URL")
-    if not kv_url:
-        logger.warning("OpenAI key: not set, KEY_VAULT_URL absent — summarisation disabled")
+    store = get_secret_store()
+    if store is None:
+        logger.warning("OpenAI key: not set, KEY_VAULT_URL absent — extractive summaries only")
         return
 
     try:
-        from azure.identity import DefaultAzureCredential
-        from azure.keyvault.secrets import SecretClient
-
-        credential = DefaultAzureCredential(exclude_shared_token_cache_credential=True)
-        kv = SecretClient(vault_url=kv_url, credential=credential)
-        os.environ["OPENAI_API_KEY"] = kv.get_secret("openai-key").value
+        os.environ["OPENAI_API_KEY"] = await store.get(_OPENAI_SECRET)
         logger.info("OpenAI key: loaded from Key Vault (openai-key)")
     except Exception as exc:
         logger.warning("OpenAI key: failed to load from Key Vault: %s", exc)
 
 
+async def _on_secrets_rotated(changed: set[str]) -> None:
+    # DBPASSWORD needs nothing here: new connections read the cached value
+    # (database.init_engine); open ones stay authenticated.
+    store = get_secret_store()
+    if store is not None and _OPENAI_SECRET in changed:
+        os.environ["OPENAI_API_KEY"] = store.cached(_OPENAI_SECRET)
+        # Swaps at once; the old client closes in the background after its
+        # grace period, so the refresher loop never waits on it.
+        rotate_default_summarizer()
+
+
+async def startup() -> float:
+    """Secrets and engine, concurrently. Returns the elapsed ms."""
+    started = time.perf_counter()
+    await asyncio.gather(init_engine(), _bootstrap_openai_key())
+    return (time.perf_counter() - started) * 1000
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    _bootstrap_openai_key()
+    logger.info("Startup: secrets and engine ready in %.0f ms", await startup())
     ok = await ping_db()
     if ok:
         logger.info("Database connection: OK")
     else:
         logger.warning("Database connection: FAILED — check DATABASE_URL")
-    yield
+
+    stop = asyncio.Event()
+    tasks = []
+    store = get_secret_store()
+    if store is not None:
+        tasks.append(asyncio.create_task(
+            store.run_refresher(stop, on_change=_on_secrets_rotated), name="keyvault-refresher"
+        ))
+    # Conversation compaction queue (services/compaction.py). Every replica
+    # may run one: jobs are claimed with SKIP LOCKED.
+    if compaction.COMPACTION_WORKER:
+        tasks.append(asyncio.create_task(compaction.run_worker(stop), name="compaction-worker"))
+        logger.info("Compaction worker: started")
+    try:
+        yield
+    finally:
+        stop.set()
+        if tasks:
+            # In-flight jobs get a moment to finish; one cut short is
+            # re-claimed by another worker when its lease runs out.
+            _, running = await asyncio.wait(tasks, timeout=10)
+            for task in running:
+                task.cancel()
+        # Pooled OpenAI client behind the summarizer (and any still retiring
+        # after a key rotation) — after the worker, its main user — then the
+        # database pool.
+        await close_default_summarizer()
+        await dispose_engine()
 
 
 # ---------------------------------------------------------------------------
@@ -146,6 +242,43 @@ def create_app() -> FastAPI:
         request.state.client_id = client_id
         return await call_next(request)
 
+    # Stage timing + route metrics — registered last, so it is the outermost
+    # middleware and its numbers cover auth too.
+    @application.middleware("http")
+    async def stage_timing_middleware(request: Request, call_next):
+        path = request.url.path
+        # Routing happens inside call_next; before it, only a path seen
+        # routing earlier has a label (the first request to each shows
+        # in-flight as "unmatched").
+        in_flight_route = path if path in _known_routes else "unmatched"
+        timer = StageTimer()
+        token = bind_timer(timer)
+        _in_flight.inc(in_flight_route)
+        status_code = 500  # what the client sees if call_next raises
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            unbind_timer(token)
+            _in_flight.dec(in_flight_route)
+            if request.scope.get("route") is not None:
+                _known_routes.add(path)
+            route = path if path in _known_routes else "unmatched"
+            _request_ms.observe(timer.total_ms(), request.method, route)
+            _requests.inc(request.method, route, str(status_code))
+
+        response.headers["Server-Timing"] = timer.server_timing()
+        if timer.stages():
+            fields = timer.log_fields()
+            logger.info(
+                "timing %s %s %s",
+                request.method,
+                request.url.path,
+                " ".join(f"{name}={ms}" for name, ms in fields.items()),
+                extra={"timing": fields},
+            )
+        return response
+
     # Register routers
     from app.api.v1.ingest import router as ingest_router
     from app.api.v1.agent import router as agent_router
@@ -159,6 +292,10 @@ def create_app() -> FastAPI:
     async def health():
         return {"status": "ok"}
 
+    @application.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(REGISTRY.render(), media_type=_METRICS_CONTENT_TYPE)
+
     @application.get("/", include_in_schema=False)
     async def root():
         return {"service": "Sales AI Agent Backend", "status": "ok"}
@@ -7,6 +7,7 @@ from decimal import Decimal
 from typing import Optional
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     ForeignKey,
     Integer,
@@ -186,6 +187,9 @@ class Conversation(Base):
     )
     last_strategy_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     strategy_snapshot: Mapped[Optional[dict]] = mapped_column(JSONB)
+    # rolling summary (migration 016) + high-water mark on ingest_seq (020)
+    rolling_summary: Mapped[Optional[dict]] = mapped_column(JSONB)
+    summarized_through_seq: Mapped[Optional[int]] = mapped_column(BigInteger)
 
     client: Mapped["Client"] = relationship("Client", back_populates="conversations", foreign_keys=[client_id])
     client_user: Mapped["ClientUser"] = relationship("ClientUser", back_populates="conversations", foreign_keys=[client_user_id])
@@ -221,6 +225,11 @@ class Message(Base):
         DateTime(timezone=True), nullable=False, server_default=text("now()")
     )
     extracted_data: Mapped[Optional[dict]] = mapped_column(JSONB)
+    # Persistence order (migration 019). created_at is the sender's clock,
+    # second resolution — it cannot tell which of a burst arrived last.
+    ingest_seq: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default=text("nextval('messages_ingest_seq_seq')")
+    )
 
     conversation: Mapped["Conversation"] = relationship("Conversation", back_populates="messages", foreign_keys=[conversation_id])
 
@@ -245,3 +254,57 @@ class AuditLog(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=text("now()")
     )
+
+
+# ---------------------------------------------------------------------------
+# compaction_jobs (migration 015)
+# ---------------------------------------------------------------------------
+class CompactionJob(Base):
+    __tablename__ = "compaction_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, server_default=text("uuid_generate_v4()")
+    )
+    client_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("clients.id"), nullable=False
+    )
+    conversation_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("conversations.id"), nullable=False, unique=True
+    )
+    reason: Mapped[str] = mapped_column(String(20), nullable=False)
+    status: Mapped[str] = mapped_column(
+        String(20), nullable=False, server_default=text("'pending'")
+    )
+    attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default=text("0")
+    )
+    run_after: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+    locked_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+
+
+# ---------------------------------------------------------------------------
+# summary_cache (migration 017)
+# ---------------------------------------------------------------------------
+class SummaryCacheEntry(Base):
+    __tablename__ = "summary_cache"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    summary: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    hits: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default=text("0")
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+    last_hit_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
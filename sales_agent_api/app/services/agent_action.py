@@ -25,16 +25,22 @@ from typing import Optional
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.core import AuditLog, Client, ClientUser, Conversation, Message, Product
+from app.core.metrics import REGISTRY
+from app.models.core import AuditLog, ClientUser, Conversation, Message, Product
+from app.services.conversation_lock import lock_customer_and_conversation
 from app.services.goal_strategy import GoalStrategyEngine
 from app.services.state_machine import (
     InvalidTransitionError,
     validate_transition,
 )
+from app.services.tenant_config import get_tenant_config
 from app.services.validation import is_plausible_phone
 
 logger = logging.getLogger(__name__)
 
+# Stateless: compiled goal plans are memoized module-wide (goal_strategy.py).
+_engine = GoalStrategyEngine()
+
 # Fields from extracted_data that are persisted to conversation.extracted_context
 # so the GoalStrategyEngine can track progress across turns. These ARE the DAG
 # checkpoints — adding to this set changes close_sale behaviour.
@@ -100,6 +106,15 @@ _USER_CONFIRMATION_REQUIRES = ("full_name", "phone", "shipping_address", "shippi
 _LOOP_PREVIOUS_OUTBOUNDS = 2
 LOOP_SIDE_EFFECT = "circuit_breaker:loop_detected"
 
+_breaker_fires = REGISTRY.counter(
+    "sales_ai_circuit_breaker_fires_total",
+    "Agent turns suppressed as the 3rd identical outbound in a row.",
+)
+_stale_contexts = REGISTRY.counter(
+    "sales_ai_stale_context_total",
+    "Agent actions rejected (409) for a stale strategy_version.",
+)
+
 
 def detect_outbound_loop(
     candidate_text: str,
@@ -142,11 +157,17 @@ def _recent_outbound_stmt(client_id: uuid.UUID, conversation_id: uuid.UUID):
 def compute_context_updates(
     extracted_data: dict,
     current_context: dict,
+    *,
+    strategy_fields: frozenset[str] | set[str] = STRATEGY_FIELDS,
+    order_fields: frozenset[str] | set[str] = ORDER_FIELDS,
+    user_confirmation_requires: tuple[str, ...] = _USER_CONFIRMATION_REQUIRES,
 ) -> tuple[dict, dict, list[dict]]:
     """Decide which extracted_data fields get merged into extracted_context.
 
     Pure — no I/O. Lets the persistence decision (including DAG gates) be unit
-    tested without a session.
+    tested without a session. The keyword-only field sets default to this
+    module's; services/strategy_replay.py passes candidate ones to see what a
+    rule change would have done to past turns.
 
     Returns ``(accepted, strategy_accepted, rejections)``:
       - ``accepted``: every field to merge (ORDER_FIELDS + STRATEGY_FIELDS that
@@ -158,8 +179,8 @@ def compute_context_updates(
         their prerequisites weren't met yet, or because the LLM has no
         authority over them at all (OPERATOR_ONLY_FIELDS).
     """
-    order_updates = {k: v for k, v in extracted_data.items() if k in ORDER_FIELDS and v}
-    strategy_updates = {k: v for k, v in extracted_data.items() if k in STRATEGY_FIELDS and v}
+    order_updates = {k: v for k, v in extracted_data.items() if k in order_fields and v}
+    strategy_updates = {k: v for k, v in extracted_data.items() if k in strategy_fields and v}
     rejections: list[dict] = []
 
     # Operator-only checkpoints are dropped UNCONDITIONALLY — no gate, no
@@ -182,7 +203,7 @@ def compute_context_updates(
     # user_confirmation requires full_name + phone + shipping_address + shipping_city
     merged = {**current_context, **order_updates, **strategy_updates}
     if "user_confirmation" in strategy_updates:
-        missing = [f for f in _USER_CONFIRMATION_REQUIRES if not merged.get(f)]
+        missing = [f for f in user_confirmation_requires if not merged.get(f)]
         if missing:
             del strategy_updates["user_confirmation"]
             rejections.append({"field": "user_confirmation", "missing": missing})
@@ -260,7 +281,11 @@ async def process_agent_action(
     side_effects: list[str] = []
     now = datetime.now(timezone.utc)
 
-    # --- 1. Load conversation ------------------------------------------------
+    # --- 1. Lock + load conversation -----------------------------------------
+    # Customer row, then the conversation lock — ingest's order, so a turn,
+    # an ingest and a compaction of this customer can't deadlock
+    # (conversation_lock.py). Loaded after the locks: fresh strategy_version.
+    await lock_customer_and_conversation(session, conversation_id)
     conv_row = await session.execute(
         select(Conversation).where(
             Conversation.id == conversation_id,
@@ -275,6 +300,7 @@ async def process_agent_action(
 
     # --- 2. Stale context check ----------------------------------------------
     if conversation.strategy_version != strategy_version:
+        _stale_contexts.inc()
         raise StaleContextError(
             f"strategy_version mismatch: expected {conversation.strategy_version}, "
             f"got {strategy_version}"
@@ -304,6 +330,7 @@ async def process_agent_action(
         # If already in human_handoff, no new transition — but the identical
         # response is still suppressed (n8n doesn't cut on state yet).
         side_effects.append(LOOP_SIDE_EFFECT)
+        _breaker_fires.inc()
         session.add(
             AuditLog(
                 client_id=client_id,
@@ -402,14 +429,11 @@ async def process_agent_action(
     # ingest's 24h window would then trap the customer's next message
     # (ingest.py: state != 'closed') in a conversation the bot must not answer.
     if conversation.state == "active":
-        client_row = await session.execute(
-            select(Client).where(Client.id == client_id)
-        )
-        client = client_row.scalar_one_or_none()
-        business_rules = (client.business_rules or {}) if client else {}
+        client = await get_tenant_config(session, client_id)
+        business_rules = client.business_rules if client else {}
         collected_data = conversation.extracted_context or {}
         goal = conversation.active_goal or business_rules.get("default_goal", "close_sale")
-        directive = GoalStrategyEngine().compute(goal, collected_data, business_rules)
+        directive = _engine.compute(goal, collected_data, business_rules)
         if directive.all_complete:
             old_state = conversation.state
             await session.execute(
@@ -556,13 +580,13 @@ async def _merge_profile(
         return
 
     cu_row = await session.execute(
-        select(ClientUser).where(ClientUser.id == client_user_id)
+        select(ClientUser.profile).where(ClientUser.id == client_user_id)
     )
-    client_user = cu_row.scalar_one_or_none()
-    if client_user is None:
+    current = cu_row.one_or_none()
+    if current is None:
         return
 
-    profile = dict(client_user.profile or {})
+    profile = dict(current.profile or {})
     profile.update(updates)
 
     if payment_just_confirmed:
@@ -0,0 +1,150 @@
+"""Per-tenant product catalog snapshot — built once per catalog version.
+
+Every responding turn needs the tenant's catalog twice over: the serialized
+``product_catalog`` list n8n forwards, and the ``business_context`` text block
+rendered from it (format_business_context). The compaction also needs the
+id → name map for the summarizer prompt. All three used to be rebuilt from a
+full products query on every turn, for data that changes about once a week —
+for a 500-SKU tenant, the single biggest CPU and DB cost of a turn.
+
+A CatalogSnapshot holds all three, keyed by client_id and versioned by
+``(count(*), max(updated_at))`` over the tenant's products (trg_products_updated_at
+bumps updated_at on every edit; inserts/deletes move the count). Freshness
+follows the tenant config cache: free within CATALOG_CACHE_TTL_SECONDS,
+one aggregate probe past it, full rebuild only when the version moved.
+
+``business_context`` also depends on business_rules, so the snapshot records
+which tenant config (``clients.updated_at``) it was rendered for; a rules
+change re-renders from the cached products, with no products query.
+"""
+from __future__ import annotations
+
+import os
+import uuid
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import VersionedTTLCache
+from app.core.metrics import CACHE_COUNTERS, REGISTRY
+from app.models.core import Product
+from app.services.prompt_context import format_business_context
+from app.services.tenant_config import TenantConfig
+
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "30"))
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogSnapshot:
+    """Everything a turn derives from the tenant's products.
+
+    Shared by every reader in the process: treat the lists/dicts as read-only.
+      - ``product_catalog``: available products, by name — the ingest payload.
+      - ``product_map``: id → name for EVERY product, available or not — a
+        past conversation may have discussed a product withdrawn since.
+      - ``business_context``: format_business_context output for
+        ``rules_version``'s business_rules.
+    """
+
+    version: tuple
+    rules_version: Optional[datetime]
+    product_catalog: list[dict]
+    product_map: dict[str, str]
+    business_context: str
+
+
+catalog_snapshots: VersionedTTLCache[uuid.UUID, CatalogSnapshot] = VersionedTTLCache(
+    ttl_seconds=CATALOG_CACHE_TTL_SECONDS
+)
+
+
+async def get_catalog_snapshot(
+    session: AsyncSession,
+    tenant: TenantConfig,
+) -> CatalogSnapshot:
+    """The tenant's catalog snapshot, rendered for its current business_rules."""
+    client_id = tenant.id
+
+    async def probe():
+        row = await session.execute(
+            select(func.count(Product.id), func.max(Product.updated_at)).where(
+                Product.client_id == client_id
+            )
+        )
+        count, last_updated = row.one()
+        return (count, last_updated)
+
+    async def load():
+        rows = (
+            await session.execute(
+                select(
+                    Product.id,
+                    Product.name,
+                    Product.description,
+                    Product.sku,
+                    Product.price,
+                    Product.ai_description,
+                    Product.image_url,
+                    Product.is_available,
+                    Product.updated_at,
+                )
+                .where(Product.client_id == client_id)
+                .order_by(Product.name)
+            )
+        ).all()
+        snapshot = build_catalog_snapshot(rows, tenant)
+        return snapshot, snapshot.version
+
+    snapshot = await catalog_snapshots.get(client_id, probe=probe, load=load)
+    if snapshot.rules_version != tenant.updated_at:
+        # business_rules changed, products didn't: re-render only.
+        snapshot = replace(
+            snapshot,
+            rules_version=tenant.updated_at,
+            business_context=format_business_context(
+                tenant.business_rules, snapshot.product_catalog
+            ),
+        )
+        catalog_snapshots.put(client_id, snapshot, snapshot.version)
+    return snapshot
+
+
+def build_catalog_snapshot(rows, tenant: TenantConfig) -> CatalogSnapshot:
+    """Pure — build a snapshot from product rows (ordered by name).
+
+    The version is derived from the rows themselves, so it always describes
+    exactly the data that was serialized.
+    """
+    product_catalog = [
+        {
+            "id": str(p.id),
+            "name": p.name,
+            "description": p.description,
+            "sku": p.sku,
+            "price": float(p.price),
+            "ai_description": p.ai_description,
+            "image_url": p.image_url,
+        }
+        for p in rows
+        if p.is_available
+    ]
+    return CatalogSnapshot(
+        version=(len(rows), max((p.updated_at for p in rows), default=None)),
+        rules_version=tenant.updated_at,
+        product_catalog=product_catalog,
+        product_map={str(p.id): p.name for p in rows},
+        business_context=format_business_context(tenant.business_rules, product_catalog),
+    )
+
+
+def get_catalog_cache_stats() -> dict:
+    """Hit/miss/revalidation counters since process start."""
+    return catalog_snapshots.stats()
+
+
+REGISTRY.register_stats(
+    "sales_ai_cache", "cache", lambda: {"catalog": get_catalog_cache_stats()}, CACHE_COUNTERS
+)
@@ -0,0 +1,528 @@
+"""Background compaction queue — conversation summaries off the message path.
+
+Compaction used to be lazy: when a returning customer wrote, ingest_message
+called summarize_conversation() inside the ingest transaction and waited on
+the OpenAI round trip (1–4 s, plus its failures) before the customer's first
+message was even persisted. Now it is eager and runs here:
+
+  - a conversation moving to ``closed`` / ``human_handoff`` enqueues a job
+    (trigger, migration 015 — same transaction as the state change);
+  - conversations quiet for COMPACTION_QUIET_HOURS are enqueued by a periodic
+    sweep (``sweep_quiet``);
+  - a returning customer whose previous conversation is still unsummarized
+    enqueues it from ingest (``enqueue_compaction``, reason ``returning``).
+    Ingest does NOT wait: it seeds the new conversation from the profile as
+    it is; claim_turn reads the profile again when the turn is built, so a
+    summary that lands during the debounce window still reaches the prompt.
+
+Jobs live in ``compaction_jobs``, one row per conversation. Workers claim a
+batch with ``FOR UPDATE SKIP LOCKED`` and a lease (``locked_until``), so any
+number of API replicas / standalone workers share the queue; a job whose
+lease ran out (worker died mid-call) is claimed again. Tenants take turns
+in the claim, and each job waits for a slot of the tenant-fair summarizer
+scheduler (summary_scheduler.py) before it opens a session. A worker keeps
+up to COMPACTION_MAX_CLAIMED jobs claimed, more than the scheduler runs at
+once, so the scheduler has a queue to order and a freed slot never waits
+for the next poll. Failures back off
+exponentially and give up after COMPACTION_MAX_ATTEMPTS (status ``failed``,
+``last_error`` kept for the operator).
+
+The LLM call holds no row locks — the profile row is only UPDATEd after it
+returns — so a customer writing meanwhile never waits on the summarizer. The
+profile write commits first and the job is marked done in a second, short
+transaction: no transaction here holds both a client_users row and a job row,
+which ingest (identity upsert → enqueue) and confirm_payment (state change →
+trigger → profile merge) take in opposite orders. A crash between the two
+re-runs the job, which just rewrites the same summary.
+
+Runs inside the API process when COMPACTION_WORKER=1 (main.py lifespan), or
+standalone from sales_agent_api/:
+
+    DATABASE_URL=postgresql+asyncpg://... python -m app.services.compaction
+
+COMPACTION_MODE=inline restores the old lazy, in-ingest summarization (for a
+deployment without the worker).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from sqlalchemy import Text, and_, cast, func, literal, or_, select, true, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.metrics import REGISTRY
+from app.models.core import ClientUser, CompactionJob, Conversation
+from app.services.conversation_summary import (
+    SUMMARY_FALLBACK,
+    SummarizerLLM,
+    close_default_summarizer,
+    evict_summary_cache,
+    summarize_conversation,
+)
+from app.services.summary_scheduler import (
+    SUMMARY_SCHEDULER_CONCURRENCY,
+    FairScheduler,
+    get_summary_scheduler,
+)
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_MODE = os.getenv("COMPACTION_MODE", "queue").lower()  # "queue" | "inline"
+COMPACTION_WORKER = os.getenv("COMPACTION_WORKER", "1").lower() in ("1", "true", "yes")
+# Jobs claimed per poll.
+COMPACTION_BATCH = int(os.getenv("COMPACTION_BATCH", "4"))
+# Jobs a worker holds claimed and unfinished, running or queued for a
+# summarizer slot. Above the scheduler's cap on purpose: the surplus waits in
+# the scheduler's tenant queues, which is what it orders fairly, and a slot
+# freed by a slow LLM call goes to a job already claimed. A queued job's lease
+# keeps running, so keep COMPACTION_LEASE_SECONDS above
+# (COMPACTION_MAX_CLAIMED / SUMMARY_SCHEDULER_CONCURRENCY + 1) × the slowest
+# summary.
+COMPACTION_MAX_CLAIMED = int(
+    os.getenv("COMPACTION_MAX_CLAIMED", str(2 * SUMMARY_SCHEDULER_CONCURRENCY))
+)
+COMPACTION_POLL_SECONDS = float(os.getenv("COMPACTION_POLL_SECONDS", "2"))
+COMPACTION_LEASE_SECONDS = float(os.getenv("COMPACTION_LEASE_SECONDS", "120"))
+COMPACTION_MAX_ATTEMPTS = int(os.getenv("COMPACTION_MAX_ATTEMPTS", "5"))
+COMPACTION_QUIET_HOURS = float(os.getenv("COMPACTION_QUIET_HOURS", "24"))
+# The sweep only looks this far past the quiet threshold: anything older was
+# either swept already or is picked up when the customer returns.
+COMPACTION_SWEEP_LOOKBACK_HOURS = float(os.getenv("COMPACTION_SWEEP_LOOKBACK_HOURS", "72"))
+COMPACTION_SWEEP_SECONDS = float(os.getenv("COMPACTION_SWEEP_SECONDS", "300"))
+
+# Retry backoff: 30 s, 1 min, 2 min, ... capped at an hour.
+_BACKOFF_BASE_SECONDS = 30
+_BACKOFF_MAX_SECONDS = 3600
+
+# Job outcomes (metric label + process_job result)
+JOB_DONE = "done"
+JOB_EMPTY = "empty"            # conversation gone / no messages — nothing to summarize
+JOB_SUPERSEDED = "superseded"  # profile already holds a fresher summary
+JOB_RETRY = "retry"
+JOB_FAILED = "failed"
+
+_jobs = REGISTRY.counter(
+    "sales_ai_compaction_jobs_total",
+    "Compaction jobs finished by the worker, by outcome.",
+    ("outcome",),
+)
+_enqueued = REGISTRY.counter(
+    "sales_ai_compaction_enqueued_total",
+    "Compaction jobs enqueued from Python (the state-change trigger is not counted), by reason.",
+    ("reason",),
+)
+_lag_ms = REGISTRY.histogram(
+    "sales_ai_compaction_lag_ms",
+    "Time from a job becoming due to its summary being written, in ms.",
+    ("reason",),
+)
+
+
+class ClaimedJob(NamedTuple):
+    id: uuid.UUID
+    conversation_id: uuid.UUID
+    reason: str
+    attempts: int
+    run_after: datetime
+    client_id: Optional[uuid.UUID] = None
+
+
+def inline_compaction() -> bool:
+    """True when ingest should summarize in-line (the pre-queue behaviour)."""
+    return COMPACTION_MODE == "inline"
+
+
+def backoff(attempts: int) -> timedelta:
+    """Delay before retrying a job that has failed ``attempts`` times."""
+    seconds = _BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, _BACKOFF_MAX_SECONDS))
+
+
+# ---------------------------------------------------------------------------
+# Statements
+# ---------------------------------------------------------------------------
+def enqueue_stmt(client_id: uuid.UUID, conversation_id: uuid.UUID, reason: str):
+    """Upsert a due job for the conversation.
+
+    An existing job is reset to pending (attempts 0, due now) unless a worker
+    is running it right now — that run already reads the current messages.
+    """
+    stmt = pg_insert(CompactionJob).values(
+        client_id=client_id, conversation_id=conversation_id, reason=reason,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[CompactionJob.conversation_id],
+        set_={
+            "status": "pending",
+            "reason": stmt.excluded.reason,
+            "attempts": 0,
+            "run_after": func.now(),
+            "locked_until": None,
+            "last_error": None,
+        },
+        where=CompactionJob.status != "running",
+    )
+
+
+def claim_stmt(batch: int, lease_seconds: float):
+    """Claim up to ``batch`` due jobs — pending, or running with an expired
+    lease — and stamp a fresh lease. SKIP LOCKED: concurrent workers each get
+    a disjoint batch instead of queueing behind one another.
+
+    Tenants take turns: the oldest due job of every tenant comes before the
+    second-oldest of any, so a tenant with a backlog of thousands (a
+    broadcast) cannot fill every batch while the others wait. Each tenant's
+    candidates are locked in a LATERAL subquery — Postgres refuses FOR
+    UPDATE next to the window function that ranks them.
+    """
+    now = func.now()
+    due = or_(
+        and_(CompactionJob.status == "pending", CompactionJob.run_after <= now),
+        and_(CompactionJob.status == "running", CompactionJob.locked_until < now),
+    )
+    tenants = select(CompactionJob.client_id).where(due).distinct().subquery("tenants")
+    candidates = (
+        select(CompactionJob.id, CompactionJob.run_after)
+        .where(CompactionJob.client_id == tenants.c.client_id, due)
+        .order_by(CompactionJob.run_after)
+        .limit(batch)
+        .with_for_update(skip_locked=True)
+        .lateral("candidates")
+    )
+    turn = func.row_number().over(
+        partition_by=tenants.c.client_id, order_by=candidates.c.run_after
+    )
+    ranked = (
+        select(candidates.c.id, candidates.c.run_after, turn.label("turn"))
+        .select_from(tenants.join(candidates, true()))
+        .subquery("ranked")
+    )
+    picked = select(ranked.c.id).order_by(ranked.c.turn, ranked.c.run_after).limit(batch)
+    return (
+        update(CompactionJob)
+        .where(CompactionJob.id.in_(picked.scalar_subquery()))
+        .values(
+            status="running",
+            attempts=CompactionJob.attempts + 1,
+            locked_until=now + timedelta(seconds=lease_seconds),
+        )
+        .returning(
+            CompactionJob.id,
+            CompactionJob.conversation_id,
+            CompactionJob.reason,
+            CompactionJob.attempts,
+            CompactionJob.run_after,
+            CompactionJob.client_id,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _still_ours(job: ClaimedJob):
+    # Nobody re-enqueued or re-claimed the job since we claimed it (a state
+    # change mid-run resets it to pending: the new state gets its own run).
+    return and_(
+        CompactionJob.id == job.id,
+        CompactionJob.status == "running",
+        CompactionJob.attempts == job.attempts,
+    )
+
+
+def finish_stmt(job: ClaimedJob):
+    return (
+        update(CompactionJob)
+        .where(_still_ours(job))
+        .values(status="done", locked_until=None, last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def retry_stmt(job: ClaimedJob, error: str, max_attempts: int = COMPACTION_MAX_ATTEMPTS):
+    give_up = job.attempts >= max_attempts
+    values = {"status": "failed" if give_up else "pending", "locked_until": None, "last_error": error[:1000]}
+    if not give_up:
+        values["run_after"] = func.now() + backoff(job.attempts)
+    return (
+        update(CompactionJob)
+        .where(_still_ours(job))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def sweep_quiet_stmt(
+    quiet_hours: float = COMPACTION_QUIET_HOURS,
+    lookback_hours: float = COMPACTION_SWEEP_LOOKBACK_HOURS,
+):
+    """Enqueue conversations that went quiet, are their customer's latest,
+    and aren't already summarized in the profile. Conversations that have a
+    job (any status) are left alone — closed / handed-off ones got theirs
+    from the trigger."""
+    now = func.now()
+    quiet_since = now - timedelta(hours=quiet_hours)
+    newer = aliased(Conversation)
+    summarized_id = ClientUser.profile[("last_conversation_summary", "conversation_id")].astext
+    candidates = (
+        select(Conversation.client_id, Conversation.id, literal("quiet"))
+        .join(ClientUser, ClientUser.id == Conversation.client_user_id)
+        .where(
+            Conversation.state != "closed",
+            Conversation.last_message_at < quiet_since,
+            Conversation.last_message_at >= quiet_since - timedelta(hours=lookback_hours),
+            summarized_id.is_distinct_from(cast(Conversation.id, Text)),
+            ~select(newer.id)
+            .where(
+                newer.client_id == Conversation.client_id,
+                newer.client_user_id == Conversation.client_user_id,
+                newer.last_message_at > Conversation.last_message_at,
+            )
+            .exists(),
+        )
+    )
+    return (
+        pg_insert(CompactionJob)
+        .from_select(["client_id", "conversation_id", "reason"], candidates)
+        .on_conflict_do_nothing(index_elements=[CompactionJob.conversation_id])
+    )
+
+
+async def enqueue_compaction(
+    session: AsyncSession,
+    client_id: uuid.UUID,
+    conversation_id: uuid.UUID,
+    reason: str,
+) -> None:
+    """Queue the conversation for compaction. Part of the caller's
+    transaction: the job exists iff the caller commits."""
+    await session.execute(enqueue_stmt(client_id, conversation_id, reason))
+    _enqueued.inc(reason)
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+async def _skip_reason(session: AsyncSession, conversation_id: uuid.UUID) -> Optional[str]:
+    """Why the job needn't call the LLM, or None if it should.
+
+    Superseded: the profile already summarizes a LATER conversation of the
+    same customer (a slow or retried job must not overwrite fresher memory).
+    """
+    row = (
+        await session.execute(
+            select(Conversation.last_message_at, ClientUser.profile)
+            .join(ClientUser, ClientUser.id == Conversation.client_user_id)
+            .where(Conversation.id == conversation_id)
+        )
+    ).one_or_none()
+    if row is None:
+        return JOB_EMPTY
+    summarized = ((row.profile or {}).get("last_conversation_summary") or {}).get("conversation_id")
+    if summarized is None or str(summarized) == str(conversation_id):
+        return None
+    try:
+        summarized_id = uuid.UUID(str(summarized))
+    except ValueError:
+        return None
+    summarized_at = (
+        await session.execute(
+            select(Conversation.last_message_at).where(Conversation.id == summarized_id)
+        )
+    ).scalar_one_or_none()
+    if summarized_at is not None and summarized_at > row.last_message_at:
+        return JOB_SUPERSEDED
+    return None
+
+
+async def process_job(
+    job: ClaimedJob,
+    *,
+    llm: Optional[SummarizerLLM] = None,
+    session_factory=None,
+    max_attempts: int = COMPACTION_MAX_ATTEMPTS,
+    scheduler: Optional[FairScheduler] = None,
+) -> str:
+    """Run one claimed job to an outcome (JOB_*) and record it on the row.
+
+    The summary runs in a slot of the tenant-fair ``scheduler``
+    (summary_scheduler.py), taken before the session so a queued job holds
+    no pooled connection."""
+    factory = session_factory or _default_session_factory()
+    scheduler = scheduler or get_summary_scheduler()
+    error: Optional[str] = None
+    try:
+        async with scheduler.slot(str(job.client_id)), factory() as session:
+            outcome = await _skip_reason(session, job.conversation_id)
+            if outcome is None:
+                # Retry the LLM while attempts last; the final attempt settles
+                # for the extractive summary rather than failing the job.
+                summary = await summarize_conversation(
+                    session, job.conversation_id, llm=llm, raise_errors=True,
+                    fallback=SUMMARY_FALLBACK and job.attempts >= max_attempts,
+                )
+                outcome = JOB_DONE if summary is not None else JOB_EMPTY
+            await session.commit()
+    except Exception as exc:  # LLM, DB — retried with backoff
+        error = f"{type(exc).__name__}: {exc}"
+        outcome = JOB_FAILED if job.attempts >= max_attempts else JOB_RETRY
+        log = logger.error if outcome == JOB_FAILED else logger.warning
+        log(
+            "compaction: job %s (conversation %s, attempt %d/%d) failed — %s",
+            job.id, job.conversation_id, job.attempts, max_attempts, error,
+        )
+
+    async with factory() as session:
+        if error is None:
+            await session.execute(finish_stmt(job))
+        else:
+            await session.execute(retry_stmt(job, error, max_attempts))
+        await session.commit()
+
+    _jobs.inc(outcome)
+    if outcome == JOB_DONE:
+        lag = datetime.now(timezone.utc) - job.run_after
+        _lag_ms.observe(max(lag.total_seconds(), 0.0) * 1000, job.reason)
+    return outcome
+
+
+async def claim_jobs(
+    session_factory=None,
+    batch: int = COMPACTION_BATCH,
+    lease_seconds: float = COMPACTION_LEASE_SECONDS,
+) -> list[ClaimedJob]:
+    factory = session_factory or _default_session_factory()
+    async with factory() as session:
+        rows = (await session.execute(claim_stmt(batch, lease_seconds))).all()
+        await session.commit()
+    return [ClaimedJob(*row) for row in rows]
+
+
+async def sweep_quiet(session_factory=None) -> int:
+    """Enqueue quiet conversations; returns how many jobs were created."""
+    factory = session_factory or _default_session_factory()
+    async with factory() as session:
+        result = await session.execute(sweep_quiet_stmt())
+        await session.commit()
+    count = max(result.rowcount or 0, 0)
+    if count:
+        _enqueued.inc("quiet", amount=count)
+        logger.info("compaction: %d quiet conversation(s) enqueued", count)
+    return count
+
+
+async def sweep_summary_cache(session_factory=None) -> int:
+    """Evict stale summary_cache entries (conversation_summary.py)."""
+    factory = session_factory or _default_session_factory()
+    async with factory() as session:
+        removed = await evict_summary_cache(session)
+        await session.commit()
+    if removed:
+        logger.info("compaction: %d summary cache entr(y/ies) evicted", removed)
+    return removed
+
+
+async def run_worker(
+    stop: asyncio.Event,
+    *,
+    llm: Optional[SummarizerLLM] = None,
+    session_factory=None,
+    poll_seconds: float = COMPACTION_POLL_SECONDS,
+    sweep_seconds: float = COMPACTION_SWEEP_SECONDS,
+    scheduler: Optional[FairScheduler] = None,
+    max_claimed: int = COMPACTION_MAX_CLAIMED,
+) -> None:
+    """Poll the queue until ``stop`` is set.
+
+    Every claimed job runs as its own task, so a slow LLM call holds its
+    scheduler slot and nothing else: the worker claims again as soon as it
+    holds fewer than ``max_claimed`` jobs. A full claim polls again at once;
+    with ``max_claimed`` jobs held the worker waits for one to finish;
+    otherwise it sleeps ``poll_seconds``. DB errors are logged and retried on
+    the next poll — the loop never dies with the database. On ``stop`` the
+    jobs already claimed are run to an outcome.
+    """
+    scheduler = scheduler or get_summary_scheduler()
+    max_claimed = max(1, max_claimed)
+    running: set[asyncio.Task] = set()
+    next_sweep = 0.0
+    try:
+        while not stop.is_set():
+            wanted = min(COMPACTION_BATCH, max_claimed - len(running))
+            claimed = 0
+            if wanted > 0:
+                try:
+                    if time.monotonic() >= next_sweep:
+                        next_sweep = time.monotonic() + sweep_seconds
+                        await sweep_quiet(session_factory)
+                        await sweep_summary_cache(session_factory)
+                    jobs = await claim_jobs(session_factory, wanted)
+                except Exception:
+                    logger.exception("compaction: worker poll failed")
+                    jobs = []
+                for job in jobs:
+                    task = asyncio.create_task(
+                        process_job(
+                            job, llm=llm, session_factory=session_factory, scheduler=scheduler
+                        ),
+                        name=f"compaction-job-{job.id}",
+                    )
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                claimed = len(jobs)
+                if claimed == wanted:
+                    continue
+            # Full: wake when a job frees room. Queue drained: wake to poll.
+            stopped = asyncio.ensure_future(stop.wait())
+            await asyncio.wait(
+                {stopped, *running} if wanted <= 0 else {stopped},
+                timeout=poll_seconds,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            stopped.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+    finally:
+        for task in running:
+            task.cancel()
+
+
+def _default_session_factory():
+    from app.core.database import AsyncSessionLocal
+
+    return AsyncSessionLocal
+
+
+def main() -> int:
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+
+    async def go() -> None:
+        from app.core.database import dispose_engine, init_engine
+
+        await init_engine()
+        stop = asyncio.Event()
+        try:
+            await run_worker(stop)
+        finally:
+            await close_default_summarizer()
+            await dispose_engine()
+
+    try:
+        asyncio.run(go())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
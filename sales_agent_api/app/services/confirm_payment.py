@@ -29,6 +29,7 @@ from app.services.agent_action import (
     _fetch_product_price,
     _merge_profile,
 )
+from app.services.conversation_lock import lock_customer_and_conversation
 from app.services.state_machine import validate_transition
 
 logger = logging.getLogger(__name__)
@@ -103,6 +104,9 @@ async def confirm_payment(
 
     Returns dict with: already_confirmed, new_state, side_effects.
     """
+    # Same lock order as ingest and the agent turn (conversation_lock.py):
+    # this writes the conversation AND the customer's profile.
+    await lock_customer_and_conversation(session, conversation_id)
     conv_row = await session.execute(
         select(Conversation).where(
             Conversation.id == conversation_id,
@@ -0,0 +1,65 @@
+"""Lock order for the rows of one conversation.
+
+Several transactions write the same customer's rows:
+
+  - ingest          client_users (identity upsert) → advisory lock →
+                    conversations (counters), messages (inbound)
+  - claim_turn      advisory lock → conversations (strategy state)
+  - agent turn      client_users → advisory lock → conversations,
+                    messages (outbound), client_users (profile merge)
+  - confirm_payment client_users → advisory lock → conversations,
+                    client_users (sale record)
+  - compaction      client_users (profile) → conversations (rolling summary)
+
+Every writer takes them in the SAME order — customer row, then the
+conversation's advisory lock, then the conversation row — so two of them
+never wait on each other in a cycle. Taking the advisory lock before the
+customer row (or the conversation row before the customer row) is a deadlock
+with a concurrent ingest: Postgres aborts one of the two transactions.
+
+Every message INSERT also happens under the advisory lock, so within a
+conversation ``messages.ingest_seq`` (migration 019) is commit order.
+"""
+from __future__ import annotations
+
+import hashlib
+import uuid
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.core import ClientUser, Conversation
+
+
+def conversation_lock_key(conversation_id: uuid.UUID) -> int:
+    """sha1(id) mod 2^63. Mirrored by conversation_lock_key() in SQL (013)."""
+    return int(hashlib.sha1(str(conversation_id).encode()).hexdigest(), 16) % (2**63)
+
+
+async def lock_conversation(session: AsyncSession, conversation_id: uuid.UUID) -> None:
+    """Transaction-scoped advisory lock serializing work on one conversation."""
+    await session.execute(
+        text("SELECT pg_advisory_xact_lock(:lock_key)"),
+        {"lock_key": conversation_lock_key(conversation_id)},
+    )
+
+
+async def lock_customer_and_conversation(
+    session: AsyncSession,
+    conversation_id: uuid.UUID,
+) -> None:
+    """For writers that touch both the customer and the conversation: the
+    conversation's client_users row first, then its advisory lock — the
+    order ingest takes them in. Take it BEFORE reading the conversation, so
+    the read sees every writer that finished ahead of us."""
+    await session.execute(
+        select(ClientUser.id)
+        .where(
+            ClientUser.id
+            == select(Conversation.client_user_id)
+            .where(Conversation.id == conversation_id)
+            .scalar_subquery()
+        )
+        .with_for_update()
+    )
+    await lock_conversation(session, conversation_id)
@@ -13,36 +13,83 @@ Contract:
   summarize_conversation(session, conversation_id, llm=None) -> dict | None
 
   - Returns the summary dict that was written to profile.last_conversation_summary,
-    or None if the conversation was empty / OPENAI_API_KEY missing / LLM failed.
+    or None if the conversation was empty (or, with fallback off, the key is
+    missing / the LLM failed).
   - The DB write is included; caller controls commit.
-  - `llm` is injectable for tests; default uses OpenAI gpt-4o-mini.
+  - `llm` is injectable for tests; default is the process-wide
+    OpenAISummarizer (pooled client, gpt-4o-mini).
+  - Incremental: each call sends the conversation's previous summary plus
+    the messages since it (high-water mark, migrations 016/020), chunked to
+    SUMMARY_TRANSCRIPT_TOKEN_BUDGET; rows are streamed and a delta over
+    SUMMARY_TRANSCRIPT_MAX_TOKENS keeps only its head and tail.
+  - Each LLM call is first looked up in summary_cache (migration 017) by a
+    hash of its exact prompt; an unchanged prompt costs no call.
+  - `raise_errors=True` re-raises the LLM failure (still counted) instead of
+    returning None — the compaction worker (compaction.py) retries on it.
+  - `fallback=True` (SUMMARY_FALLBACK) answers a failed or keyless LLM call
+    with the local extractive summary (extractive_summary.py) instead; it
+    takes precedence over `raise_errors`.
+  - SUMMARY_FIRST_PASS: a first conversation the extractive summary finds
+    trivial (no product, objection or intent) keeps it and skips the LLM.
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import logging
 import os
+import random
+import time
 import uuid
-from datetime import datetime, timezone
-from typing import Any, Awaitable, Callable, Optional, Protocol
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, NamedTuple, Optional, Protocol, Sequence
 
-from sqlalchemy import select, update
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.core import ClientUser, Conversation, Message, Product
+from app.core.metrics import CACHE_COUNTERS, REGISTRY
+from app.models.core import ClientUser, Conversation, Message, SummaryCacheEntry
+from app.services.catalog import get_catalog_snapshot
+from app.services.extractive_summary import (
+    EXTRACTIVE_MODEL,
+    extractive_summary,
+    worth_an_llm_summary,
+)
+from app.services.tenant_config import get_tenant_config
 
 logger = logging.getLogger(__name__)
 
-# Running count of swallowed summarisation failures since process start. The
-# compaction is best-effort (it must never break a chat turn), but a silent
-# failure means the business memory dies quietly (DEUDA #3). Until real metrics
-# exist, this lets ops grep/inspect how often it's failing.
-_summary_failure_count = 0
+# Swallowed summarisation failures since process start, by exception type.
+# The compaction is best-effort (it must never break a chat turn), but a
+# silent failure means the business memory dies quietly (DEUDA #3) — so it is
+# counted, exported on /metrics, and alertable.
+_summary_failures = REGISTRY.counter(
+    "sales_ai_summarizer_failures_total",
+    "Summarizer LLM calls that failed and were swallowed.",
+    ("error",),
+)
+_summary_latency = REGISTRY.histogram(
+    "sales_ai_summarizer_call_ms",
+    "Summarizer LLM call latency, in ms.",
+    ("outcome",),
+)
+
+
+# Summaries written by the local extractive summarizer instead of the LLM,
+# by why: no_key, llm_failed, first_pass.
+_extractive_used = REGISTRY.counter(
+    "sales_ai_summarizer_extractive_total",
+    "Summaries produced by the extractive summarizer instead of the LLM, by reason.",
+    ("reason",),
+)
 
 
 def get_summary_failure_count() -> int:
     """Number of summarisation failures swallowed since process start."""
-    return _summary_failure_count
+    return int(sum(value for _, _, value in _summary_failures.samples()))
 
 
 # ---------------------------------------------------------------------------
@@ -150,27 +197,195 @@ class SummarizerLLM(Protocol):
 
 _DEFAULT_MODEL = "gpt-4o-mini"
 
+# Default OpenAI caller (OpenAISummarizer) knobs.
+SUMMARY_TIMEOUT_SECONDS = float(os.getenv("SUMMARY_TIMEOUT_SECONDS", "30"))
+# Calls in flight per process; the rest queue on the semaphore.
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+# Retries after the first attempt, on transient errors only.
+SUMMARY_MAX_RETRIES = int(os.getenv("SUMMARY_MAX_RETRIES", "2"))
+
+# Hard cap on the transcript part of one summarizer prompt, in estimated
+# tokens (estimate_tokens). A delta bigger than this is folded in several
+# calls, each carrying the summary so far.
+SUMMARY_TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("SUMMARY_TRANSCRIPT_TOKEN_BUDGET", "3000"))
+# Per-message cap, in characters, before the budget applies.
+_MESSAGE_CHARS_MAX = 500
+# Hard cap on the whole transcript of one compaction, in estimated tokens.
+# A longer delta (a bot loop, spam) keeps its head and tail and the middle
+# is elided (TranscriptWindow) — memory and prompt size stay bounded.
+SUMMARY_TRANSCRIPT_MAX_TOKENS = int(os.getenv("SUMMARY_TRANSCRIPT_MAX_TOKENS", "12000"))
+# Share of that cap spent on the head (what the customer came for); the rest
+# goes to the tail (how it ended).
+_HEAD_SHARE = 0.25
+# Rows fetched per round trip from the server-side cursor.
+_STREAM_ROWS = 200
+
+# Content-addressed summary cache (summary_cache, migration 017).
+SUMMARY_CACHE = os.getenv("SUMMARY_CACHE", "1").lower() in ("1", "true", "yes")
+SUMMARY_CACHE_TTL_DAYS = float(os.getenv("SUMMARY_CACHE_TTL_DAYS", "30"))
+SUMMARY_CACHE_MAX_ROWS = int(os.getenv("SUMMARY_CACHE_MAX_ROWS", "50000"))
+
+# Local extractive summarizer (extractive_summary.py): fallback when the LLM
+# is unavailable, and first pass that spares the LLM trivial conversations.
+SUMMARY_FALLBACK = os.getenv("SUMMARY_FALLBACK", "1").lower() in ("1", "true", "yes")
+SUMMARY_FIRST_PASS = os.getenv("SUMMARY_FIRST_PASS", "1").lower() in ("1", "true", "yes")
+
+_summary_retries = REGISTRY.counter(
+    "sales_ai_summarizer_retries_total",
+    "Summarizer LLM calls retried after a transient error, by exception type.",
+    ("error",),
+)
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Connection errors, timeouts, 429 and 5xx are worth another try; a 4xx
+    (bad key, bad schema) fails the same way every time."""
+    import openai  # noqa: WPS433 — lazy import is intentional
+
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True  # APITimeoutError is an APIConnectionError
+    return isinstance(exc, openai.APIStatusError) and exc.status_code in (408, 409)
+
+
+class OpenAISummarizer:
+    """The default SummarizerLLM: one long-lived AsyncOpenAI client per
+    process, so calls reuse its connection pool (and TLS sessions) instead of
+    building a client per summary.
+
+    - ``timeout`` bounds each HTTP attempt; the SDK's own retries are off.
+    - At most ``max_concurrency`` calls are in flight; the rest wait on a
+      semaphore. A call keeps its slot while it backs off, so a 429 slows the
+      whole process down instead of piling more requests onto the limit.
+    - Transient errors (_is_retryable) are retried up to ``max_retries``
+      times with full-jitter exponential backoff.
+
+    The client is built on first call (OPENAI_API_KEY may only be resolved
+    in the lifespan) and released by ``aclose()`` — main.py's lifespan does
+    it on shutdown. ``client`` injects a ready-made one (tests).
+    """
 
-async def _openai_summarizer(system_prompt: str, user_prompt: str) -> dict:
-    """Default LLM caller. Lazy-imports openai so tests don't need the package."""
-    from openai import AsyncOpenAI  # noqa: WPS433 — lazy import is intentional
+    def __init__(
+        self,
+        *,
+        model: Optional[str] = None,
+        timeout: float = SUMMARY_TIMEOUT_SECONDS,
+        max_concurrency: int = SUMMARY_MAX_CONCURRENCY,
+        max_retries: int = SUMMARY_MAX_RETRIES,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        client: Any = None,
+    ) -> None:
+        self.model = model or os.getenv("SUMMARY_MODEL", _DEFAULT_MODEL)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._client = client
+        self._owns_client = client is None
+        self._gate = asyncio.Semaphore(max_concurrency)
+
+    def _get_client(self) -> Any:
+        if self._client is None:
+            from openai import AsyncOpenAI  # noqa: WPS433 — lazy import is intentional
+
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY is not set")
+            self._client = AsyncOpenAI(api_key=api_key, timeout=self.timeout, max_retries=0)
+        return self._client
+
+    def backoff(self, attempt: int) -> float:
+        """Sleep before retry number ``attempt + 1``: uniform in
+        [0, min(backoff_max, backoff_base · 2^attempt)]."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY is not set")
+    async def __call__(self, system_prompt: str, user_prompt: str) -> dict:
+        async with self._gate:
+            client = self._get_client()
+            attempt = 0
+            while True:
+                try:
+                    response = await client.chat.completions.create(
+                        model=self.model,
+                        temperature=0.2,
+                        response_format={"type": "json_schema", "json_schema": SUMMARY_SCHEMA},
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt},
+                        ],
+                    )
+                    break
+                except Exception as exc:
+                    if attempt >= self.max_retries or not _is_retryable(exc):
+                        raise
+                    delay = self.backoff(attempt)
+                    attempt += 1
+                    _summary_retries.inc(type(exc).__name__)
+                    logger.warning(
+                        "summarizer: %s, retry %d/%d in %.2f s",
+                        type(exc).__name__, attempt, self.max_retries, delay,
+                    )
+                    await asyncio.sleep(delay)
+        raw = response.choices[0].message.content or "{}"
+        return json.loads(raw)
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None and self._owns_client:
+            await client.close()
+
+
+_default_summarizer: Optional[OpenAISummarizer] = None
+# Summarizers replaced by a key rotation, each with the task that closes it
+# once its grace period is over.
+_retiring: dict[asyncio.Task, OpenAISummarizer] = {}
+
+
+def get_default_summarizer() -> OpenAISummarizer:
+    """The process-wide OpenAISummarizer used when no ``llm`` is injected."""
+    global _default_summarizer
+    if _default_summarizer is None:
+        _default_summarizer = OpenAISummarizer()
+    return _default_summarizer
+
+
+async def close_default_summarizer() -> None:
+    """Release the default client's connections (lifespan shutdown, CLIs),
+    and at once those of summarizers still waiting out a rotation's grace
+    period. A later call builds a fresh one."""
+    global _default_summarizer
+    summarizer, _default_summarizer = _default_summarizer, None
+    retiring = list(_retiring.items())
+    for task, _ in retiring:
+        task.cancel()
+    await asyncio.gather(*(task for task, _ in retiring), return_exceptions=True)
+    for _, old in retiring:
+        await old.aclose()  # idempotent: a no-op if the task got to it
+    if summarizer is not None:
+        await summarizer.aclose()
+
+
+def rotate_default_summarizer(
+    grace_seconds: float = SUMMARY_TIMEOUT_SECONDS * (SUMMARY_MAX_RETRIES + 1),
+) -> Optional[asyncio.Task]:
+    """OPENAI_API_KEY changed (Key Vault rotation): later calls get a client
+    built with the new key, right away. The old one is closed by a background
+    task once the calls already on it have had ``grace_seconds`` to finish —
+    the caller does not wait for it; close_default_summarizer cuts it short
+    on shutdown. Returns that task (None if no client was built yet)."""
+    global _default_summarizer
+    summarizer, _default_summarizer = _default_summarizer, None
+    if summarizer is None:
+        return None
 
-    client = AsyncOpenAI(api_key=api_key)
-    response = await client.chat.completions.create(
-        model=os.getenv("SUMMARY_MODEL", _DEFAULT_MODEL),
-        temperature=0.2,
-        response_format={"type": "json_schema", "json_schema": SUMMARY_SCHEMA},
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-    )
-    raw = response.choices[0].message.content or "{}"
-    return json.loads(raw)
+    async def close_after_grace() -> None:
+        await asyncio.sleep(grace_seconds)
+        await summarizer.aclose()
+
+    task = asyncio.create_task(close_after_grace(), name="summarizer-retire")
+    _retiring[task] = summarizer
+    task.add_done_callback(lambda done: _retiring.pop(done, None))
+    return task
 
 
 # ---------------------------------------------------------------------------
@@ -181,11 +396,27 @@ async def summarize_conversation(
     conversation_id: uuid.UUID,
     *,
     llm: Optional[SummarizerLLM] = None,
+    raise_errors: bool = False,
+    fallback: bool = SUMMARY_FALLBACK,
 ) -> Optional[dict]:
     """Generate a structured summary of a conversation and persist it to the
     client_user's profile. Returns the persisted summary dict or None if it
     couldn't be generated.
 
+    Incremental: the conversation keeps its last summary and a high-water
+    mark (migration 016), so only messages past the mark are sent, together
+    with the previous summary. The delta is cut into chunks of at most
+    SUMMARY_TRANSCRIPT_TOKEN_BUDGET estimated tokens and folded one call per
+    chunk. No new messages → the stored summary is reused without a call.
+    Rows are streamed, and a delta over SUMMARY_TRANSCRIPT_MAX_TOKENS keeps
+    its head and tail with the middle elided.
+
+    The extractive summarizer stands in for the LLM on trivial first
+    conversations (SUMMARY_FIRST_PASS) and, with ``fallback``, when the key
+    is missing or the LLM fails; its summaries carry ``summarizer:
+    "extractive"``. A fallback summary only reaches the profile: the rolling
+    summary and the mark are left as they were, for the LLM to retry.
+
     Safe to call repeatedly — overwrites profile.last_conversation_summary
     with the freshest take for the given conversation.
     """
@@ -197,53 +428,354 @@ async def summarize_conversation(
         logger.warning("summarize_conversation: conversation %s not found", conversation_id)
         return None
 
-    msgs_row = await session.execute(
-        select(Message)
+    previous = conversation.rolling_summary or None
+    # Only what the prompt reads: no identity map, no AI metadata columns.
+    # Ordered and marked by ingest_seq — persistence order (migration 019).
+    # created_at is the sender's clock: a late WhatsApp delivery or a batch
+    # flush stores a message dated before the mark, and a mark on it would
+    # skip that message forever. Every message INSERT holds the conversation
+    # lock (conversation_lock.py), so a committed seq has no uncommitted
+    # lower one behind it.
+    stmt = (
+        select(Message.direction, Message.content, Message.ingest_seq)
         .where(Message.conversation_id == conversation_id)
-        .order_by(Message.created_at.asc())
+        .order_by(Message.ingest_seq.asc())
     )
-    messages: list[Message] = list(msgs_row.scalars().all())
+    if previous is not None and conversation.summarized_through_seq is not None:
+        stmt = stmt.where(Message.ingest_seq > conversation.summarized_through_seq)
+    # Streamed through a server-side cursor into a bounded window: a
+    # 5 000-message conversation costs the memory of its head and tail only.
+    window = TranscriptWindow(SUMMARY_TRANSCRIPT_MAX_TOKENS)
+    rows = await session.stream(stmt.execution_options(yield_per=_STREAM_ROWS))
+    async for row in rows:
+        window.add(row)
+    messages = window.messages()
     if not messages:
+        if previous is not None:
+            # Nothing new since the last compaction: it is still current.
+            await _persist_to_profile(
+                session, client_user_id=conversation.client_user_id, summary=previous
+            )
+            return previous
         logger.info("summarize_conversation: no messages for %s, skipping", conversation_id)
         return None
 
-    products_row = await session.execute(
-        select(Product).where(Product.client_id == conversation.client_id)
+    # Catalog snapshot is shared with ingest (catalog.py) — normally a cache hit.
+    tenant = await get_tenant_config(session, conversation.client_id)
+    product_map = (
+        (await get_catalog_snapshot(session, tenant)).product_map if tenant else {}
     )
-    product_map = {str(p.id): p.name for p in products_row.scalars().all()}
-
-    system_prompt = _build_system_prompt(product_map)
-    user_prompt = _build_user_prompt(conversation, messages, product_map)
-
-    summarizer = llm or _openai_summarizer
-    try:
-        summary = await summarizer(system_prompt, user_prompt)
-    except Exception as exc:  # network, JSON, missing key — never break the caller
-        # Best-effort: we still swallow so the chat turn survives, but the
-        # failure must be OBSERVABLE — error level, exception type, stack trace,
-        # and a running counter — instead of a warning nobody reads (DEUDA #3).
-        global _summary_failure_count
-        _summary_failure_count += 1
-        logger.error(
-            "summarize_conversation: LLM call FAILED for %s "
-            "(failure #%d this process) — %s: %s",
-            conversation_id, _summary_failure_count, type(exc).__name__, exc,
-            exc_info=True,
-        )
-        return None
+
+    summary: Optional[dict] = None
+    # A stand-in for an LLM summary we could not get: it reaches the profile,
+    # but not the conversation's rolling summary and mark.
+    stand_in = False
+    if SUMMARY_FIRST_PASS and previous is None:
+        draft = _extractive_draft(conversation, messages, product_map, previous)
+        if not worth_an_llm_summary(draft):
+            summary = _extractive_result(draft, "first_pass")
+    if summary is None and fallback and llm is None and not os.getenv("OPENAI_API_KEY"):
+        draft = _extractive_draft(conversation, messages, product_map, previous)
+        summary = _extractive_result(draft, "no_key")
+        stand_in = True
+    if summary is None:
+        try:
+            summary = await _fold_with_llm(
+                session, llm or get_default_summarizer(),
+                _build_system_prompt(product_map), conversation, messages, product_map, previous,
+            )
+        except Exception as exc:  # network, JSON, missing key — never break the caller
+            # Best-effort: we still swallow so the chat turn survives, but the
+            # failure must be OBSERVABLE — error level, exception type, stack trace,
+            # and a running counter — instead of a warning nobody reads (DEUDA #3).
+            _summary_failures.inc(type(exc).__name__)
+            logger.error(
+                "summarize_conversation: LLM call FAILED for %s "
+                "(failure #%d this process) — %s: %s",
+                conversation_id, get_summary_failure_count(), type(exc).__name__, exc,
+                exc_info=True,
+            )
+            if not fallback:
+                if raise_errors:
+                    raise
+                return None
+            # The memory survives with less nuance. The mark stays put (see
+            # below), so the next compaction of this conversation sends this
+            # same delta to the LLM again.
+            draft = _extractive_draft(conversation, messages, product_map, previous)
+            summary = _extractive_result(draft, "llm_failed")
+            stand_in = True
 
     # Stamp metadata the LLM doesn't own
     summary["conversation_id"] = str(conversation_id)
     summary["summarized_at"] = datetime.now(timezone.utc).isoformat()
 
+    # Profile first, then the conversation: customer row before conversation
+    # row, the order every writer follows (conversation_lock.py) — the agent
+    # turn and confirm_payment lock the customer row up front for it. No
+    # advisory lock: the LLM call above must not hold the customer's ingest.
     await _persist_to_profile(
         session,
         client_user_id=conversation.client_user_id,
         summary=summary,
     )
+    if stand_in:
+        # Folding the stand-in into rolling_summary and advancing the mark
+        # would mean this delta never reaches the LLM: the next run would only
+        # send what came after it.
+        return summary
+    last = window.last
+    await session.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(
+            rolling_summary=summary,
+            summarized_through_seq=last.ingest_seq,
+        )
+    )
+    return summary
+
+
+async def _fold_with_llm(
+    session: AsyncSession,
+    summarizer: SummarizerLLM,
+    system_prompt: str,
+    conversation: Conversation,
+    messages: Sequence,
+    product_map: dict[str, str],
+    previous: Optional[dict],
+) -> dict:
+    """Fold the delta into ``previous`` one budgeted chunk per call, each call
+    looked up in summary_cache first. Raises whatever the LLM raises."""
+    model = _summarizer_model(summarizer)
+    summary = previous
+    for chunk in chunk_transcript(messages, SUMMARY_TRANSCRIPT_TOKEN_BUDGET):
+        user_prompt = _build_user_prompt(conversation, chunk, product_map, previous=summary)
+        key = summary_cache_key(model, system_prompt, user_prompt) if SUMMARY_CACHE else None
+        cached = await _cache_get(session, key) if key else None
+        if cached is not None:
+            summary = cached
+            continue
+        started = time.perf_counter()
+        try:
+            summary = await summarizer(system_prompt, user_prompt)
+        except Exception:
+            _summary_latency.observe((time.perf_counter() - started) * 1000, "error")
+            raise
+        _summary_latency.observe((time.perf_counter() - started) * 1000, "ok")
+        if key:
+            await _cache_put(session, key, summary)
     return summary
 
 
+def _extractive_draft(
+    conversation: Conversation,
+    messages: Sequence,
+    product_map: dict[str, str],
+    previous: Optional[dict],
+) -> dict:
+    """The extractive summary of the whole delta, from the conversation's own
+    fields — never through the LLM prompt text, so the fallback cannot break
+    on a template change or on what an extracted value contains."""
+    said = [m for m in messages if not isinstance(m, Elided)]
+    return extractive_summary(
+        state=conversation.state,
+        checkpoint=conversation.current_checkpoint,
+        progress_pct=conversation.progress_pct or 0,
+        extracted=dict(conversation.extracted_context or {}),
+        inbound=[m.content or "" for m in said if m.direction == "inbound"],
+        outbound=[m.content or "" for m in said if m.direction == "outbound"],
+        product_map=product_map,
+        previous=previous,
+    )
+
+
+def _extractive_result(draft: dict, reason: str) -> dict:
+    _extractive_used.inc(reason)
+    draft["summarizer"] = EXTRACTIVE_MODEL
+    return draft
+
+
+# ---------------------------------------------------------------------------
+# Summary cache — keyed by the exact prompt, so it never needs invalidating
+# ---------------------------------------------------------------------------
+_SCHEMA_DIGEST = hashlib.sha256(json.dumps(SUMMARY_SCHEMA, sort_keys=True).encode()).hexdigest()
+
+_cache_stats = {"hits": 0, "misses": 0, "stores": 0, "evicted": 0}
+
+
+def _summarizer_model(summarizer: SummarizerLLM) -> str:
+    """What the cache key records about the summarizer: the model name if it
+    has one (OpenAISummarizer), else the callable's name."""
+    return (
+        getattr(summarizer, "model", None)
+        or getattr(summarizer, "__qualname__", None)
+        or type(summarizer).__qualname__
+    )
+
+
+def summary_cache_key(model: str, system_prompt: str, user_prompt: str) -> str:
+    """sha256 over everything that determines the LLM's answer: the output
+    schema, the model and both prompts (catalog, transcript, extracted
+    context, previous summary). Conversation and customer ids are not in
+    the prompts, so identical transcripts share an entry."""
+    digest = hashlib.sha256()
+    for part in (_SCHEMA_DIGEST, model, system_prompt, user_prompt):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def _cache_get(session: AsyncSession, key: str) -> Optional[dict]:
+    # Lookup and hit bookkeeping in one round trip.
+    row = await session.execute(
+        update(SummaryCacheEntry)
+        .where(SummaryCacheEntry.key == key)
+        .values(hits=SummaryCacheEntry.hits + 1, last_hit_at=func.now())
+        .returning(SummaryCacheEntry.summary)
+    )
+    summary = row.scalar_one_or_none()
+    _cache_stats["hits" if summary is not None else "misses"] += 1
+    return dict(summary) if summary is not None else None
+
+
+async def _cache_put(session: AsyncSession, key: str, summary: dict) -> None:
+    await session.execute(
+        pg_insert(SummaryCacheEntry)
+        .values(key=key, summary=dict(summary))
+        .on_conflict_do_nothing(index_elements=[SummaryCacheEntry.key])
+    )
+    _cache_stats["stores"] += 1
+
+
+async def evict_summary_cache(
+    session: AsyncSession,
+    ttl_days: float = SUMMARY_CACHE_TTL_DAYS,
+    max_rows: int = SUMMARY_CACHE_MAX_ROWS,
+) -> int:
+    """Drop entries unused for ``ttl_days``, then the least recently used
+    beyond ``max_rows``. Returns how many were removed; caller commits."""
+    expired = await session.execute(
+        delete(SummaryCacheEntry).where(
+            SummaryCacheEntry.last_hit_at < func.now() - timedelta(days=ttl_days)
+        )
+    )
+    overflow = (
+        select(SummaryCacheEntry.key)
+        .order_by(SummaryCacheEntry.last_hit_at.desc())
+        .offset(max_rows)
+        .scalar_subquery()
+    )
+    trimmed = await session.execute(
+        delete(SummaryCacheEntry).where(SummaryCacheEntry.key.in_(overflow))
+    )
+    removed = max(expired.rowcount or 0, 0) + max(trimmed.rowcount or 0, 0)
+    _cache_stats["evicted"] += removed
+    return removed
+
+
+def get_summary_cache_stats() -> dict:
+    """Hit/miss/store/eviction counters since process start."""
+    lookups = _cache_stats["hits"] + _cache_stats["misses"]
+    return {**_cache_stats, "hit_ratio": _cache_stats["hits"] / lookups if lookups else 0.0}
+
+
+REGISTRY.register_stats(
+    "sales_ai_cache", "cache", lambda: {"summaries": get_summary_cache_stats()}, CACHE_COUNTERS
+)
+
+
+# ---------------------------------------------------------------------------
+# Transcript budget
+# ---------------------------------------------------------------------------
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for es/en text). Cheap and
+    dependency-free; only used to size prompts, never to bill."""
+    return len(text) // 4 + 1
+
+
+class Elided(NamedTuple):
+    """Stands in the transcript for the messages TranscriptWindow dropped."""
+
+    count: int
+
+
+def _message_line(message) -> str:
+    if isinstance(message, Elided):
+        return f"  [… {message.count} mensajes omitidos …]"
+    actor = "CLIENTE" if message.direction == "inbound" else "AGENTE"
+    content = (message.content or "").strip().replace("\n", " ")
+    if len(content) > _MESSAGE_CHARS_MAX:
+        content = content[:_MESSAGE_CHARS_MAX] + "…"
+    return f"  [{actor}] {content}"
+
+
+class TranscriptWindow:
+    """Head and tail of a message stream within ``max_tokens`` estimated
+    tokens; the middle is counted, not kept.
+
+    The head fills first (``_HEAD_SHARE`` of the budget) and closes at the
+    first message that does not fit; every later message joins the tail,
+    which drops its oldest messages to stay within the rest. Memory is
+    bounded by the budget, never by the conversation's length. The last
+    message is always kept (it is the high-water mark).
+    """
+
+    def __init__(self, max_tokens: int) -> None:
+        self.head_budget = int(max_tokens * _HEAD_SHARE)
+        self.tail_budget = max_tokens - self.head_budget
+        self.head: list = []
+        self.tail: deque = deque()
+        self.elided = 0
+        self._head_used = 0
+        self._head_open = True
+        self._tail_used = 0
+
+    def add(self, message) -> None:
+        cost = estimate_tokens(_message_line(message))
+        if self._head_open and self._head_used + cost <= self.head_budget:
+            self.head.append(message)
+            self._head_used += cost
+            return
+        self._head_open = False
+        self.tail.append((message, cost))
+        self._tail_used += cost
+        while self._tail_used > self.tail_budget and len(self.tail) > 1:
+            _, dropped = self.tail.popleft()
+            self._tail_used -= dropped
+            self.elided += 1
+
+    @property
+    def last(self):
+        if self.tail:
+            return self.tail[-1][0]
+        return self.head[-1] if self.head else None
+
+    def messages(self) -> list:
+        """Head, an Elided marker if anything was dropped, then the tail."""
+        middle = [Elided(self.elided)] if self.elided else []
+        return [*self.head, *middle, *(message for message, _ in self.tail)]
+
+
+def chunk_transcript(messages: Sequence, budget: int) -> list[list]:
+    """Split messages, in order, into runs whose rendered lines fit ``budget``
+    estimated tokens. A message never splits; one that alone exceeds the
+    budget gets a chunk of its own (it is already capped at 500 chars)."""
+    chunks: list[list] = []
+    current: list = []
+    used = 0
+    for message in messages:
+        cost = estimate_tokens(_message_line(message))
+        if current and used + cost > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(message)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
 # ---------------------------------------------------------------------------
 # Prompt building
 # ---------------------------------------------------------------------------
@@ -261,20 +793,39 @@ def _build_system_prompt(product_map: dict[str, str]) -> str:
         f"{catalog}\n"
         " - pending_intent solo si el cliente tenía intención clara de compra "
         "que NO se concretó. Si la conversación cerró sin intent, ponlo en null.\n"
-        " - outcome refleja el estado real al cierre de la conversación."
+        " - outcome refleja el estado real al cierre de la conversación.\n"
+        " - Si viene un RESUMEN PREVIO, los mensajes son solo los NUEVOS desde "
+        "ese resumen: actualízalo con ellos y conserva lo que sigue vigente."
     )
 
 
+# Fields of a previous summary worth carrying into the next prompt (the
+# metadata stamped by summarize_conversation is not).
+_PREVIOUS_FIELDS = (
+    "summary",
+    "outcome",
+    "interest_level",
+    "communication_style",
+    "products_discussed",
+    "objections",
+    "pending_intent",
+)
+
+
 def _build_user_prompt(
     conversation: Conversation,
-    messages: list[Message],
+    messages: Sequence,
     product_map: dict[str, str],
+    previous: Optional[dict] = None,
 ) -> str:
+    """``messages``: rows (or objects) with ``direction`` and ``content``.
+    ``previous``: the summary the messages continue from, if any."""
     extracted = conversation.extracted_context or {}
     state = conversation.state
 
+    # No ids in the prompt: they tell the LLM nothing, and keeping them out
+    # lets identical transcripts share a summary_cache entry.
     lines: list[str] = []
-    lines.append(f"CONVERSACIÓN ID: {conversation.id}")
     lines.append(f"ESTADO FINAL: {state}")
     lines.append(f"CHECKPOINT FINAL: {conversation.current_checkpoint or 'n/a'}")
     lines.append(f"PROGRESO: {conversation.progress_pct or 0}%")
@@ -286,15 +837,20 @@ def _build_user_prompt(
     else:
         lines.append("  (ninguno)")
     lines.append("")
-    lines.append("MENSAJES (orden cronológico):")
-    for m in messages:
-        actor = "CLIENTE" if m.direction == "inbound" else "AGENTE"
-        content = (m.content or "").strip().replace("\n", " ")
-        if len(content) > 500:
-            content = content[:500] + "…"
-        lines.append(f"  [{actor}] {content}")
+    if previous:
+        lines.append("RESUMEN PREVIO:")
+        for key in _PREVIOUS_FIELDS:
+            if key in previous:
+                lines.append(f"  - {key}: {json.dumps(previous[key], ensure_ascii=False)}")
+        lines.append("")
+        lines.append("MENSAJES NUEVOS desde el resumen previo (orden cronológico):")
+    else:
+        lines.append("MENSAJES (orden cronológico):")
+    lines.extend(_message_line(m) for m in messages)
     lines.append("")
-    lines.append("Genera el resumen estructurado.")
+    lines.append(
+        "Actualiza el resumen estructurado." if previous else "Genera el resumen estructurado."
+    )
     return "\n".join(lines)
 
 
@@ -307,14 +863,14 @@ async def _persist_to_profile(
     summary: dict,
 ) -> None:
     cu_row = await session.execute(
-        select(ClientUser).where(ClientUser.id == client_user_id)
+        select(ClientUser.profile).where(ClientUser.id == client_user_id)
     )
-    client_user: Optional[ClientUser] = cu_row.scalar_one_or_none()
-    if client_user is None:
+    current = cu_row.one_or_none()
+    if current is None:
         logger.warning("summarize_conversation: client_user %s vanished", client_user_id)
         return
 
-    profile = dict(client_user.profile or {})
+    profile = dict(current.profile or {})
 
     # The summary owns three top-level fields on the profile.
     profile["last_conversation_summary"] = summary
@@ -331,7 +887,7 @@ async def _persist_to_profile(
 
 
 # ---------------------------------------------------------------------------
-# Helpers used by the lazy hook in ingest.py
+# Helpers used by ingest.py and the compaction worker
 # ---------------------------------------------------------------------------
 def needs_summary(profile: dict | None, conversation_id: uuid.UUID) -> bool:
     """True if the profile has no summary yet for this conversation_id."""
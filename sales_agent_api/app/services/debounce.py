@@ -0,0 +1,75 @@
+"""Rapid-fire debounce — decides when a conversation's turn is ready (P7).
+
+Customers type in bursts ("Hola" / "buenas" / "quiero café"). Only ONE turn
+should answer the whole burst, and only once the customer has stopped typing.
+The old implementation slept 5 s INSIDE the ingest request (DEUDA #2): every
+inbound pinned a uvicorn slot, a pooled connection and an n8n execution, and
+the post-sleep check still lost races against not-yet-committed inbounds.
+
+The new model splits the turn in two:
+
+  1. ``POST /ingest/message`` persists the inbound and returns at once with
+     ``should_respond=false`` and ``respond_after`` — the moment the quiet
+     window closes if nothing else arrives.
+  2. ``POST /ingest/turn`` (n8n waits until ``respond_after``, then polls)
+     claims the turn. Under the conversation's advisory lock exactly one
+     claim wins; every other poll gets a non-responding answer with a reason.
+
+The window is anchored to the INGEST clock (``conversations.last_message_at``,
+written by ingest with ``now()``), never to WhatsApp's timestamp, so delivery
+latency can't shift it (ROADMAP P7). "Already answered" is tracked with the
+existing ``last_strategy_at`` column: a claim stamps it, so a turn is pending
+exactly while ``last_strategy_at < last_message_at``. No schema change.
+
+Pure Python — no I/O. The DB side lives in ingest.claim_turn.
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Quiet window: how long the customer must stay silent before we answer.
+DEBOUNCE_SECONDS = float(os.getenv("DEBOUNCE_SECONDS", "5"))
+
+# Pure decision outcomes — kept as constants so the endpoint and tests share them.
+TURN_READY = "ready"
+TURN_PENDING = "debounce_pending"
+TURN_SUPERSEDED = "debounce_superseded"
+TURN_ALREADY_CLAIMED = "already_claimed"
+
+
+def respond_after(
+    last_message_at: datetime,
+    window_seconds: float = DEBOUNCE_SECONDS,
+) -> datetime:
+    """When the quiet window that started at ``last_message_at`` closes."""
+    return last_message_at + timedelta(seconds=window_seconds)
+
+
+def evaluate_turn(
+    *,
+    polled_message_id: str,
+    newest_inbound_message_id: Optional[str],
+    last_message_at: datetime,
+    last_strategy_at: Optional[datetime],
+    now: datetime,
+    window_seconds: float = DEBOUNCE_SECONDS,
+) -> str:
+    """Decide what a turn poll for ``polled_message_id`` means right now.
+
+    Pure — no I/O. Returns one of:
+      - TURN_SUPERSEDED: a newer inbound arrived; ITS poll answers the burst.
+        Checked first so a superseded execution stops for good.
+      - TURN_ALREADY_CLAIMED: this burst was already answered (a retried poll,
+        or a twin n8n execution) — the exactly-once guarantee.
+      - TURN_PENDING: the quiet window is still open; poll again later.
+      - TURN_READY: the caller owns the turn and must stamp last_strategy_at.
+    """
+    if newest_inbound_message_id != polled_message_id:
+        return TURN_SUPERSEDED
+    if last_strategy_at is not None and last_strategy_at >= last_message_at:
+        return TURN_ALREADY_CLAIMED
+    if now < respond_after(last_message_at, window_seconds):
+        return TURN_PENDING
+    return TURN_READY
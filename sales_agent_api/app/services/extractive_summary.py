@@ -0,0 +1,292 @@
+"""Extractive conversation summarizer — deterministic, local, no network.
+
+Fills every SUMMARY_SCHEMA field (conversation_summary.py) from what the
+backend already knows instead of asking an LLM:
+
+  - outcome / interest_level   ← conversation state, current_checkpoint,
+                                  progress_pct, extracted_context
+  - language                   ← detect_language over the inbound messages
+  - communication_style        ← how the customer writes (usted, length)
+  - products_discussed         ← extracted product_id + catalog names seen
+  - objections                 ← keyword tags over the inbound messages
+  - pending_intent             ← product_id / quantity of an unfinished sale
+
+It runs in well under a millisecond, so conversation_summary uses it
+  - as the fallback when OPENAI_API_KEY is missing or the LLM call fails —
+    the customer's memory survives instead of being dropped (DEUDA #3), and
+  - as a cheap first pass: a conversation it finds trivial (no product, no
+    objection, no intent) keeps this summary and never costs an LLM call.
+
+conversation_summary calls extractive_summary with the conversation's own
+fields. ExtractiveSummarizer is only an adapter for injecting it where a
+SummarizerLLM is expected (tests, the load harness): it parses the LLM
+prompts back, so it depends on their template. Pure Python — no I/O.
+"""
+from __future__ import annotations
+
+import json
+import re
+import unicodedata
+from typing import Any, Iterable, Optional
+
+from app.services.language import detect_language
+
+EXTRACTIVE_MODEL = "extractive"
+
+# Where a close_sale conversation stopped → SUMMARY_SCHEMA outcome. The
+# checkpoint recorded on the conversation is the next one to complete, i.e.
+# the step the customer did not get past (goal_strategy.py).
+_ABANDONED_AT = {
+    "product_matched": "abandoned_at_product",
+    "lead_qualified": "abandoned_at_lead",
+    "shipping_info_collected": "abandoned_at_shipping",
+    "user_confirmed": "abandoned_at_confirmation",
+    "payment_confirmed": "abandoned_at_payment",
+}
+_LATE_OUTCOMES = frozenset({
+    "abandoned_at_shipping", "abandoned_at_confirmation", "abandoned_at_payment",
+})
+
+_OUTCOME_SENTENCES = {
+    "purchased": "Terminó con la compra confirmada.",
+    "handed_off": "Se derivó a un asesor humano.",
+    "abandoned_at_product": "Se cortó antes de elegir producto.",
+    "abandoned_at_lead": "Se cortó al pedir sus datos de contacto.",
+    "abandoned_at_shipping": "Se cortó al pedir los datos de envío.",
+    "abandoned_at_confirmation": "Se cortó antes de confirmar el pedido.",
+    "abandoned_at_payment": "Se cortó esperando el pago.",
+    "no_intent": "Terminó sin intención de compra.",
+}
+
+# Objection tags (SUMMARY_SCHEMA examples) → patterns over the inbound text,
+# lowercased and without accents. Order is the order tags are reported in.
+_SHIPPING = r"(envio|domicilio|flete|shipping|delivery)"
+_COST = r"(caro|cara|cuesta|cobran|costo|valor|vale|expensive|cost|costs)"
+_OBJECTION_PATTERNS: tuple[tuple[str, re.Pattern], ...] = (
+    ("envío_caro", re.compile(rf"\b{_SHIPPING}\b.*\b{_COST}\b|\b{_COST}\b.*\b{_SHIPPING}\b")),
+    ("precio", re.compile(
+        r"\b(caro|cara|costoso|costosa|muy alto|descuento|rebaja|mas barato|"
+        r"expensive|discount|cheaper)\b"
+    )),
+    ("tiempo_entrega", re.compile(
+        r"\b(demora|demoran|tarda|tardan|cuanto tiempo|cuando llega|dias habiles|"
+        r"how long|when will it arrive|delivery time)\b"
+    )),
+    ("confianza", re.compile(r"\b(estafa|confiable|confianza|garantia|scam|trust)\b")),
+    ("indeciso", re.compile(
+        r"\b(lo pienso|lo voy a pensar|dejame pensarlo|despues te aviso|luego te aviso|"
+        r"think about it|let you know)\b"
+    )),
+)
+
+_FORMAL_RE = re.compile(r"\b(usted|ustedes|ud|uds|senor|senora|estimado|estimada|cordial)\b")
+# Average words per inbound message at or under which the customer is "direct".
+_DIRECT_MAX_WORDS = 4
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents, so patterns match 'envío' and 'envio'."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _unique(values: Iterable[str]) -> list[str]:
+    return list(dict.fromkeys(v for v in values if v))
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _truthy(value: Any) -> bool:
+    return value is True or str(value).strip().lower() in ("true", "1", "yes", "si", "sí")
+
+
+def tag_objections(inbound: Iterable[str]) -> list[str]:
+    """Objection tags raised across the customer's messages, in a fixed order."""
+    texts = [_fold(text) for text in inbound]
+    tags = [tag for tag, pattern in _OBJECTION_PATTERNS if any(pattern.search(t) for t in texts)]
+    if "envío_caro" in tags and "precio" in tags:
+        # "el envío está caro" is about shipping, not the product's price —
+        # keep "precio" only if some message complains without mentioning shipping.
+        shipping = re.compile(rf"\b{_SHIPPING}\b")
+        price = dict(_OBJECTION_PATTERNS)["precio"]
+        if not any(price.search(t) and not shipping.search(t) for t in texts):
+            tags.remove("precio")
+    return tags
+
+
+def communication_style(inbound: list[str]) -> str:
+    if not inbound:
+        return "casual"
+    if any(_FORMAL_RE.search(_fold(text)) for text in inbound):
+        return "formal"
+    words = sum(len(text.split()) for text in inbound) / len(inbound)
+    return "direct" if words <= _DIRECT_MAX_WORDS else "casual"
+
+
+def _outcome(state: str, checkpoint: Optional[str], extracted: dict, has_product: bool) -> str:
+    if state == "human_handoff":
+        return "handed_off"
+    if _truthy(extracted.get("payment_confirmation")) or checkpoint == "all_complete":
+        return "purchased"
+    outcome = _ABANDONED_AT.get(checkpoint or "")
+    if outcome is None or outcome == "abandoned_at_product":
+        return "abandoned_at_product" if has_product else "no_intent"
+    return outcome
+
+
+def extractive_summary(
+    *,
+    state: str,
+    checkpoint: Optional[str],
+    progress_pct: int,
+    extracted: dict,
+    inbound: list[str],
+    outbound: list[str],
+    product_map: dict[str, str],
+    previous: Optional[dict] = None,
+) -> dict:
+    """A SUMMARY_SCHEMA-shaped dict from the conversation's own data.
+
+    ``inbound`` / ``outbound``: message texts, in order. ``previous``: the
+    summary these messages continue from — its products and objections are
+    kept, the rest is recomputed (extracted_context is cumulative anyway).
+    """
+    previous = previous or {}
+    product_id = extracted.get("product_id") or None
+    transcript = [_fold(text) for text in inbound + outbound]
+    mentioned = [
+        pid for pid, name in product_map.items()
+        if name and any(_fold(name) in text for text in transcript)
+    ]
+    products = _unique(
+        [str(product_id) if product_id else ""]
+        + list(previous.get("products_discussed") or [])
+        + mentioned
+    )
+    objections = _unique(list(previous.get("objections") or []) + tag_objections(inbound))
+    outcome = _outcome(state, checkpoint, extracted, bool(products))
+    quantity = _as_int(extracted.get("quantity"))
+
+    if outcome == "purchased" or outcome in _LATE_OUTCOMES or (progress_pct or 0) >= 60:
+        interest = "high"
+    elif products:
+        interest = "medium"
+    else:
+        interest = "low"
+
+    pending_intent = None
+    if outcome.startswith("abandoned_at_") and product_id:
+        pending_intent = {"product_id": str(product_id), "quantity": quantity, "notes": None}
+
+    names = [product_map.get(pid, pid) for pid in products]
+    sentences = [
+        f"El cliente preguntó por {', '.join(names)}"
+        + (f" (cantidad: {quantity})." if quantity is not None else ".")
+        if names else "El cliente no pidió un producto concreto."
+    ]
+    if objections:
+        sentences.append(f"Objeciones: {', '.join(objections)}.")
+    sentences.append(_OUTCOME_SENTENCES[outcome])
+
+    if inbound:
+        language = detect_language(" ".join(inbound))
+    else:
+        language = previous.get("language") or "es"
+
+    return {
+        "summary": " ".join(sentences),
+        "outcome": outcome,
+        "interest_level": interest,
+        "language": language,
+        "communication_style": (
+            communication_style(inbound) if inbound
+            else previous.get("communication_style") or "casual"
+        ),
+        "products_discussed": products,
+        "objections": objections,
+        "pending_intent": pending_intent,
+    }
+
+
+def worth_an_llm_summary(draft: dict) -> bool:
+    """First-pass verdict: False when the extractive draft already says all
+    there is — no product, no objection, no buying intent."""
+    return bool(
+        draft["outcome"] != "no_intent"
+        or draft["products_discussed"]
+        or draft["objections"]
+    )
+
+
+# ---------------------------------------------------------------------------
+# SummarizerLLM adapter — reads the prompts conversation_summary builds.
+# Injection only: the fallback and the first pass never go through it.
+# ---------------------------------------------------------------------------
+_CATALOG_LINE = re.compile(r"^  - (\S+): (.+)$")
+_ITEM_LINE = re.compile(r"^  - ([^:]+): (.*)$")
+_MESSAGE_LINE = re.compile(r"^  \[(CLIENTE|AGENTE)\] ?(.*)$")
+_SCALARS = {"True": True, "False": False, "None": None}
+
+
+def parse_prompts(system_prompt: str, user_prompt: str) -> dict:
+    """Keyword arguments for extractive_summary, recovered from the prompts
+    of conversation_summary._build_system_prompt / _build_user_prompt."""
+    product_map: dict[str, str] = {}
+    for line in system_prompt.splitlines():
+        match = _CATALOG_LINE.match(line)
+        if match:
+            product_map[match.group(1)] = match.group(2)
+
+    fields: dict[str, Any] = {
+        "state": "active", "checkpoint": None, "progress_pct": 0,
+        "extracted": {}, "inbound": [], "outbound": [],
+        "product_map": product_map, "previous": None,
+    }
+    section = None
+    for line in user_prompt.splitlines():
+        if line.startswith("ESTADO FINAL: "):
+            fields["state"] = line.split(": ", 1)[1]
+        elif line.startswith("CHECKPOINT FINAL: "):
+            checkpoint = line.split(": ", 1)[1]
+            fields["checkpoint"] = None if checkpoint == "n/a" else checkpoint
+        elif line.startswith("PROGRESO: "):
+            fields["progress_pct"] = _as_int(line.split(": ", 1)[1].rstrip("%")) or 0
+        elif line.startswith("DATOS RECOPILADOS"):
+            section = "extracted"
+        elif line.startswith("RESUMEN PREVIO"):
+            section, fields["previous"] = "previous", {}
+        elif line.startswith("MENSAJES"):
+            section = "messages"
+        elif section == "messages":
+            match = _MESSAGE_LINE.match(line)
+            if match:
+                key = "inbound" if match.group(1) == "CLIENTE" else "outbound"
+                fields[key].append(match.group(2))
+        elif section in ("extracted", "previous"):
+            match = _ITEM_LINE.match(line)
+            if not match:
+                continue
+            key, raw = match.group(1), match.group(2)
+            if section == "previous":
+                try:
+                    fields["previous"][key] = json.loads(raw)
+                except ValueError:
+                    fields["previous"][key] = raw
+            else:
+                fields["extracted"][key] = _SCALARS.get(raw, raw)
+    return fields
+
+
+class ExtractiveSummarizer:
+    """SummarizerLLM backed by extractive_summary: same prompts in, same
+    schema out, no network."""
+
+    model = EXTRACTIVE_MODEL
+
+    async def __call__(self, system_prompt: str, user_prompt: str) -> dict:
+        return extractive_summary(**parse_prompts(system_prompt, user_prompt))
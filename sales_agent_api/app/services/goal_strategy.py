@@ -3,12 +3,31 @@
 Given a goal and the data collected so far, computes what's missing,
 what's blocked, and what the optimal next move is.
 
+Goals come from two places: the built-in builders (GOAL_BUILDERS, e.g.
+close_sale) and tenant declarations in ``business_rules["goals"]`` (see
+validate_goal_definitions for the shape), which take precedence — a new
+vertical is a config change, not a deploy.
+
+Each goal is compiled ONCE per (goal, business rules it reads) into an
+immutable GoalPlan: checkpoints in topological order, required fields and
+dependencies as bitmasks. compute() then costs one pass over the plan's
+fields to build the "present" mask plus a few integer ANDs per checkpoint —
+no Checkpoint objects rebuilt per turn. Plans are memoized process-wide, so
+every GoalStrategyEngine instance shares them.
+
 Pure Python — no I/O, no LLM calls. Runs in microseconds.
 """
 from __future__ import annotations
 
+import logging
 from dataclasses import dataclass, field
-from typing import Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Callable, Hashable, Iterable, Mapping, Optional
+
+from app.core.metrics import CACHE_COUNTERS, REGISTRY
+
+logger = logging.getLogger(__name__)
 
 
 # ---------------------------------------------------------------------------
@@ -23,17 +42,75 @@ PENDING = "pending"
 # ---------------------------------------------------------------------------
 # Data classes
 # ---------------------------------------------------------------------------
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Checkpoint:
     name: str
-    required_fields: list[str]
-    blocked_by: list[str] = field(default_factory=list)
+    required_fields: tuple[str, ...]
+    blocked_by: tuple[str, ...] = ()
     # human-readable label for prompt formatting
     label: str = ""
 
     def __post_init__(self) -> None:
+        # Builders may pass lists; the plan keeps tuples (hashable, shared).
+        object.__setattr__(self, "required_fields", tuple(self.required_fields))
+        object.__setattr__(self, "blocked_by", tuple(self.blocked_by))
         if not self.label:
-            self.label = self.name.replace("_", " ").title()
+            object.__setattr__(self, "label", self.name.replace("_", " ").title())
+
+
+@dataclass(frozen=True, slots=True)
+class GoalPlan:
+    """A goal's checkpoint DAG, compiled for evaluation.
+
+    ``checkpoints`` is topologically sorted (declaration order wherever the
+    dependencies allow it). Bit i of a field mask stands for ``fields[i]``;
+    ``required_masks[k]`` / ``dependency_masks[k]`` are checkpoint k's
+    required fields (over field bits) and blockers (over checkpoint bits).
+    ``hints`` maps a field to the next-action text asking for it; fields
+    without one use the built-in wording.
+    """
+
+    goal: str
+    checkpoints: tuple[Checkpoint, ...]
+    fields: tuple[str, ...]
+    required_masks: tuple[int, ...]
+    dependency_masks: tuple[int, ...]
+    hints: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+
+    def present_mask(self, collected_data: dict) -> int:
+        """Bitmask of the plan's fields that have a truthy value."""
+        mask = 0
+        get = collected_data.get
+        for bit, name in enumerate(self.fields):
+            if get(name):
+                mask |= 1 << bit
+        return mask
+
+    def evaluate(self, present: int) -> tuple[str, ...]:
+        """Status of every checkpoint, in plan order."""
+        statuses = []
+        done = 0
+        for k, (required, dependencies) in enumerate(
+            zip(self.required_masks, self.dependency_masks)
+        ):
+            if present & required == required:
+                statuses.append(COMPLETE)
+                done |= 1 << k
+            elif done & dependencies != dependencies:
+                statuses.append(BLOCKED)
+            elif present & required:
+                statuses.append(IN_PROGRESS)
+            else:
+                statuses.append(PENDING)
+        return tuple(statuses)
+
+    def missing(self, k: int, present: int) -> list[str]:
+        """Checkpoint k's required fields that are not present, in order."""
+        index = self.fields.index
+        return [
+            f for f in self.checkpoints[k].required_fields
+            if not present & (1 << index(f))
+        ]
 
 
 @dataclass
@@ -93,6 +170,23 @@ class StrategyDirective:
         return "\n".join(lines)
 
 
+@dataclass(frozen=True, slots=True)
+class StrategyBatch:
+    """compute_batch results, column-wise: row i belongs to input context i.
+
+    Rows with the same field presence share their ``missing_fields`` tuple.
+    """
+
+    goal: str
+    progress_pct: list[int]
+    current_checkpoint: list[str]
+    missing_fields: list[tuple[str, ...]]
+    all_complete: list[bool]
+
+    def __len__(self) -> int:
+        return len(self.progress_pct)
+
+
 # ---------------------------------------------------------------------------
 # Goal definitions
 # ---------------------------------------------------------------------------
@@ -153,10 +247,239 @@ def _build_close_sale_checkpoints(business_rules: dict) -> list[Checkpoint]:
     return checkpoints
 
 
-GOAL_BUILDERS: dict[str, callable] = {
+GOAL_BUILDERS: dict[str, Callable[[dict], list[Checkpoint]]] = {
     "close_sale": _build_close_sale_checkpoints,
 }
 
+# The business_rules keys each builder reads. Only these enter the plan's
+# cache key, so tenants that differ in anything else share one plan.
+GOAL_RULE_KEYS: dict[str, tuple[str, ...]] = {
+    "close_sale": ("skip_lead_qualification",),
+}
+
+PLAN_CACHE_MAX = 256
+
+
+class GoalDefinitionError(ValueError):
+    """A goal whose checkpoints can't form a plan (shape, unknown blocker, cycle)."""
+
+
+def _freeze(value) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _topological(checkpoints: list[Checkpoint]) -> tuple[Checkpoint, ...]:
+    """Dependencies first; ties keep declaration order. Rejects cycles."""
+    by_name = {cp.name: cp for cp in checkpoints}
+    if len(by_name) != len(checkpoints):
+        raise GoalDefinitionError("duplicate checkpoint names")
+    for cp in checkpoints:
+        unknown = [dep for dep in cp.blocked_by if dep not in by_name]
+        if unknown:
+            raise GoalDefinitionError(f"checkpoint {cp.name!r} blocked by unknown {unknown}")
+
+    ordered: list[Checkpoint] = []
+    placed: set[str] = set()
+    remaining = list(checkpoints)
+    while remaining:
+        ready = next(
+            (cp for cp in remaining if all(dep in placed for dep in cp.blocked_by)),
+            None,
+        )
+        if ready is None:
+            raise GoalDefinitionError(f"checkpoint cycle among {[cp.name for cp in remaining]}")
+        ordered.append(ready)
+        placed.add(ready.name)
+        remaining.remove(ready)
+    return tuple(ordered)
+
+
+def _build_plan(goal: str, checkpoints: list[Checkpoint], hints: Optional[dict] = None) -> GoalPlan:
+    ordered = _topological(checkpoints)
+    fields = tuple(dict.fromkeys(f for cp in ordered for f in cp.required_fields))
+    field_bit = {f: 1 << i for i, f in enumerate(fields)}
+    checkpoint_bit = {cp.name: 1 << k for k, cp in enumerate(ordered)}
+    return GoalPlan(
+        goal=goal,
+        checkpoints=ordered,
+        fields=fields,
+        required_masks=tuple(
+            sum(field_bit[f] for f in set(cp.required_fields)) for cp in ordered
+        ),
+        dependency_masks=tuple(
+            sum(checkpoint_bit[dep] for dep in set(cp.blocked_by)) for cp in ordered
+        ),
+        hints=MappingProxyType(dict(hints or {})),
+    )
+
+
+@lru_cache(maxsize=PLAN_CACHE_MAX)
+def _compile(goal: str, rule_items: tuple) -> GoalPlan:
+    return _build_plan(goal, GOAL_BUILDERS[goal](dict(rule_items)))
+
+
+# ---------------------------------------------------------------------------
+# Tenant-declared goals (business_rules["goals"])
+# ---------------------------------------------------------------------------
+def _is_str_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) and v for v in value)
+
+
+def _parse_declared(goal: str, definition) -> tuple[list[Checkpoint], dict[str, str]]:
+    """Checkpoints + field hints of one declared goal; raises on bad shape."""
+    if not isinstance(definition, dict):
+        raise GoalDefinitionError(f"goal {goal!r}: definition must be an object")
+    raw = definition.get("checkpoints")
+    if not isinstance(raw, list) or not raw:
+        raise GoalDefinitionError(f"goal {goal!r}: 'checkpoints' must be a non-empty list")
+
+    checkpoints: list[Checkpoint] = []
+    hints: dict[str, str] = {}
+    for i, item in enumerate(raw):
+        if not isinstance(item, dict) or not isinstance(item.get("name"), str) or not item["name"]:
+            raise GoalDefinitionError(f"goal {goal!r}: checkpoint #{i} needs a 'name'")
+        name = item["name"]
+        if not _is_str_list(item.get("required_fields")) or not item["required_fields"]:
+            raise GoalDefinitionError(
+                f"goal {goal!r}: checkpoint {name!r} needs a non-empty 'required_fields' list"
+            )
+        if not _is_str_list(item.get("blocked_by", [])):
+            raise GoalDefinitionError(
+                f"goal {goal!r}: checkpoint {name!r}: 'blocked_by' must be a list of names"
+            )
+        item_hints = item.get("hints", {})
+        if not isinstance(item_hints, dict) or not all(
+            isinstance(k, str) and isinstance(v, str) for k, v in item_hints.items()
+        ):
+            raise GoalDefinitionError(
+                f"goal {goal!r}: checkpoint {name!r}: 'hints' must map field → text"
+            )
+        label = item.get("label", "")
+        if not isinstance(label, str):
+            raise GoalDefinitionError(f"goal {goal!r}: checkpoint {name!r}: 'label' must be text")
+
+        checkpoints.append(
+            Checkpoint(
+                name=name,
+                required_fields=item["required_fields"],
+                blocked_by=item.get("blocked_by", []),
+                label=label,
+            )
+        )
+        hints.update(item_hints)
+    return checkpoints, hints
+
+
+def validate_goal_definitions(business_rules: Optional[dict]) -> None:
+    """Raise GoalDefinitionError unless every ``business_rules["goals"]`` entry compiles.
+
+    Shape, per goal name:
+
+        {"checkpoints": [
+            {"name": "service_chosen", "label": "Service chosen",
+             "required_fields": ["service_id"],
+             "hints": {"service_id": "Help the customer pick a service."}},
+            {"name": "slot_booked", "required_fields": ["date", "time"],
+             "blocked_by": ["service_chosen"]}
+        ]}
+
+    ``label``, ``blocked_by`` and ``hints`` are optional. Migration 014 runs
+    the same checks as a trigger on ``clients.business_rules``, so a bad
+    definition is rejected when it is written, not on a customer's turn.
+    """
+    goals = (business_rules or {}).get("goals")
+    if goals is None:
+        return
+    if not isinstance(goals, dict):
+        raise GoalDefinitionError("'goals' must be an object of goal name → definition")
+    for goal, definition in goals.items():
+        checkpoints, _ = _parse_declared(goal, definition)
+        try:
+            _topological(checkpoints)
+        except GoalDefinitionError as exc:
+            raise GoalDefinitionError(f"goal {goal!r}: {exc}") from None
+
+
+class _DeclaredPlans:
+    """Plans of declared goals, keyed by the identity of their definition.
+
+    TenantConfig hands every turn the same business_rules object until the
+    clients row changes, so an identity check skips re-reading the
+    definition; a reloaded config is a new object and compiles afresh.
+    Definitions that don't compile are cached as None (logged once).
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[tuple[int, str], tuple[dict, Optional[GoalPlan]]] = {}
+
+    def get(self, goal: str, definition: dict) -> Optional[GoalPlan]:
+        key = (id(definition), goal)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is definition:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        try:
+            plan: Optional[GoalPlan] = _build_plan(goal, *_parse_declared(goal, definition))
+        except GoalDefinitionError as exc:
+            logger.error("goal %r: invalid declared definition: %s", goal, exc)
+            plan = None
+        if len(self._entries) >= self.maxsize:
+            self._entries.pop(next(iter(self._entries)))
+        # The definition is kept alive with its plan, so its id can't be reused.
+        self._entries[key] = (definition, plan)
+        return plan
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_declared_plans = _DeclaredPlans(PLAN_CACHE_MAX)
+
+
+def compile_goal(goal: str, business_rules: Optional[dict] = None) -> Optional[GoalPlan]:
+    """The memoized plan for ``goal`` under these rules.
+
+    None if the goal is neither declared by the tenant nor built in, or if
+    its declaration is invalid.
+    """
+    rules = business_rules or {}
+    goals = rules.get("goals")
+    if isinstance(goals, dict) and goal in goals:
+        return _declared_plans.get(goal, goals[goal])
+    if goal not in GOAL_BUILDERS:
+        return None
+    rule_items = tuple(
+        (key, _freeze(rules[key])) for key in GOAL_RULE_KEYS.get(goal, ()) if key in rules
+    )
+    return _compile(goal, rule_items)
+
+
+def get_plan_cache_stats() -> dict:
+    """Hits / misses / size of the compiled-plan caches (built-in + declared)."""
+    info = _compile.cache_info()
+    hits = info.hits + _declared_plans.hits
+    lookups = hits + info.misses + _declared_plans.misses
+    return {
+        "entries": info.currsize + len(_declared_plans),
+        "maxsize": info.maxsize + _declared_plans.maxsize,
+        "hits": hits,
+        "misses": info.misses + _declared_plans.misses,
+        "hit_ratio": hits / lookups if lookups else 0.0,
+    }
+
+
+REGISTRY.register_stats(
+    "sales_ai_cache", "cache", lambda: {"goal_plans": get_plan_cache_stats()}, CACHE_COUNTERS
+)
+
 
 # ---------------------------------------------------------------------------
 # Engine
@@ -168,6 +491,10 @@ class GoalStrategyEngine:
         engine = GoalStrategyEngine()
         directive = engine.compute("close_sale", collected_data, business_rules)
         prompt_text = directive.to_prompt()
+
+        # dashboards / backfills: many conversations, one goal
+        batch = engine.compute_batch("close_sale", contexts, business_rules)
+        batch.progress_pct[i], batch.current_checkpoint[i], batch.missing_fields[i]
     """
 
     def compute(
@@ -176,27 +503,67 @@ class GoalStrategyEngine:
         collected_data: dict,
         business_rules: Optional[dict] = None,
     ) -> StrategyDirective:
-        if business_rules is None:
-            business_rules = {}
+        plan = compile_goal(goal, business_rules)
+        if plan is None:
+            return self._unknown(goal)
+        return self._directive(plan, plan.present_mask(collected_data))
 
-        builder = GOAL_BUILDERS.get(goal)
-        if builder is None:
-            # Unknown goal — return a generic "keep going" directive
-            return StrategyDirective(
-                goal=goal,
-                progress_pct=0,
-                current_checkpoint="unknown",
-                current_checkpoint_label="Unknown goal",
-                next_action="Continue the conversation naturally.",
-                missing_fields=[],
-                completed_checkpoints=[],
-                all_complete=False,
-            )
+    def compute_batch(
+        self,
+        goal: str,
+        contexts: Iterable[Optional[dict]],
+        business_rules: Optional[dict] = None,
+    ) -> StrategyBatch:
+        """compute() over many collected-data dicts at once, same results.
+
+        Each context is reduced to its field-presence row — one int whose
+        bit i is ``plan.fields[i]`` — so the whole batch is a presence
+        matrix stored as a column of bitmasks. A goal with F fields has at
+        most 2**F distinct rows (close_sale: 128), and each distinct row is
+        evaluated once; tens of thousands of conversations cost one pass of
+        dict lookups plus a table lookup per row.
+        """
+        plan = compile_goal(goal, business_rules)
+        columns = tuple((name, 1 << i) for i, name in enumerate(plan.fields)) if plan else ()
+        masks = [
+            sum(bit for name, bit in columns if data.get(name)) if data else 0
+            for data in contexts
+        ]
+
+        by_mask = {}
+        for mask in set(masks):
+            d = self._directive(plan, mask) if plan else self._unknown(goal)
+            by_mask[mask] = (d.progress_pct, d.current_checkpoint, tuple(d.missing_fields), d.all_complete)
+        rows = [by_mask[mask] for mask in masks]
+
+        return StrategyBatch(
+            goal=goal,
+            progress_pct=[row[0] for row in rows],
+            current_checkpoint=[row[1] for row in rows],
+            missing_fields=[row[2] for row in rows],
+            all_complete=[row[3] for row in rows],
+        )
+
+    # ------------------------------------------------------------------
+    def _unknown(self, goal: str) -> StrategyDirective:
+        # Unknown goal — return a generic "keep going" directive
+        return StrategyDirective(
+            goal=goal,
+            progress_pct=0,
+            current_checkpoint="unknown",
+            current_checkpoint_label="Unknown goal",
+            next_action="Continue the conversation naturally.",
+            missing_fields=[],
+            completed_checkpoints=[],
+            all_complete=False,
+        )
 
-        checkpoints = builder(business_rules)
-        statuses = self._evaluate(checkpoints, collected_data)
+    def _directive(self, plan: GoalPlan, present: int) -> StrategyDirective:
+        goal = plan.goal
+        statuses = plan.evaluate(present)
+        checkpoints = plan.checkpoints
 
-        completed = [cp.name for cp in checkpoints if statuses[cp.name] == COMPLETE]
+        completed = [cp.name for cp, st in zip(checkpoints, statuses) if st == COMPLETE]
         total = len(checkpoints)
         progress_pct = int(len(completed) / total * 100) if total else 100
 
@@ -215,21 +582,19 @@ class GoalStrategyEngine:
             )
 
         # Find first actionable (non-blocked, non-complete) checkpoint
-        actionable = next(
-            (cp for cp in checkpoints if statuses[cp.name] in (IN_PROGRESS, PENDING)),
+        k = next(
+            (k for k, st in enumerate(statuses) if st in (IN_PROGRESS, PENDING)),
             None,
         )
 
-        if actionable is None:
+        if k is None:
             # All remaining checkpoints are blocked — shouldn't normally happen
-            actionable = next(cp for cp in checkpoints if statuses[cp.name] != COMPLETE)
+            k = next(k for k, st in enumerate(statuses) if st != COMPLETE)
 
-        missing_fields = [
-            f for f in actionable.required_fields
-            if not collected_data.get(f)
-        ]
+        actionable = checkpoints[k]
+        missing_fields = plan.missing(k, present)
 
-        next_action = self._action_text(actionable, missing_fields)
+        next_action = self._action_text(actionable, missing_fields, plan.hints)
 
         return StrategyDirective(
             goal=goal,
@@ -242,49 +607,24 @@ class GoalStrategyEngine:
             all_complete=False,
         )
 
-    # ------------------------------------------------------------------
-    def _evaluate(
-        self, checkpoints: list[Checkpoint], collected_data: dict
-    ) -> dict[str, str]:
-        statuses: dict[str, str] = {}
-
-        for cp in checkpoints:
-            # Check if all required fields are present
-            fields_present = [
-                bool(collected_data.get(f)) for f in cp.required_fields
-            ]
-            all_present = all(fields_present)
-            any_present = any(fields_present)
-
-            if all_present:
-                statuses[cp.name] = COMPLETE
-                continue
-
-            # Check if any dependency is not yet complete
-            blocked = any(
-                statuses.get(dep) != COMPLETE for dep in cp.blocked_by
-            )
-            if blocked:
-                statuses[cp.name] = BLOCKED
-            elif any_present:
-                statuses[cp.name] = IN_PROGRESS
-            else:
-                statuses[cp.name] = PENDING
-
-        return statuses
-
-    def _action_text(self, checkpoint: Checkpoint, missing_fields: list[str]) -> str:
+    def _action_text(
+        self, checkpoint: Checkpoint, missing_fields: list[str], hints: Mapping[str, str]
+    ) -> str:
         if not missing_fields:
             return f"Complete the '{checkpoint.label}' step."
 
         field = missing_fields[0]
-        prompts = {
-            "product_id": "Help the customer choose a product from the catalog.",
-            "full_name": "Try to learn the customer's name.",
-            "phone": "Try to learn the customer's phone number for the carrier.",
-            "shipping_address": "Try to learn the full delivery address (neighborhood, street, number, apartment).",
-            "shipping_city": "Try to learn the customer's city.",
-            "user_confirmation": "Present an order summary with all the collected data and ask the customer to confirm.",
-            "payment_confirmation": "Share payment methods and ask the customer to send payment receipt once paid.",
-        }
-        return prompts.get(field, f"Ask for the customer's {field.replace('_', ' ')}.")
+        if field in hints:
+            return hints[field]
+        return _ACTION_PROMPTS.get(field, f"Ask for the customer's {field.replace('_', ' ')}.")
+
+
+_ACTION_PROMPTS = {
+    "product_id": "Help the customer choose a product from the catalog.",
+    "full_name": "Try to learn the customer's name.",
+    "phone": "Try to learn the customer's phone number for the carrier.",
+    "shipping_address": "Try to learn the full delivery address (neighborhood, street, number, apartment).",
+    "shipping_city": "Try to learn the customer's city.",
+    "user_confirmation": "Present an order summary with all the collected data and ask the customer to confirm.",
+    "payment_confirmation": "Share payment methods and ask the customer to send payment receipt once paid.",
+}
@@ -1,55 +1,96 @@
 """Message ingestion service.
 
-Performs 10 operations in a single database transaction:
+An inbound message is handled in two requests (rapid-fire debounce, P7 —
+see debounce.py):
+
+``ingest_message`` — one short transaction, returns at once:
   1. Validate client
-  2. Idempotency check
+  2. Idempotency check (recently seen ids in memory, then the DB)
   3. Upsert client_user
   4. Block check
   5. Find or create conversation (24-hour session window)
   6. Acquire advisory lock
   7. Persist inbound message
-  8. Update conversation counters
-  9. Compute GoalStrategyEngine directive
+  8. Update conversation counters + schedule the debounce (respond_after)
+  (1–8 optionally in one server-side call: ingest_fastpath.py)
+
+``claim_turn`` — polled by n8n once the quiet window closes:
+  9. Compute GoalStrategyEngine directive (exactly one claim per burst wins)
   10. Persist strategy state + return context
+
+Each step runs as a named timing stage (app/core/timing.py): per-request
+Server-Timing / log fields, and per-stage latency histograms.
 """
 from __future__ import annotations
 
-import asyncio
-import hashlib
 import logging
+import os
 import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from sqlalchemy import select, update, text
+from sqlalchemy import func, select, update
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import RecentKeys
+from app.core.database import gather_reads
+from app.core.metrics import CACHE_COUNTERS, REGISTRY
+from app.core.timing import stage
 from app.models.core import (
     AuditLog,
-    Client,
     ClientUser,
     Conversation,
     Message,
-    Product,
 )
+from app.services import ingest_fastpath
+from app.services.catalog import get_catalog_snapshot
+from app.services.compaction import enqueue_compaction, inline_compaction
+from app.services.conversation_lock import lock_conversation
 from app.services.conversation_summary import (
     SummarizerLLM,
     needs_summary,
     summarize_conversation,
 )
+from app.services.debounce import (
+    TURN_PENDING,
+    TURN_READY,
+    evaluate_turn,
+    respond_after,
+)
 from app.services.goal_strategy import GoalStrategyEngine
+from app.services.ingest_fastpath import (
+    FAST_BLOCKED,
+    FAST_CLIENT_NOT_FOUND,
+    FAST_DUPLICATE,
+    FAST_OK,
+    run_fast_path,
+)
 from app.services.language import detect_language
 from app.services.prompt_context import (
-    format_business_context,
     format_conversation_summary,
     format_language_directive,
 )
+from app.services.tenant_config import TenantConfig, get_tenant_config
 
 logger = logging.getLogger(__name__)
 
 _engine = GoalStrategyEngine()
 
+# Idempotency front: chakra_message_ids this process has persisted (or seen
+# rejected by the DB) lately. Chakra/n8n redeliver within seconds of a
+# hiccup, so a small window catches nearly every retry. Exact membership,
+# bounded memory; the messages.chakra_message_id UNIQUE stays the source of
+# truth for anything that fell out of it (or landed on another replica).
+INGEST_SEEN_IDS_MAX = int(os.getenv("INGEST_SEEN_IDS_MAX", "10000"))
+_seen_message_ids: RecentKeys[str] = RecentKeys(maxsize=INGEST_SEEN_IDS_MAX)
+
+_debounce_skips = REGISTRY.counter(
+    "sales_ai_debounce_skips_total",
+    "Turn polls answered should_respond=False, by reason.",
+    ("reason",),
+)
+
 
 # ---------------------------------------------------------------------------
 # Exceptions
@@ -70,6 +111,10 @@ class UserBlockedError(IngestError):
     pass
 
 
+class ConversationNotFoundError(IngestError):
+    pass
+
+
 # ---------------------------------------------------------------------------
 # Main service function
 # ---------------------------------------------------------------------------
@@ -85,261 +130,516 @@ async def ingest_message(
     timestamp: Optional[datetime] = None,
     summarizer_llm: Optional[SummarizerLLM] = None,
 ) -> dict:
-    """Process an inbound WhatsApp message.
+    """Persist an inbound WhatsApp message and schedule its debounce.
 
-    Returns a dict with all fields needed by n8n to call the LLM.
+    Returns a non-responding dict (``should_respond=False``, ``respond_after``):
+    the LLM context is served by ``claim_turn`` once the quiet window closes.
     Raises IngestError subclasses for expected failure modes.
     """
 
-    # --- 1. Validate client ---------------------------------------------------
-    client_row = await session.execute(
-        select(Client).where(Client.id == client_id, Client.is_active.is_(True))
-    )
-    client: Optional[Client] = client_row.scalar_one_or_none()
-    if client is None:
-        raise ClientNotFoundError(f"Client {client_id} not found or inactive")
-
-    # --- 2. Idempotency check -------------------------------------------------
-    dup_row = await session.execute(
-        select(Message.id).where(Message.chakra_message_id == chakra_message_id)
-    )
-    if dup_row.scalar_one_or_none() is not None:
-        logger.info("Duplicate message rejected: chakra_message_id=%s", chakra_message_id)
-        raise DuplicateMessageError(f"Message {chakra_message_id} already processed")
+    # --- 1 + 2. Validate client, idempotency check ---------------------------
+    # A recent redelivery is rejected before any I/O at all: the session
+    # hasn't checked out a connection yet.
+    with stage("idempotency"):
+        if chakra_message_id in _seen_message_ids:
+            logger.info("Duplicate message rejected (recent): chakra_message_id=%s", chakra_message_id)
+            raise DuplicateMessageError(f"Message {chakra_message_id} already processed")
 
-    # --- 3. Resolve client_user (BSUID-first) --------------------------------
     now = datetime.now(timezone.utc)
-    client_user = await _resolve_client_user(
-        session=session,
-        client_id=client_id,
-        bsuid=bsuid,
-        phone_number=phone_number,
-        display_name=display_name,
-        now=now,
-    )
 
-    # --- 4. Block check -------------------------------------------------------
-    if client_user.is_blocked:
-        raise UserBlockedError(
-            f"User {_mask_identity(bsuid, phone_number)} is blocked"
+    # --- 1–8 in one round trip (opt-in, see ingest_fastpath.py) -------------
+    if ingest_fastpath.INGEST_FAST_PATH:
+        with stage("fast_path"):
+            status, ack = await run_fast_path(
+                session,
+                client_id=client_id,
+                chakra_message_id=chakra_message_id,
+                content=content,
+                bsuid=bsuid,
+                phone_number=phone_number,
+                display_name=display_name,
+                message_type=message_type,
+                message_at=timestamp or now,
+                now=now,
+                identity=_mask_identity(bsuid, phone_number),
+                reason=TURN_PENDING,
+                respond_after=respond_after(now),
+            )
+        if status == FAST_OK:
+            return ack
+        if status == FAST_DUPLICATE:
+            remember_message_id(chakra_message_id)
+            raise DuplicateMessageError(f"Message {chakra_message_id} already processed")
+        if status == FAST_CLIENT_NOT_FOUND:
+            raise ClientNotFoundError(f"Client {client_id} not found or inactive")
+        if status == FAST_BLOCKED:
+            raise UserBlockedError(
+                f"User {_mask_identity(bsuid, phone_number)} is blocked"
+            )
+        # FAST_FALLBACK: a returning customer's new conversation — compaction
+        # and profile seeding live below. Same transaction, so the identity
+        # upsert the function already did is simply found again.
+
+    # Tenant config (usually a cache hit) and the dup check are independent.
+    async def read_duplicate(s: AsyncSession) -> Optional[uuid.UUID]:
+        row = await s.execute(
+            select(Message.id).where(Message.chakra_message_id == chakra_message_id)
+        )
+        return row.scalar_one_or_none()
+
+    with stage("validate"):
+        reads = await gather_reads(
+            session,
+            {
+                "duplicate": read_duplicate,
+                "tenant": lambda s: get_tenant_config(s, client_id),
+            },
+            stage="ingest.validate",
         )
+        _check_active_tenant(reads["tenant"], client_id)
+        if reads["duplicate"] is not None:
+            remember_message_id(chakra_message_id)
+            logger.info("Duplicate message rejected: chakra_message_id=%s", chakra_message_id)
+            raise DuplicateMessageError(f"Message {chakra_message_id} already processed")
 
-    # --- 5. Find or create conversation (24h window) -------------------------
-    window_start = now - timedelta(hours=24)
-    conv_row = await session.execute(
-        select(Conversation)
-        .where(
-            Conversation.client_id == client_id,
-            Conversation.client_user_id == client_user.id,
-            Conversation.state != "closed",
-            Conversation.last_message_at >= window_start,
+    # --- 3. Resolve client_user (BSUID-first) --------------------------------
+    with stage("identity"):
+        client_user = await _resolve_client_user(
+            session=session,
+            client_id=client_id,
+            bsuid=bsuid,
+            phone_number=phone_number,
+            display_name=display_name,
+            now=now,
         )
-        .order_by(Conversation.last_message_at.desc())
-        .limit(1)
-    )
-    conversation: Optional[Conversation] = conv_row.scalar_one_or_none()
 
-    if conversation is None:
-        # Lazy compaction: if the customer has a previous conversation that
-        # hasn't been summarized into their profile yet, compact it now so
-        # the new conversation starts with full memory of the last one.
-        # We only pay the LLM cost when the customer actually returns.
-        prev_conv = await _find_last_conversation(session, client_id, client_user.id)
-        enriched_profile = dict(client_user.profile or {})
-        if prev_conv is not None and needs_summary(enriched_profile, prev_conv.id):
-            summary = await summarize_conversation(
-                session, prev_conv.id, llm=summarizer_llm
+        # --- 4. Block check ---------------------------------------------------
+        if client_user.is_blocked:
+            raise UserBlockedError(
+                f"User {_mask_identity(bsuid, phone_number)} is blocked"
             )
-            if summary is not None:
-                # Mirror what _persist_to_profile wrote, so the seed below
-                # and the user_context returned to n8n both reflect the
-                # freshly compacted memory without needing session.refresh.
-                enriched_profile["last_conversation_summary"] = summary
-                if summary.get("language"):
-                    enriched_profile["language"] = summary["language"]
-                if summary.get("communication_style"):
-                    enriched_profile["communication_style"] = summary["communication_style"]
-                client_user.profile = enriched_profile
-
-        seeded_context = _seed_context_from_profile(enriched_profile)
-        conversation = Conversation(
-            client_id=client_id,
-            client_user_id=client_user.id,
-            state="active",
-            extracted_context=seeded_context,
-            strategy_version=0,
+
+    # --- 5. Find or create conversation (24h window) -------------------------
+    with stage("conversation"):
+        window_start = now - timedelta(hours=24)
+        conv_row = await session.execute(
+            select(Conversation)
+            .where(
+                Conversation.client_id == client_id,
+                Conversation.client_user_id == client_user.id,
+                Conversation.state != "closed",
+                Conversation.last_message_at >= window_start,
+            )
+            .order_by(Conversation.last_message_at.desc())
+            .limit(1)
         )
-        session.add(conversation)
-        await session.flush()  # get the generated id
+        conversation: Optional[Conversation] = conv_row.scalar_one_or_none()
+
+        if conversation is None:
+            # The previous conversation is normally summarized already: the
+            # compaction worker picks conversations up when they close, hand
+            # off or go quiet (compaction.py). If it hasn't landed yet, queue
+            # it and carry on WITHOUT waiting — this transaction already holds
+            # the client_users row (identity upsert), so the worker's profile
+            # write couldn't commit before we do anyway. claim_turn re-reads
+            # the profile when it builds the turn's context.
+            prev_conv_id = await _find_last_conversation_id(session, client_id, client_user.id)
+            enriched_profile = dict(client_user.profile or {})
+            unsummarized = prev_conv_id is not None and needs_summary(enriched_profile, prev_conv_id)
+            if unsummarized and not inline_compaction():
+                await enqueue_compaction(session, client_id, prev_conv_id, "returning")
+            elif unsummarized:
+                # COMPACTION_MODE=inline: the old lazy path, LLM round trip
+                # inside the ingest.
+                summary = await summarize_conversation(
+                    session, prev_conv_id, llm=summarizer_llm
+                )
+                if summary is not None:
+                    # Mirror what _persist_to_profile wrote, so the seed below
+                    # and the user_context returned to n8n both reflect the
+                    # freshly compacted memory without needing session.refresh.
+                    enriched_profile["last_conversation_summary"] = summary
+                    if summary.get("language"):
+                        enriched_profile["language"] = summary["language"]
+                    if summary.get("communication_style"):
+                        enriched_profile["communication_style"] = summary["communication_style"]
+                    client_user.profile = enriched_profile
+
+            seeded_context = _seed_context_from_profile(enriched_profile)
+            conversation = Conversation(
+                client_id=client_id,
+                client_user_id=client_user.id,
+                state="active",
+                extracted_context=seeded_context,
+                strategy_version=0,
+            )
+            session.add(conversation)
+            await session.flush()  # get the generated id
 
     # --- 6. Advisory lock on conversation ------------------------------------
-    lock_key = int(hashlib.sha1(str(conversation.id).encode()).hexdigest(), 16) % (2**63)
-    await session.execute(
-        text("SELECT pg_advisory_xact_lock(:lock_key)"), {"lock_key": lock_key}
-    )
+    with stage("lock"):
+        await lock_conversation(session, conversation.id)
+    # The arrival clock is read only now, with the lock held: a claim_turn
+    # that committed while we waited for it stamped last_strategy_at with an
+    # earlier clock, so this message still reopens the turn.
+    arrived_at = datetime.now(timezone.utc)
 
     # --- 7. Persist inbound message ------------------------------------------
-    msg_timestamp = timestamp or now
-    message = Message(
-        conversation_id=conversation.id,
-        client_id=client_id,
-        direction="inbound",
-        message_type=message_type,
-        content=content,
-        chakra_message_id=chakra_message_id,
-        created_at=msg_timestamp,
+    with stage("persist"):
+        msg_timestamp = timestamp or now
+        message = Message(
+            conversation_id=conversation.id,
+            client_id=client_id,
+            direction="inbound",
+            message_type=message_type,
+            content=content,
+            chakra_message_id=chakra_message_id,
+            created_at=msg_timestamp,
+        )
+        session.add(message)
+
+        # --- 8. Update conversation counters --------------------------------
+        stamped = await session.execute(_inbound_counters_stmt(conversation.id, arrived_at))
+        conversation.message_count += 1
+        conversation.last_message_at = stamped.scalar_one()
+
+    # --- 8b. Rapid-fire debounce ---------------------------------------------
+    # No waiting here: the caller commits and returns. The turn is answered by
+    # whichever claim_turn poll finds the quiet window closed (debounce.py).
+    with stage("debounce"):
+        result = _turn_not_ready(conversation, TURN_PENDING)
+
+    # Audit log — also the durable copy of the ack, replayed to retries
+    # (replay_ingest) once the in-process copy is gone.
+    with stage("audit"):
+        await session.flush()  # get the generated message id
+        session.add(
+            AuditLog(
+                client_id=client_id,
+                event_type="message_ingest",
+                entity_type="message",
+                entity_id=message.id,
+                actor_type="system",
+                new_value={
+                    "chakra_message_id": chakra_message_id,
+                    "identity": _mask_identity(bsuid, phone_number),
+                    "conversation_id": str(conversation.id),
+                    "response": _json_safe(result),
+                },
+            )
+        )
+        await session.flush()
+
+    return result
+
+
+async def replay_ingest(
+    session: AsyncSession,
+    client_id: uuid.UUID,
+    chakra_message_id: str,
+) -> Optional[dict]:
+    """The ack the original ingest of ``chakra_message_id`` returned.
+
+    For a provider retry that arrives after the in-process copy expired (or
+    on another replica). Read from the message_ingest audit row; rows written
+    before the ack was stored there get it rebuilt from the conversation —
+    same shape, with the conversation's current counters. None if this
+    tenant never ingested that id.
+    """
+    row = (
+        await session.execute(
+            select(Message.conversation_id, AuditLog.new_value)
+            .outerjoin(
+                AuditLog,
+                (AuditLog.entity_type == "message")
+                & (AuditLog.entity_id == Message.id)
+                & (AuditLog.event_type == "message_ingest"),
+            )
+            .where(
+                Message.chakra_message_id == chakra_message_id,
+                Message.client_id == client_id,
+            )
+            .limit(1)
+        )
+    ).one_or_none()
+    if row is None:
+        return None
+    stored = (row.new_value or {}).get("response")
+    if stored is not None:
+        return stored
+
+    conv_row = await session.execute(
+        select(Conversation).where(Conversation.id == row.conversation_id)
     )
-    session.add(message)
+    return _turn_not_ready(conv_row.scalar_one(), TURN_PENDING)
+
 
-    # --- 8. Update conversation counters ------------------------------------
-    await session.execute(
+async def claim_turn(
+    session: AsyncSession,
+    client_id: uuid.UUID,
+    conversation_id: uuid.UUID,
+    chakra_message_id: str,
+) -> dict:
+    """Claim the "ready to respond" turn for a conversation (debounce, P7).
+
+    n8n polls this after ``respond_after``. Exactly one poll per burst gets
+    ``should_respond=True`` with the full LLM context; every other poll gets
+    ``should_respond=False`` and a ``reason`` (see debounce.evaluate_turn).
+    Raises IngestError subclasses for expected failure modes.
+    """
+    now = datetime.now(timezone.utc)
+
+    # Lock FIRST: concurrent polls for the same burst serialize here, and the
+    # loser re-reads last_strategy_at after the winner committed it.
+    with stage("lock"):
+        await lock_conversation(session, conversation_id)
+
+    with stage("debounce"):
+        conv_row = await session.execute(
+            select(Conversation).where(
+                Conversation.id == conversation_id,
+                Conversation.client_id == client_id,
+            )
+        )
+        conversation: Optional[Conversation] = conv_row.scalar_one_or_none()
+        if conversation is None:
+            raise ConversationNotFoundError(
+                f"Conversation {conversation_id} not found for client {client_id}"
+            )
+
+        newest_row = await session.execute(_newest_inbound_stmt(conversation.id))
+        newest = newest_row.one_or_none()
+
+        decision = evaluate_turn(
+            polled_message_id=chakra_message_id,
+            newest_inbound_message_id=newest.chakra_message_id if newest else None,
+            last_message_at=conversation.last_message_at,
+            last_strategy_at=conversation.last_strategy_at,
+            now=now,
+        )
+    if decision != TURN_READY:
+        _debounce_skips.inc(decision)
+        logger.info(
+            "Debounce: turn not claimed for %s (%s)", chakra_message_id, decision
+        )
+        return _turn_not_ready(conversation, decision)
+
+    return await _claim_ready_turn(
+        session, client_id, conversation, newest.content or "", now
+    )
+
+
+def _inbound_counters_stmt(conversation_id: uuid.UUID, arrived_at: datetime):
+    """Count an inbound message and stamp last_message_at; returns the stamp.
+
+    last_message_at uses the INGEST clock, not WhatsApp's timestamp: it is
+    what the debounce window is anchored to (debounce.py). ``greatest`` keeps
+    it from moving backwards when two replicas' clocks disagree.
+    """
+    return (
         update(Conversation)
-        .where(Conversation.id == conversation.id)
+        .where(Conversation.id == conversation_id)
         .values(
             message_count=Conversation.message_count + 1,
-            last_message_at=now,
+            last_message_at=func.greatest(Conversation.last_message_at, arrived_at),
         )
+        .returning(Conversation.last_message_at)
     )
-    conversation.message_count += 1
-    conversation.last_message_at = now
 
-    # --- 8b. Rapid-fire debounce ---------------------------------------------
-    # Flush to persist the message, then commit to release the advisory lock
-    # so other messages from the same user can be inserted. Sleep briefly,
-    # then check if a newer inbound arrived — if so, let that one respond.
-    await session.flush()
-    await session.commit()
-    await asyncio.sleep(5)
-
-    newer_msg = await session.execute(
-        select(Message.id)
+
+def _newest_inbound_stmt(conversation_id: uuid.UUID):
+    """The conversation's last PERSISTED inbound message.
+
+    By ingest_seq, not created_at: created_at is WhatsApp's timestamp, one
+    second resolution, and a burst shares seconds — Postgres would pick any
+    of the tied rows and each poll could see another one as newest (all
+    superseded, customer never answered). Inbound rows are inserted under the
+    conversation lock, so ingest_seq is their arrival order.
+    """
+    return (
+        select(Message.chakra_message_id, Message.content)
         .where(
-            Message.conversation_id == conversation.id,
+            Message.conversation_id == conversation_id,
             Message.direction == "inbound",
-            Message.created_at > msg_timestamp,
         )
+        .order_by(Message.ingest_seq.desc())
         .limit(1)
     )
-    if newer_msg.scalar_one_or_none() is not None:
-        logger.info(
-            "Debounce: newer message exists, skipping response for %s",
-            chakra_message_id,
-        )
-        return {"should_respond": False, "reason": "debounce"}
 
-    # Re-acquire advisory lock for the rest of the processing
-    lock_key2 = int(hashlib.sha1(str(conversation.id).encode()).hexdigest(), 16) % (2**63)
-    await session.execute(
-        text("SELECT pg_advisory_xact_lock(:lock_key)"), {"lock_key": lock_key2}
-    )
 
-    # Reload conversation state (may have changed during sleep)
-    conv_row2 = await session.execute(
-        select(Conversation).where(Conversation.id == conversation.id)
-    )
-    conversation = conv_row2.scalar_one()
+async def claim_turn_now(
+    session: AsyncSession,
+    client_id: uuid.UUID,
+    conversation_id: uuid.UUID,
+    content: str,
+) -> dict:
+    """Claim a conversation's turn at once, skipping the quiet window.
 
-    # --- 9. Compute strategy -------------------------------------------------
-    business_rules: dict = client.business_rules or {}
-    goal = conversation.active_goal or business_rules.get("default_goal", "close_sale")
-    collected_data: dict = conversation.extracted_context or {}
+    For callers that already hold the whole burst (ingest_batch: a backlog
+    flush delivers every pending message together, so there is nothing left
+    to wait for). ``content`` is the newest inbound message's text.
+    """
+    now = datetime.now(timezone.utc)
+    with stage("lock"):
+        await lock_conversation(session, conversation_id)
+    conv_row = await session.execute(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.client_id == client_id,
+        )
+    )
+    conversation: Optional[Conversation] = conv_row.scalar_one_or_none()
+    if conversation is None:
+        raise ConversationNotFoundError(
+            f"Conversation {conversation_id} not found for client {client_id}"
+        )
+    return await _claim_ready_turn(session, client_id, conversation, content, now)
 
-    directive = _engine.compute(goal, collected_data, business_rules)
 
-    # --- 10. Persist strategy state ------------------------------------------
-    new_strategy_version = conversation.strategy_version + 1
-    await session.execute(
-        update(Conversation)
-        .where(Conversation.id == conversation.id)
-        .values(
-            active_goal=goal,
-            current_checkpoint=directive.current_checkpoint,
-            progress_pct=directive.progress_pct,
-            strategy_version=new_strategy_version,
-            last_strategy_at=now,
-            strategy_snapshot={
-                "goal": directive.goal,
-                "progress_pct": directive.progress_pct,
-                "current_checkpoint": directive.current_checkpoint,
-                "missing_fields": directive.missing_fields,
-                "completed_checkpoints": directive.completed_checkpoints,
+async def _claim_ready_turn(
+    session: AsyncSession,
+    client_id: uuid.UUID,
+    conversation: Conversation,
+    content: str,
+    now: datetime,
+) -> dict:
+    async def read_client_user(s: AsyncSession) -> ClientUser:
+        row = await s.execute(
+            select(ClientUser).where(ClientUser.id == conversation.client_user_id)
+        )
+        return row.scalar_one()
+
+    # client_user goes on OUR session: a batch may have created it in this
+    # very transaction (claim_turn_now).
+    with stage("load"):
+        reads = await gather_reads(
+            session,
+            {
+                "client_user": read_client_user,
+                "tenant": lambda s: get_tenant_config(s, client_id),
             },
+            stage="turn.load",
         )
+    client = _check_active_tenant(reads["tenant"], client_id)
+    client_user: ClientUser = reads["client_user"]
+
+    return await _build_turn_context(
+        session,
+        client=client,
+        client_user=client_user,
+        conversation=conversation,
+        content=content,
+        now=now,
     )
-    conversation.strategy_version = new_strategy_version
-    conversation.active_goal = goal
 
-    # Audit log
-    session.add(
-        AuditLog(
-            client_id=client_id,
-            event_type="message_ingest",
-            entity_type="message",
-            entity_id=message.id,
-            actor_type="system",
-            new_value={
-                "chakra_message_id": chakra_message_id,
-                "identity": _mask_identity(bsuid, phone_number),
-                "conversation_id": str(conversation.id),
-            },
+
+async def _build_turn_context(
+    session: AsyncSession,
+    client: TenantConfig,
+    client_user: ClientUser,
+    conversation: Conversation,
+    content: str,
+    now: datetime,
+) -> dict:
+    """Steps 9-10: compute + persist the strategy, assemble the LLM context.
+
+    Stamping ``last_strategy_at=now`` is what marks the burst as answered for
+    the debounce (debounce.evaluate_turn).
+    """
+    # --- 9. Compute strategy -------------------------------------------------
+    with stage("strategy"):
+        business_rules: dict = client.business_rules or {}
+        goal = conversation.active_goal or business_rules.get("default_goal", "close_sale")
+        collected_data: dict = conversation.extracted_context or {}
+
+        directive = _engine.compute(goal, collected_data, business_rules)
+
+        # --- 10. Persist strategy state --------------------------------------
+        new_strategy_version = conversation.strategy_version + 1
+        await session.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation.id)
+            .values(
+                active_goal=goal,
+                current_checkpoint=directive.current_checkpoint,
+                progress_pct=directive.progress_pct,
+                strategy_version=new_strategy_version,
+                last_strategy_at=now,
+                strategy_snapshot={
+                    "goal": directive.goal,
+                    "progress_pct": directive.progress_pct,
+                    "current_checkpoint": directive.current_checkpoint,
+                    "missing_fields": directive.missing_fields,
+                    "completed_checkpoints": directive.completed_checkpoints,
+                },
+            )
         )
-    )
+        conversation.strategy_version = new_strategy_version
+        conversation.active_goal = goal
+        conversation.last_strategy_at = now
+
+    # --- Product catalog (cached snapshot — see catalog.py) + last 20 messages
+    # Independent reads. The messages go on OUR session: in a batch they were
+    # inserted by this very transaction. Each read is its own timing stage:
+    # they overlap, so one stage around the gather would hide which is slow.
+    async def read_recent_messages(s: AsyncSession) -> list:
+        with stage("recent_messages"):
+            rows = await s.execute(
+                select(
+                    Message.id,
+                    Message.direction,
+                    Message.content,
+                    Message.message_type,
+                    Message.created_at,
+                )
+                .where(Message.conversation_id == conversation.id)
+                .order_by(Message.created_at.desc())
+                .limit(20)
+            )
+            return rows.all()
 
-    await session.flush()
+    async def read_catalog(s: AsyncSession):
+        with stage("catalog"):
+            return await get_catalog_snapshot(s, client)
 
-    # --- Load product catalog -------------------------------------------------
-    products_rows = await session.execute(
-        select(Product)
-        .where(Product.client_id == client_id, Product.is_available.is_(True))
-        .order_by(Product.name)
-    )
-    product_catalog = [
+    reads = await gather_reads(
+        session,
         {
-            "id": str(p.id),
-            "name": p.name,
-            "description": p.description,
-            "sku": p.sku,
-            "price": float(p.price),
-            "ai_description": p.ai_description,
-            "image_url": p.image_url,
-        }
-        for p in products_rows.scalars().all()
-    ]
-
-    # --- Build recent messages list (last 20) --------------------------------
-    recent_rows = await session.execute(
-        select(Message)
-        .where(Message.conversation_id == conversation.id)
-        .order_by(Message.created_at.desc())
-        .limit(20)
+            "recent_messages": read_recent_messages,
+            "catalog": read_catalog,
+        },
+        stage="turn.context",
     )
-    recent_messages = [
-        {
-            "id": str(m.id),
-            "direction": m.direction,
-            "content": m.content,
-            "message_type": m.message_type,
-            "created_at": m.created_at.isoformat(),
-        }
-        for m in reversed(recent_rows.scalars().all())
-    ]
-
-    # --- Live language detection (ADR-008) ------------------------------------
-    # Deterministic, per-turn, independent of the deferred profile compaction.
-    # The directive goes FIRST in conversation_summary: position drives adherence.
-    live_language = detect_language(content)
-    conversation_summary = (
-        format_language_directive(live_language)
-        + "\n\n"
-        + format_conversation_summary(
-            user_context={
-                "display_name": client_user.display_name,
-                "profile": client_user.profile or {},
-            },
-            extracted_context=collected_data,
-            live_language=live_language,
+    catalog = reads["catalog"]
+    with stage("prompt"):
+        recent_messages = [
+            {
+                "id": str(m.id),
+                "direction": m.direction,
+                "content": m.content,
+                "message_type": m.message_type,
+                "created_at": m.created_at.isoformat(),
+            }
+            for m in reversed(reads["recent_messages"])
+        ]
+
+        # --- Live language detection (ADR-008) --------------------------------
+        # Deterministic, per-turn, independent of the deferred profile compaction.
+        # The directive goes FIRST in conversation_summary: position drives adherence.
+        # `content` is the newest inbound — the one that closed the burst.
+        live_language = detect_language(content)
+        conversation_summary = (
+            format_language_directive(live_language)
+            + "\n\n"
+            + format_conversation_summary(
+                user_context={
+                    "display_name": client_user.display_name,
+                    "profile": client_user.profile or {},
+                },
+                extracted_context=collected_data,
+                live_language=live_language,
+            )
         )
-    )
 
     return {
         "should_respond": True,
@@ -362,18 +662,80 @@ async def ingest_message(
         },
         "user_context": {
             "display_name": client_user.display_name,
-            "phone_number": _mask_phone(phone_number),
-            "bsuid": _mask_phone(bsuid) if bsuid else None,
+            "phone_number": _mask_phone(client_user.phone_number),
+            "bsuid": _mask_phone(client_user.bsuid) if client_user.bsuid else None,
             "profile": client_user.profile or {},
             "is_blocked": client_user.is_blocked,
         },
-        "product_catalog": product_catalog,
-        "business_context": format_business_context(business_rules, product_catalog),
+        "product_catalog": catalog.product_catalog,
+        "business_context": catalog.business_context,
         "conversation_summary": conversation_summary,
         "recent_messages": recent_messages,
     }
 
 
+def remember_message_id(chakra_message_id: str) -> None:
+    """Record a chakra_message_id as persisted — call only AFTER the commit.
+
+    Remembering before the commit would turn a rolled-back ingest into a
+    permanently swallowed message when the provider retries it.
+    """
+    _seen_message_ids.add(chakra_message_id)
+
+
+def get_idempotency_stats() -> dict:
+    """Hit/miss counters of the in-memory duplicate front since process start."""
+    return _seen_message_ids.stats()
+
+
+REGISTRY.register_stats(
+    "sales_ai_cache", "cache", lambda: {"ingest_seen_ids": get_idempotency_stats()}, CACHE_COUNTERS
+)
+
+
+def _check_active_tenant(
+    client: Optional[TenantConfig],
+    client_id: uuid.UUID,
+) -> TenantConfig:
+    """The tenant config (cached — see tenant_config.py) or ClientNotFoundError."""
+    if client is None or not client.is_active:
+        raise ClientNotFoundError(f"Client {client_id} not found or inactive")
+    return client
+
+
+def _turn_not_ready(conversation: Conversation, reason: str) -> dict:
+    """Non-responding answer for ingest and for a poll that didn't win the turn.
+
+    A complete IngestMessageResponse (deuda #13: the old debounce early-return
+    was missing required fields and 500'd on every coalesced message).
+    ``respond_after`` is only meaningful while the window is open.
+    """
+    return {
+        "should_respond": False,
+        "reason": reason,
+        "conversation_id": conversation.id,
+        "conversation_state": conversation.state,
+        "strategy_version": conversation.strategy_version,
+        "respond_after": (
+            respond_after(conversation.last_message_at)
+            if reason == TURN_PENDING
+            else None
+        ),
+    }
+
+
+def _json_safe(result: dict) -> dict:
+    """A _turn_not_ready dict with UUIDs/datetimes as strings, for JSONB."""
+    return {
+        key: (
+            str(value) if isinstance(value, uuid.UUID)
+            else value.isoformat() if isinstance(value, datetime)
+            else value
+        )
+        for key, value in result.items()
+    }
+
+
 def _seed_context_from_profile(profile: dict) -> dict:
     """Pull stable customer facts out of the profile into a fresh extracted_context
     so the strategy engine already sees what we know from past conversations.
@@ -404,16 +766,16 @@ def _seed_context_from_profile(profile: dict) -> dict:
     return seed
 
 
-async def _find_last_conversation(
+async def _find_last_conversation_id(
     session: AsyncSession,
     client_id: uuid.UUID,
     client_user_id: uuid.UUID,
-) -> Optional[Conversation]:
-    """Most recent conversation for this customer, regardless of state.
-    Used to detect if there's a previous conversation to compact when a
-    new one is about to be created."""
+) -> Optional[uuid.UUID]:
+    """Id of the most recent conversation for this customer, regardless of
+    state. Used to detect if there's a previous conversation to compact when
+    a new one is about to be created."""
     row = await session.execute(
-        select(Conversation)
+        select(Conversation.id)
         .where(
             Conversation.client_id == client_id,
             Conversation.client_user_id == client_user_id,
@@ -0,0 +1,175 @@
+"""Batch ingest — a backlog of inbound messages in one request.
+
+After an outage or a WhatsApp backlog flush, n8n used to fire one /message
+per message, hundreds in parallel, all fighting over a 15-connection pool.
+A batch holds ONE connection and ONE transaction for the lot:
+
+  1. Messages are grouped per customer (bsuid, else phone) and each group
+     is ordered by its WhatsApp timestamp, so a conversation sees them in
+     the order they were sent. Groups run sorted by that customer key.
+  2. Each group is ingested inside a SAVEPOINT: a blocked customer or a
+     failing message rolls back its own group, never its neighbours.
+  3. Per conversation, only the NEWEST accepted message claims the turn —
+     at once (claim_turn_now): the batch IS the burst, there is no quiet
+     window left to wait for. Older messages of that conversation are
+     answered ``debounce_superseded``.
+
+Every message gets an outcome, in request order:
+  accepted | duplicate (with the original ack) | blocked | failed
+"""
+from __future__ import annotations
+
+import logging
+import uuid
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.conversation_summary import SummarizerLLM
+from app.services.debounce import TURN_SUPERSEDED
+from app.services.ingest import (
+    ClientNotFoundError,
+    DuplicateMessageError,
+    UserBlockedError,
+    claim_turn_now,
+    ingest_message,
+    replay_ingest,
+)
+from app.services.tenant_config import get_tenant_config
+
+logger = logging.getLogger(__name__)
+
+BATCH_ACCEPTED = "accepted"
+BATCH_DUPLICATE = "duplicate"
+BATCH_BLOCKED = "blocked"
+BATCH_FAILED = "failed"
+
+
+async def ingest_batch(
+    session: AsyncSession,
+    client_id: uuid.UUID,
+    messages: list[dict],
+    summarizer_llm: Optional[SummarizerLLM] = None,
+) -> list[dict]:
+    """Ingest ``messages`` (ingest_message keyword arguments), one outcome each.
+
+    Raises ClientNotFoundError for the whole batch; every other failure is
+    reported per message. The caller commits.
+    """
+    client = await get_tenant_config(session, client_id)
+    if client is None or not client.is_active:
+        raise ClientNotFoundError(f"Client {client_id} not found or inactive")
+
+    outcomes: list[Optional[dict]] = [None] * len(messages)
+    newest: dict[uuid.UUID, int] = {}  # conversation_id → newest accepted index
+
+    for group in group_batch(messages):
+        group_outcomes = await _ingest_group(
+            session, client_id, messages, group, summarizer_llm
+        )
+        for i, outcome in group_outcomes.items():
+            outcomes[i] = outcome
+            if outcome["status"] == BATCH_ACCEPTED:
+                newest[outcome["response"]["conversation_id"]] = i
+
+    for conversation_id, i in newest.items():
+        savepoint = await session.begin_nested()
+        try:
+            context = await claim_turn_now(
+                session, client_id, conversation_id, messages[i]["content"]
+            )
+            await savepoint.commit()
+        except Exception:
+            # The messages are persisted: n8n can still poll /turn for them.
+            logger.exception("Batch: turn claim failed for conversation %s", conversation_id)
+            await savepoint.rollback()
+            continue
+        for outcome in outcomes:
+            if (
+                outcome["status"] == BATCH_ACCEPTED
+                and outcome["response"]["conversation_id"] == conversation_id
+            ):
+                outcome["response"] = {
+                    **outcome["response"],
+                    "reason": TURN_SUPERSEDED,
+                    "respond_after": None,
+                }
+        outcomes[i]["response"] = context
+
+    return outcomes
+
+
+def group_batch(messages: list[dict]) -> list[list[int]]:
+    """Pure — indexes of ``messages`` grouped per customer, oldest first.
+
+    Groups come sorted by their customer key (``bsuid:…`` / ``phone:…``),
+    not by payload order. Each group takes its customer's locks and holds
+    them until the batch commits: two batches that overlap on customers but
+    list them in opposite order would each wait on the other. A fixed order
+    makes that a plain wait. Within a group, messages are sorted by
+    ``timestamp`` when every one has it; otherwise the batch order is the
+    only order we can trust.
+    """
+    groups: dict[str, list[int]] = {}
+    for i, message in enumerate(messages):
+        if message.get("bsuid"):
+            key = f"bsuid:{message['bsuid']}"
+        else:
+            key = f"phone:{message.get('phone_number')}"
+        groups.setdefault(key, []).append(i)
+
+    ordered = []
+    for _, indexes in sorted(groups.items()):
+        if all(messages[i].get("timestamp") is not None for i in indexes):
+            indexes = sorted(indexes, key=lambda i: (messages[i]["timestamp"], i))
+        ordered.append(indexes)
+    return ordered
+
+
+async def _ingest_group(
+    session: AsyncSession,
+    client_id: uuid.UUID,
+    messages: list[dict],
+    group: list[int],
+    summarizer_llm: Optional[SummarizerLLM],
+) -> dict[int, dict]:
+    """One customer's messages under one SAVEPOINT."""
+    outcomes: dict[int, dict] = {}
+    savepoint = await session.begin_nested()
+    try:
+        for i in group:
+            message = messages[i]
+            try:
+                ack = await ingest_message(
+                    session, client_id, summarizer_llm=summarizer_llm, **message
+                )
+            except DuplicateMessageError:
+                original = await replay_ingest(
+                    session, client_id, message["chakra_message_id"]
+                )
+                outcomes[i] = _outcome(message, BATCH_DUPLICATE, response=original)
+                continue
+            outcomes[i] = _outcome(message, BATCH_ACCEPTED, response=ack)
+        await savepoint.commit()
+    except UserBlockedError as exc:
+        await savepoint.rollback()
+        return {i: _outcome(messages[i], BATCH_BLOCKED, error=str(exc)) for i in group}
+    except Exception as exc:
+        logger.exception("Batch: group of %d message(s) failed", len(group))
+        await savepoint.rollback()
+        return {i: _outcome(messages[i], BATCH_FAILED, error=str(exc)) for i in group}
+    return outcomes
+
+
+def _outcome(
+    message: dict,
+    status: str,
+    response: Optional[dict] = None,
+    error: Optional[str] = None,
+) -> dict:
+    return {
+        "chakra_message_id": message["chakra_message_id"],
+        "status": status,
+        "error": error,
+        "response": response,
+    }
@@ -0,0 +1,105 @@
+"""Single-round-trip ingest — steps 1–8 in one server-side call.
+
+The ORM path in ingest.py issues ~8 sequential statements before the commit
+(dup check, identity lookups, upsert, conversation lookup, advisory lock,
+message insert, counters, audit). ``ingest_message_fast()`` (migration 013)
+runs the same steps inside Postgres and hands back the ack as JSONB, so a
+cross-zone database costs one hop instead of eight.
+
+Opt-in with INGEST_FAST_PATH=1. The ORM path stays the reference: the SQL
+function answers ``fallback`` when the message would open a new conversation
+for a returning customer (lazy compaction + profile seeding live in Python),
+and ingest_message carries on down the ORM path in the same transaction.
+
+``run_fast_path`` only translates the function's ``status`` into the
+constants below; ingest.py maps them to its exceptions, the same split as
+debounce.evaluate_turn.
+"""
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+INGEST_FAST_PATH = os.getenv("INGEST_FAST_PATH", "0").lower() in ("1", "true", "yes")
+
+FAST_OK = "ok"
+FAST_CLIENT_NOT_FOUND = "client_not_found"
+FAST_DUPLICATE = "duplicate"
+FAST_BLOCKED = "blocked"
+FAST_FALLBACK = "fallback"
+
+_INGEST_FAST_SQL = text(
+    "SELECT ingest_message_fast("
+    ":client_id, :chakra_message_id, :content, :bsuid, :phone_number,"
+    " :display_name, :message_type, :message_at, :now, :identity,"
+    " :reason, :respond_after)"
+)
+
+
+async def run_fast_path(
+    session: AsyncSession,
+    *,
+    client_id: uuid.UUID,
+    chakra_message_id: str,
+    content: str,
+    bsuid: Optional[str],
+    phone_number: Optional[str],
+    display_name: Optional[str],
+    message_type: str,
+    message_at: datetime,
+    now: datetime,
+    identity: str,
+    reason: str,
+    respond_after: datetime,
+) -> tuple[str, Optional[dict]]:
+    """Run steps 1–8 server-side. Returns ``(status, ack)``; ack only on FAST_OK.
+
+    The ack has the same keys and types as ingest._turn_not_ready.
+    """
+    row = await session.execute(
+        _INGEST_FAST_SQL,
+        {
+            "client_id": client_id,
+            "chakra_message_id": chakra_message_id,
+            "content": content,
+            "bsuid": bsuid,
+            "phone_number": phone_number,
+            "display_name": display_name,
+            "message_type": message_type,
+            "message_at": message_at,
+            "now": now,
+            "identity": identity,
+            "reason": reason,
+            "respond_after": respond_after,
+        },
+    )
+    return parse_fast_result(row.scalar_one(), respond_after)
+
+
+def parse_fast_result(payload, respond_after: datetime) -> tuple[str, Optional[dict]]:
+    """Pure — decode the function's JSONB into ``(status, ack)``.
+
+    asyncpg hands JSONB back as text unless a codec is registered, so both
+    str and dict are accepted. ``respond_after`` is echoed from what we sent
+    rather than re-parsed from the JSON string.
+    """
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    status = payload["status"]
+    if status != FAST_OK:
+        return status, None
+    response = payload["response"]
+    return status, {
+        "should_respond": response["should_respond"],
+        "reason": response["reason"],
+        "conversation_id": uuid.UUID(response["conversation_id"]),
+        "conversation_state": response["conversation_state"],
+        "strategy_version": response["strategy_version"],
+        "respond_after": respond_after,
+    }
@@ -0,0 +1,442 @@
+"""Offline replay of past agent turns under candidate gating / strategy rules.
+
+Before touching STRATEGY_FIELDS, _USER_CONFIRMATION_REQUIRES or a goal's
+DAG, replay every historical agent turn twice — with the rules in this
+checkout (baseline: what ran) and with the candidate — and diff:
+
+  - which extracted_data fields each turn would have merged / rejected
+    (compute_context_updates),
+  - whether the turn fires the operator's pre-payment notice
+    (is_new_user_confirmation),
+  - the directive's checkpoint and progress (GoalStrategyEngine.compute),
+  - the turn each conversation auto-escalates on (all_complete).
+
+Each conversation is replayed from an empty extracted_context, on both
+sides: the profile seed a returning customer started with isn't recorded
+per turn, so absolute numbers are approximate but the diff is like-for-like.
+
+Run from sales_agent_api/ against a read replica if there is one:
+
+    DATABASE_URL=postgresql+asyncpg://... python -m app.services.strategy_replay \\
+        --candidate candidate.json [--client-id <uuid>] [--workers 8] [--json]
+
+candidate.json overrides any of ``strategy_fields``, ``order_fields``,
+``user_confirmation_requires`` (lists) and ``business_rules`` (merged over
+each tenant's — e.g. ``skip_lead_qualification`` or a declared
+``goals.close_sale``). Shape:
+
+    {"user_confirmation_requires": ["full_name", "phone", "shipping_city"],
+     "business_rules": {"skip_lead_qualification": true}}
+
+Scale: outbound turns are streamed in conversation order through a
+server-side cursor (yield_per), cut into chunks of whole conversations and
+fanned out to a process pool; at most 2 × workers chunks are in flight, so
+memory stays flat however many turns there are. extracted_data travels as
+JSON text and is parsed in the workers, not in the event loop. Each worker
+returns a partial ReplayReport; the parent only merges counters.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, NamedTuple, Optional
+
+from sqlalchemy import Text, cast, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.core import Client, Conversation, Message
+from app.services.agent_action import (
+    _USER_CONFIRMATION_REQUIRES,
+    ORDER_FIELDS,
+    STRATEGY_FIELDS,
+    compute_context_updates,
+    is_new_user_confirmation,
+)
+from app.services.goal_strategy import GoalStrategyEngine
+
+REPLAY_CHUNK_ROWS = int(os.getenv("REPLAY_CHUNK_ROWS", "5000"))
+REPLAY_EXAMPLES = 5
+
+_engine = GoalStrategyEngine()
+
+
+# ---------------------------------------------------------------------------
+# Rules + per-turn outcome
+# ---------------------------------------------------------------------------
+@dataclass(frozen=True, slots=True)
+class ReplayRules:
+    """One side of the comparison."""
+
+    strategy_fields: frozenset[str] = frozenset(STRATEGY_FIELDS)
+    order_fields: frozenset[str] = frozenset(ORDER_FIELDS)
+    user_confirmation_requires: tuple[str, ...] = _USER_CONFIRMATION_REQUIRES
+    # Merged over each tenant's business_rules.
+    business_rules: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ReplayRules":
+        base = cls()
+        return cls(
+            strategy_fields=frozenset(data.get("strategy_fields", base.strategy_fields)),
+            order_fields=frozenset(data.get("order_fields", base.order_fields)),
+            user_confirmation_requires=tuple(
+                data.get("user_confirmation_requires", base.user_confirmation_requires)
+            ),
+            business_rules=dict(data.get("business_rules", {})),
+        )
+
+
+class TurnOutcome(NamedTuple):
+    accepted: frozenset[str]
+    rejected: frozenset[str]
+    user_confirmed: bool
+    checkpoint: str
+    progress_pct: int
+    all_complete: bool
+
+
+class ConversationTurns(NamedTuple):
+    """A conversation's outbound turns, oldest first, as stored."""
+
+    conversation_id: uuid.UUID
+    client_id: uuid.UUID
+    active_goal: Optional[str]
+    extracted_data: list[str]  # JSON text, parsed in the worker
+
+
+def replay_conversation(
+    turns: list[dict],
+    rules: ReplayRules,
+    business_rules: dict,
+    active_goal: Optional[str] = None,
+) -> list[TurnOutcome]:
+    """Outcome of every turn, threading extracted_context as the turns did."""
+    rules_now = {**business_rules, **rules.business_rules}
+    goal = active_goal or rules_now.get("default_goal", "close_sale")
+    context: dict = {}
+    outcomes = []
+    for extracted_data in turns:
+        accepted, strategy_accepted, rejections = compute_context_updates(
+            extracted_data or {},
+            context,
+            strategy_fields=rules.strategy_fields,
+            order_fields=rules.order_fields,
+            user_confirmation_requires=rules.user_confirmation_requires,
+        )
+        user_confirmed = is_new_user_confirmation(strategy_accepted, context)
+        if accepted:
+            context = {**context, **accepted}
+        directive = _engine.compute(goal, context, rules_now)
+        outcomes.append(
+            TurnOutcome(
+                accepted=frozenset(accepted),
+                rejected=frozenset(r["field"] for r in rejections),
+                user_confirmed=user_confirmed,
+                checkpoint=directive.current_checkpoint,
+                progress_pct=directive.progress_pct,
+                all_complete=directive.all_complete,
+            )
+        )
+    return outcomes
+
+
+def _escalation_turn(outcomes: list[TurnOutcome]) -> Optional[int]:
+    return next((i for i, o in enumerate(outcomes) if o.all_complete), None)
+
+
+# ---------------------------------------------------------------------------
+# Aggregated diff
+# ---------------------------------------------------------------------------
+@dataclass
+class ReplayReport:
+    """Counters of how the candidate differs from the baseline."""
+
+    conversations: int = 0
+    turns: int = 0
+    turns_changed: int = 0
+    conversations_changed: int = 0
+    fields_gained: Counter = field(default_factory=Counter)  # accepted only by candidate
+    fields_lost: Counter = field(default_factory=Counter)  # accepted only by baseline
+    rejections_added: Counter = field(default_factory=Counter)
+    rejections_removed: Counter = field(default_factory=Counter)
+    confirmation_notices: Counter = field(default_factory=Counter)  # baseline/candidate
+    checkpoint_moves: Counter = field(default_factory=Counter)  # "base → candidate"
+    escalation: Counter = field(default_factory=Counter)  # earlier | later | gained | lost
+    unreadable_turns: int = 0
+    examples: dict[str, list[str]] = field(default_factory=dict)
+
+    def _example(self, kind: str, conversation_id) -> None:
+        ids = self.examples.setdefault(kind, [])
+        if len(ids) < REPLAY_EXAMPLES and str(conversation_id) not in ids:
+            ids.append(str(conversation_id))
+
+    def add(
+        self,
+        conversation_id,
+        baseline: list[TurnOutcome],
+        candidate: list[TurnOutcome],
+    ) -> None:
+        self.conversations += 1
+        self.turns += len(baseline)
+        changed = False
+        for b, c in zip(baseline, candidate):
+            if b == c:
+                continue
+            changed = True
+            self.turns_changed += 1
+            if b.accepted != c.accepted:
+                self.fields_gained.update(c.accepted - b.accepted)
+                self.fields_lost.update(b.accepted - c.accepted)
+                self._example("accepted", conversation_id)
+            if b.rejected != c.rejected:
+                self.rejections_added.update(c.rejected - b.rejected)
+                self.rejections_removed.update(b.rejected - c.rejected)
+                self._example("rejected", conversation_id)
+            if b.user_confirmed != c.user_confirmed:
+                self.confirmation_notices["candidate" if c.user_confirmed else "baseline"] += 1
+                self._example("confirmation", conversation_id)
+            if b.checkpoint != c.checkpoint:
+                self.checkpoint_moves[f"{b.checkpoint} → {c.checkpoint}"] += 1
+                self._example("checkpoint", conversation_id)
+
+        b_turn, c_turn = _escalation_turn(baseline), _escalation_turn(candidate)
+        if b_turn != c_turn:
+            if b_turn is None:
+                kind = "gained"
+            elif c_turn is None:
+                kind = "lost"
+            else:
+                kind = "earlier" if c_turn < b_turn else "later"
+            self.escalation[kind] += 1
+            self._example(f"escalation_{kind}", conversation_id)
+            changed = True
+        if changed:
+            self.conversations_changed += 1
+
+    def merge(self, other: "ReplayReport") -> None:
+        for name in ("conversations", "turns", "turns_changed", "conversations_changed", "unreadable_turns"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name in (
+            "fields_gained", "fields_lost", "rejections_added", "rejections_removed",
+            "confirmation_notices", "checkpoint_moves", "escalation",
+        ):
+            getattr(self, name).update(getattr(other, name))
+        for kind, ids in other.examples.items():
+            for conversation_id in ids:
+                self._example(kind, conversation_id)
+
+    def to_dict(self) -> dict:
+        return {
+            "conversations": self.conversations,
+            "turns": self.turns,
+            "turns_changed": self.turns_changed,
+            "conversations_changed": self.conversations_changed,
+            "unreadable_turns": self.unreadable_turns,
+            "fields_gained": dict(self.fields_gained),
+            "fields_lost": dict(self.fields_lost),
+            "rejections_added": dict(self.rejections_added),
+            "rejections_removed": dict(self.rejections_removed),
+            "confirmation_notices": dict(self.confirmation_notices),
+            "checkpoint_moves": dict(self.checkpoint_moves.most_common()),
+            "escalation": dict(self.escalation),
+            "examples": self.examples,
+        }
+
+    def format(self) -> str:
+        lines = [
+            f"{self.turns} turns in {self.conversations} conversations; "
+            f"{self.turns_changed} turns / {self.conversations_changed} conversations change",
+        ]
+        if self.unreadable_turns:
+            lines.append(f"unreadable extracted_data (skipped as empty): {self.unreadable_turns}")
+        sections = (
+            ("fields accepted only by candidate", self.fields_gained),
+            ("fields accepted only by baseline", self.fields_lost),
+            ("rejections only in candidate", self.rejections_added),
+            ("rejections only in baseline", self.rejections_removed),
+            ("pre-payment notice fired only in", self.confirmation_notices),
+            ("checkpoint moves (baseline → candidate)", self.checkpoint_moves),
+            ("auto-escalation", self.escalation),
+        )
+        for title, counter in sections:
+            if counter:
+                lines.append(f"{title}:")
+                lines += [f"  {key:<50} {n}" for key, n in counter.most_common()]
+        for kind, ids in sorted(self.examples.items()):
+            lines.append(f"e.g. {kind}: {', '.join(ids)}")
+        return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+_worker_state: dict = {}
+
+
+def _init_worker(rules_by_client: dict, baseline: ReplayRules, candidate: ReplayRules) -> None:
+    _worker_state.update(rules_by_client=rules_by_client, baseline=baseline, candidate=candidate)
+
+
+def _parse(raw: Optional[str], report: ReplayReport) -> dict:
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        report.unreadable_turns += 1
+        return {}
+    if not isinstance(data, dict):
+        report.unreadable_turns += 1
+        return {}
+    return data
+
+
+def replay_chunk(
+    chunk: list[ConversationTurns],
+    rules_by_client: Optional[dict] = None,
+    baseline: Optional[ReplayRules] = None,
+    candidate: Optional[ReplayRules] = None,
+) -> ReplayReport:
+    """Replay whole conversations under both rule sets. Runs in a worker.
+
+    Arguments left out come from the pool initializer (_init_worker), so
+    the per-tenant rules are shipped to each worker once, not per chunk.
+    """
+    rules_by_client = rules_by_client if rules_by_client is not None else _worker_state["rules_by_client"]
+    baseline = baseline or _worker_state["baseline"]
+    candidate = candidate or _worker_state["candidate"]
+
+    report = ReplayReport()
+    for conversation in chunk:
+        turns = [_parse(raw, report) for raw in conversation.extracted_data]
+        business_rules = rules_by_client.get(conversation.client_id) or {}
+        report.add(
+            conversation.conversation_id,
+            replay_conversation(turns, baseline, business_rules, conversation.active_goal),
+            replay_conversation(turns, candidate, business_rules, conversation.active_goal),
+        )
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Reader side
+# ---------------------------------------------------------------------------
+def _turns_stmt(client_id: Optional[uuid.UUID] = None):
+    """Outbound turns in conversation order, extracted_data as JSON text."""
+    stmt = (
+        select(
+            Message.conversation_id,
+            Conversation.client_id,
+            Conversation.active_goal,
+            cast(Message.extracted_data, Text),
+        )
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .where(Message.direction == "outbound")
+        .order_by(Message.conversation_id, Message.created_at, Message.id)
+    )
+    if client_id is not None:
+        stmt = stmt.where(Message.client_id == client_id)
+    return stmt
+
+
+async def stream_chunks(
+    session: AsyncSession,
+    client_id: Optional[uuid.UUID] = None,
+    chunk_rows: int = REPLAY_CHUNK_ROWS,
+) -> AsyncIterator[list[ConversationTurns]]:
+    """Chunks of ~``chunk_rows`` turns, never splitting a conversation."""
+    result = await session.stream(
+        _turns_stmt(client_id).execution_options(yield_per=chunk_rows)
+    )
+    chunk: list[ConversationTurns] = []
+    rows_in_chunk = 0
+    current: Optional[ConversationTurns] = None
+    async for conversation_id, owner_id, active_goal, raw in result:
+        if current is None or current.conversation_id != conversation_id:
+            if current is not None:
+                chunk.append(current)
+                if rows_in_chunk >= chunk_rows:
+                    yield chunk
+                    chunk, rows_in_chunk = [], 0
+            current = ConversationTurns(conversation_id, owner_id, active_goal, [])
+        current.extracted_data.append(raw)
+        rows_in_chunk += 1
+    if current is not None:
+        chunk.append(current)
+    if chunk:
+        yield chunk
+
+
+async def _load_business_rules(session: AsyncSession) -> dict:
+    rows = await session.execute(select(Client.id, Client.business_rules))
+    return {client_id: rules or {} for client_id, rules in rows}
+
+
+async def run_replay(
+    candidate: ReplayRules,
+    client_id: Optional[uuid.UUID] = None,
+    workers: Optional[int] = None,
+    chunk_rows: int = REPLAY_CHUNK_ROWS,
+    baseline: Optional[ReplayRules] = None,
+) -> ReplayReport:
+    from app.core.database import AsyncSessionLocal
+
+    baseline = baseline or ReplayRules()
+    workers = workers or os.cpu_count() or 1
+    report = ReplayReport()
+    loop = asyncio.get_running_loop()
+
+    async with AsyncSessionLocal() as session:
+        rules_by_client = await _load_business_rules(session)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(rules_by_client, baseline, candidate),
+        ) as pool:
+            pending: set[asyncio.Future] = set()
+            async for chunk in stream_chunks(session, client_id, chunk_rows):
+                pending.add(loop.run_in_executor(pool, replay_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        report.merge(future.result())
+            for partial in await asyncio.gather(*pending):
+                report.merge(partial)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidate", required=True, help="JSON file with the candidate rules")
+    parser.add_argument("--client-id", type=uuid.UUID)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-rows", type=int, default=REPLAY_CHUNK_ROWS)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = ReplayRules.from_json(json.load(f))
+
+    async def go() -> ReplayReport:
+        from app.core.database import dispose_engine, init_engine
+
+        await init_engine()
+        try:
+            return await run_replay(candidate, args.client_id, args.workers, args.chunk_rows)
+        finally:
+            await dispose_engine()
+
+    report = asyncio.run(go())
+    print(json.dumps(report.to_dict(), indent=2, ensure_ascii=False) if args.json else report.format())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
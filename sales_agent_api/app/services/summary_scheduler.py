@@ -0,0 +1,182 @@
+"""Multi-tenant fair scheduler in front of the summarizer.
+
+One tenant reactivating thousands of dormant customers at once (a broadcast)
+enqueues thousands of compactions. Served in arrival order, they would hold
+every summarizer slot for as long as the backlog lasts and every other
+tenant's compactions would wait behind it.
+
+FairScheduler gates each summarize_conversation run (compaction.process_job)
+behind a global concurrency cap with one queue per tenant. A free slot goes
+to the waiting run with the smallest virtual start tag (start-time fair
+queueing): each tenant's runs are tagged 1/weight apart, starting no earlier
+than the scheduler's current virtual time, so
+
+  - a tenant with a backlog of 1 000 and a tenant arriving with 1 run
+    alternate instead of the newcomer waiting for the 1 000;
+  - a tenant with weight 2 gets two slots for every one of a weight-1 tenant
+    while both have work queued;
+  - an idle tenant banks no credit: it re-enters at the current virtual time.
+
+The scheduler only orders what this process has claimed. The compaction
+worker claims past the cap (COMPACTION_MAX_CLAIMED) so the surplus queues
+here, and its claim (compaction.claim_stmt) takes the oldest due jobs of
+each tenant in turn, so one tenant's backlog cannot fill a batch either.
+
+Queue depth per tenant, runs in flight and time spent waiting for a slot
+are exported on /metrics. Pure asyncio — no I/O.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Mapping, Optional
+
+from app.core.metrics import REGISTRY
+
+# Summaries running at once in this process, all tenants together. Each run
+# holds a pooled DB connection and (usually) an LLM call.
+SUMMARY_SCHEDULER_CONCURRENCY = int(
+    os.getenv("SUMMARY_SCHEDULER_CONCURRENCY", os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+)
+# "<client_id>=<weight>,..." — tenants not listed weigh 1.
+SUMMARY_TENANT_WEIGHTS = os.getenv("SUMMARY_TENANT_WEIGHTS", "")
+
+_queue_depth = REGISTRY.gauge(
+    "sales_ai_summarizer_queue_depth",
+    "Summaries waiting for a scheduler slot, by tenant.",
+    ("tenant",),
+)
+_in_flight = REGISTRY.gauge(
+    "sales_ai_summarizer_in_flight",
+    "Summaries holding a scheduler slot right now.",
+)
+_queue_wait_ms = REGISTRY.histogram(
+    "sales_ai_summarizer_queue_wait_ms",
+    "Time a summary waited for a scheduler slot, by tenant, in ms.",
+    ("tenant",),
+)
+
+
+def parse_weights(raw: str) -> dict[str, float]:
+    """``"a=2,b=0.5"`` → ``{"a": 2.0, "b": 0.5}``. Malformed or non-positive
+    entries are ignored (the tenant keeps weight 1)."""
+    weights: dict[str, float] = {}
+    for item in raw.split(","):
+        tenant, _, value = item.partition("=")
+        try:
+            weight = float(value)
+        except ValueError:
+            continue
+        if tenant.strip() and weight > 0:
+            weights[tenant.strip()] = weight
+    return weights
+
+
+class FairScheduler:
+    """Global concurrency cap + weighted fair dequeueing across tenants.
+
+    Use ``async with scheduler.slot(tenant): ...`` around the work. While the
+    cap has room the slot is granted at once; otherwise the caller waits its
+    turn. A cancelled waiter gives up its place.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = SUMMARY_SCHEDULER_CONCURRENCY,
+        weights: Optional[Mapping[str, float]] = None,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.weights = dict(weights or {})
+        self._running = 0
+        self._vtime = 0.0
+        # Virtual finish tag of each tenant's last queued run.
+        self._finish: dict[str, float] = {}
+        # (start tag, arrival seq, tenant, future) — the seq breaks ties FIFO.
+        self._heap: list[tuple[float, int, str, asyncio.Future]] = []
+        self._depth: dict[str, int] = {}
+        self._seq = itertools.count()
+
+    def weight(self, tenant: str) -> float:
+        return self.weights.get(tenant, 1.0)
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def depth(self, tenant: Optional[str] = None) -> int:
+        """Runs waiting for a slot — for one tenant, or all of them."""
+        if tenant is not None:
+            return self._depth.get(tenant, 0)
+        return sum(self._depth.values())
+
+    @asynccontextmanager
+    async def slot(self, tenant: str) -> AsyncIterator[None]:
+        tenant = str(tenant)
+        started = time.perf_counter()
+        await self._wait(tenant)
+        _queue_wait_ms.observe((time.perf_counter() - started) * 1000, tenant)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _wait(self, tenant: str) -> None:
+        start = max(self._vtime, self._finish.get(tenant, 0.0))
+        self._finish[tenant] = start + 1.0 / self.weight(tenant)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (start, next(self._seq), tenant, future))
+        self._set_depth(tenant, +1)
+        self._dispatch()  # room under the cap: granted right away
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted and cancelled in the same tick: hand the slot on.
+                self._release()
+            else:
+                future.cancel()  # left in the heap; _dispatch skips it
+                self._set_depth(tenant, -1)
+            raise
+
+    def _grant(self) -> None:
+        self._running += 1
+        _in_flight.set(self._running)
+
+    def _release(self) -> None:
+        self._running -= 1
+        _in_flight.set(self._running)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_concurrency and self._heap:
+            start, _, tenant, future = heapq.heappop(self._heap)
+            if future.done():  # cancelled while waiting
+                continue
+            self._set_depth(tenant, -1)
+            self._vtime = max(self._vtime, start)
+            self._grant()
+            future.set_result(None)
+
+    def _set_depth(self, tenant: str, delta: int) -> None:
+        depth = self._depth.get(tenant, 0) + delta
+        if depth:
+            self._depth[tenant] = depth
+        else:
+            self._depth.pop(tenant, None)
+        _queue_depth.set(depth, tenant)
+
+
+_default_scheduler: Optional[FairScheduler] = None
+
+
+def get_summary_scheduler() -> FairScheduler:
+    """The process-wide scheduler (SUMMARY_SCHEDULER_CONCURRENCY,
+    SUMMARY_TENANT_WEIGHTS)."""
+    global _default_scheduler
+    if _default_scheduler is None:
+        _default_scheduler = FairScheduler(weights=parse_weights(SUMMARY_TENANT_WEIGHTS))
+    return _default_scheduler
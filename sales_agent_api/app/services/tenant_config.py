@@ -0,0 +1,109 @@
+"""Tenant configuration cache — the `clients` row, read once per process.
+
+Every turn needs the tenant's config (business_rules, system prompt, model,
+temperature): ingest validates the client, claim_turn builds client_config,
+agent_action re-reads business_rules for the auto-escalate. That row changes
+a few times a year (by hand, via migration), so reading it on every request
+was pure round-trip cost.
+
+Freshness:
+  - TTL (TENANT_CACHE_TTL_SECONDS, default 60 s): within it, zero queries.
+  - Past it, one tiny probe (`SELECT updated_at`) revalidates the entry;
+    only a changed `clients.updated_at` (bumped by trg_clients_updated_at on
+    ANY update, including is_active) reloads the row.
+  - invalidate_tenant_config() drops it at once, for code that writes clients.
+
+Counters (get_tenant_cache_stats) make the hit ratio observable under load.
+"""
+from __future__ import annotations
+
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import VersionedTTLCache
+from app.core.metrics import CACHE_COUNTERS, REGISTRY
+from app.models.core import Client
+
+TENANT_CACHE_TTL_SECONDS = float(os.getenv("TENANT_CACHE_TTL_SECONDS", "60"))
+
+
+@dataclass(frozen=True, slots=True)
+class TenantConfig:
+    """Immutable snapshot of a `clients` row.
+
+    ``business_rules`` is shared by every reader in the process: treat it as
+    read-only (copy before mutating).
+    """
+
+    id: uuid.UUID
+    is_active: bool
+    system_prompt_template: Optional[str]
+    ai_model: str
+    ai_temperature: Decimal
+    business_rules: dict
+    updated_at: datetime
+
+
+tenant_configs: VersionedTTLCache[uuid.UUID, TenantConfig] = VersionedTTLCache(
+    ttl_seconds=TENANT_CACHE_TTL_SECONDS
+)
+
+
+async def get_tenant_config(
+    session: AsyncSession,
+    client_id: uuid.UUID,
+) -> Optional[TenantConfig]:
+    """The tenant's config, or None if the client doesn't exist.
+
+    Inactive clients ARE returned (``is_active=False``): whether that is an
+    error depends on the caller — ingest refuses them, agent_action doesn't.
+    """
+
+    async def probe():
+        row = await session.execute(
+            select(Client.updated_at).where(Client.id == client_id)
+        )
+        return row.scalar_one_or_none()
+
+    async def load():
+        row = await session.execute(select(Client).where(Client.id == client_id))
+        client: Optional[Client] = row.scalar_one_or_none()
+        if client is None:
+            return None
+        config = TenantConfig(
+            id=client.id,
+            is_active=client.is_active,
+            system_prompt_template=client.system_prompt_template,
+            ai_model=client.ai_model,
+            ai_temperature=client.ai_temperature,
+            business_rules=client.business_rules or {},
+            updated_at=client.updated_at,
+        )
+        return config, client.updated_at
+
+    return await tenant_configs.get(client_id, probe=probe, load=load)
+
+
+def invalidate_tenant_config(
+    client_id: uuid.UUID,
+    updated_at: Optional[datetime] = None,
+) -> None:
+    """Drop the cached config. With ``updated_at``, only if ours is older."""
+    tenant_configs.invalidate(client_id, updated_at)
+
+
+def get_tenant_cache_stats() -> dict:
+    """Hit/miss/revalidation counters since process start."""
+    return tenant_configs.stats()
+
+
+REGISTRY.register_stats(
+    "sales_ai_cache", "cache", lambda: {"tenant_config": get_tenant_cache_stats()}, CACHE_COUNTERS
+)
@@ -399,6 +399,8 @@ def test_purchase_record_keys_match_contract():
 import asyncio
 from types import SimpleNamespace
 
+import pytest
+
 from app.models.core import AuditLog, Message
 from app.services.agent_action import (
     LOOP_SIDE_EFFECT,
@@ -406,6 +408,7 @@ from app.services.agent_action import (
     detect_outbound_loop,
     process_agent_action,
 )
+from app.services.tenant_config import tenant_configs
 
 _SAME = "Lo siento, pero aquí solo hablamos de café. ¿Te interesa algo del menú?"
 
@@ -493,6 +496,32 @@ class _StubSession:
 
 _CLIENT_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
 
+# client_users FOR UPDATE + the conversation's advisory lock, taken before
+# the conversation is loaded (conversation_lock.py).
+_LOCKS = (_StubResult(), _StubResult())
+
+
+def _stub_client():
+    """A `clients` row as the tenant config cache reads it."""
+    return SimpleNamespace(
+        id=_CLIENT_ID,
+        is_active=True,
+        system_prompt_template="",
+        ai_model="gpt-4o-mini",
+        ai_temperature=Decimal("0.3"),
+        business_rules={},
+        updated_at=datetime(2026, 8, 1, tzinfo=timezone.utc),
+    )
+
+
+@pytest.fixture(autouse=True)
+def _fresh_tenant_cache():
+    """The tenant config cache is process-wide: start every test cold so the
+    client lookup stays on the stubbed path."""
+    tenant_configs.clear()
+    yield
+    tenant_configs.clear()
+
 
 def _make_conversation(state="active"):
     return SimpleNamespace(
@@ -513,6 +542,7 @@ def test_breaker_fires_escalates_and_suppresses_response():
     conversation = _make_conversation(state="active")
     session = _StubSession(
         [
+            *_LOCKS,
             _StubResult(scalar=conversation),           # load conversation
             _StubResult(scalars_list=[_SAME, _SAME]),   # 2 previous outbounds
             # state UPDATE needs no result
@@ -538,7 +568,7 @@ def test_breaker_fires_escalates_and_suppresses_response():
 
     # the previous-outbounds read on the real path is exactly the tenant-safe
     # builder statement (client_id + conversation_id + direction filters)
-    assert str(session.executed[1]) == str(_recent_outbound_stmt(_CLIENT_ID, _CONV_ID))
+    assert str(session.executed[3]) == str(_recent_outbound_stmt(_CLIENT_ID, _CONV_ID))
 
     # the 3rd identical outbound is NOT persisted; the audit trail is
     assert not any(isinstance(obj, Message) for obj in session.added)
@@ -556,6 +586,7 @@ def test_breaker_suppresses_without_transition_when_already_handed_off():
     conversation = _make_conversation(state="human_handoff")
     session = _StubSession(
         [
+            *_LOCKS,
             _StubResult(scalar=conversation),
             _StubResult(scalars_list=[_SAME, _SAME]),
         ]
@@ -574,8 +605,8 @@ def test_breaker_suppresses_without_transition_when_already_handed_off():
     assert result["approved"] is False
     assert result["new_state"] == "human_handoff"
     assert result["side_effects"] == [LOOP_SIDE_EFFECT]
-    # only the 2 selects ran — no state UPDATE was issued
-    assert len(session.executed) == 2
+    # only the 2 locks and the 2 selects ran — no state UPDATE was issued
+    assert len(session.executed) == len(_LOCKS) + 2
     assert not any(isinstance(obj, Message) for obj in session.added)
 
 
@@ -583,9 +614,10 @@ def test_no_fire_normal_flow_persists_outbound():
     """Regression: non-consecutive repeat (B, A then A again) does NOT fire —
     the turn flows normally, approved=True, outbound persisted."""
     conversation = _make_conversation(state="active")
-    client = SimpleNamespace(business_rules={})
+    client = _stub_client()
     session = _StubSession(
         [
+            *_LOCKS,
             _StubResult(scalar=conversation),            # load conversation
             _StubResult(scalars_list=["B", "A"]),        # previous outbounds
             _StubResult(scalar=client),                  # client for auto-escalate
@@ -679,10 +711,11 @@ def test_llm_payment_claim_records_no_sale_and_moves_nothing(monkeypatch):
     calls = _record_profile_calls(monkeypatch)
     session = _StubSession(
         [
+            *_LOCKS,
             _StubResult(scalar=conversation),                    # load conversation
             _StubResult(scalars_list=["B", "A"]),                # previous outbounds
             _StubResult(),                                       # UPDATE extracted_context
-            _StubResult(scalar=SimpleNamespace(business_rules={})),  # client
+            _StubResult(scalar=_stub_client()),  # client
         ]
     )
 
@@ -721,9 +754,10 @@ def test_payment_claim_alone_writes_nothing(monkeypatch):
     calls = _record_profile_calls(monkeypatch)
     session = _StubSession(
         [
+            *_LOCKS,
             _StubResult(scalar=conversation),
             _StubResult(scalars_list=["B", "A"]),
-            _StubResult(scalar=SimpleNamespace(business_rules={})),  # client
+            _StubResult(scalar=_stub_client()),  # client
         ]
     )
 
@@ -756,6 +790,7 @@ def test_closed_conversation_is_never_resurrected_by_auto_escalate():
     }
     session = _StubSession(
         [
+            *_LOCKS,
             _StubResult(scalar=conversation),
             _StubResult(scalars_list=["B", "A"]),
         ]
@@ -775,4 +810,115 @@ def test_closed_conversation_is_never_resurrected_by_auto_escalate():
     assert result["new_state"] == "closed"
     assert not any(s.startswith("escalated:") for s in result["side_effects"])
     # the auto-escalate block was never entered: no client lookup, no UPDATE
-    assert len(session.executed) == 2
+    assert len(session.executed) == len(_LOCKS) + 2
+
+
+# ---------------------------------------------------------------------------
+# _merge_profile reads only the profile column — no ClientUser entity load.
+# ---------------------------------------------------------------------------
+from app.services.agent_action import _merge_profile
+
+
+class _RowResult:
+    def __init__(self, row):
+        self._row = row
+
+    def one_or_none(self):
+        return self._row
+
+
+def test_merge_profile_projects_only_the_profile_column():
+    session = _StubSession([_RowResult(SimpleNamespace(profile={"city": "Cali"}))])
+    asyncio.run(
+        _merge_profile(
+            session,
+            client_user_id=uuid.uuid4(),
+            extracted_context={"full_name": "Ana Gómez"},
+            payment_just_confirmed=False,
+        )
+    )
+
+    select_sql = str(session.executed[0])
+    assert select_sql.startswith("SELECT client_users.profile \nFROM client_users")
+    update_params = session.executed[1].compile().params
+    assert update_params["profile"] == {
+        "city": "Cali", "full_name": "Ana Gómez", "first_name": "Ana",
+    }
+
+
+def test_merge_profile_for_a_vanished_customer_writes_nothing():
+    session = _StubSession([_RowResult(None)])
+    asyncio.run(
+        _merge_profile(
+            session,
+            client_user_id=uuid.uuid4(),
+            extracted_context={"full_name": "Ana Gómez"},
+            payment_just_confirmed=False,
+        )
+    )
+    assert len(session.executed) == 1
+
+
+# ---------------------------------------------------------------------------
+# /metrics counters — breaker fires and stale-context 409s
+# ---------------------------------------------------------------------------
+from app.services.agent_action import StaleContextError
+
+
+def test_breaker_fire_is_counted():
+    before = agent_action_module._breaker_fires.value()
+    session = _StubSession(
+        [
+            *_LOCKS,
+            _StubResult(scalar=_make_conversation(state="active")),
+            _StubResult(scalars_list=[_SAME, _SAME]),
+        ]
+    )
+    asyncio.run(
+        process_agent_action(
+            session=session,
+            client_id=_CLIENT_ID,
+            conversation_id=_CONV_ID,
+            strategy_version=3,
+            response_text=_SAME,
+        )
+    )
+    assert agent_action_module._breaker_fires.value() == before + 1
+
+
+def test_stale_context_is_counted():
+    before = agent_action_module._stale_contexts.value()
+    session = _StubSession([*_LOCKS, _StubResult(scalar=_make_conversation())])
+    with pytest.raises(StaleContextError):
+        asyncio.run(
+            process_agent_action(
+                session=session,
+                client_id=_CLIENT_ID,
+                conversation_id=_CONV_ID,
+                strategy_version=2,
+                response_text="hola",
+            )
+        )
+    assert agent_action_module._stale_contexts.value() == before + 1
+
+
+def test_turn_locks_customer_then_conversation_before_loading():
+    """Ingest holds client_users (identity upsert) and then takes the
+    conversation's advisory lock; compaction writes client_users then
+    conversations. The turn takes them in that same order, and BEFORE any
+    write to conversations — the opposite order deadlocked."""
+    session = _StubSession([*_LOCKS, _StubResult(scalar=_make_conversation())])
+    with pytest.raises(StaleContextError):
+        asyncio.run(
+            process_agent_action(
+                session=session,
+                client_id=_CLIENT_ID,
+                conversation_id=_CONV_ID,
+                strategy_version=2,
+                response_text="hola",
+            )
+        )
+    customer_lock, advisory_lock, load = (str(stmt) for stmt in session.executed[:3])
+    assert "FROM client_users" in customer_lock and "FOR UPDATE" in customer_lock
+    assert "pg_advisory_xact_lock" in advisory_lock
+    assert "FROM conversations" in load
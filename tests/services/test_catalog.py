@@ -0,0 +1,165 @@
+"""Tests for the per-tenant catalog snapshot.
+
+Pure: product rows are SimpleNamespaces shaped like the projected select,
+the session replays canned answers and counts round trips.
+"""
+import asyncio
+import os
+import sys
+import uuid
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.core.cache import VersionedTTLCache
+from app.services import catalog
+from app.services.catalog import build_catalog_snapshot, get_catalog_snapshot
+from app.services.prompt_context import format_business_context
+from app.services.tenant_config import TenantConfig
+
+CLIENT_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+T0 = datetime(2026, 8, 1, tzinfo=timezone.utc)
+
+TENANT = TenantConfig(
+    id=CLIENT_ID,
+    is_active=True,
+    system_prompt_template="",
+    ai_model="gpt-4o-mini",
+    ai_temperature=Decimal("0.3"),
+    business_rules={"currency": "COP"},
+    updated_at=T0,
+)
+
+
+def _product(name, available=True, updated_at=T0, price="40000"):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        name=name,
+        description=f"{name} 340g",
+        sku=name.upper()[:8],
+        price=Decimal(price),
+        ai_description=None,
+        image_url=None,
+        is_available=available,
+        updated_at=updated_at,
+    )
+
+
+ROWS = [
+    _product("Café Arenillo"),
+    _product("Café Honey", available=False, updated_at=T0 + timedelta(days=2)),
+    _product("Café Natural"),
+]
+
+
+class _Result:
+    def __init__(self, value):
+        self._value = value
+
+    def all(self):
+        return self._value
+
+    def one(self):
+        return self._value
+
+
+class FakeSession:
+    def __init__(self, results):
+        self._results = list(results)
+        self.round_trips = 0
+
+    async def execute(self, statement):
+        self.round_trips += 1
+        return _Result(self._results.pop(0))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(
+        catalog, "catalog_snapshots", VersionedTTLCache(ttl_seconds=30, clock=clock)
+    )
+    return clock
+
+
+# ---------------------------------------------------------------------------
+# build_catalog_snapshot — pure
+# ---------------------------------------------------------------------------
+def test_catalog_lists_only_available_products():
+    snap = build_catalog_snapshot(ROWS, TENANT)
+    assert [p["name"] for p in snap.product_catalog] == ["Café Arenillo", "Café Natural"]
+    assert snap.product_catalog[0]["price"] == 40000.0
+
+
+def test_product_map_keeps_withdrawn_products_for_the_summarizer():
+    snap = build_catalog_snapshot(ROWS, TENANT)
+    assert str(ROWS[1].id) in snap.product_map
+    assert len(snap.product_map) == 3
+
+
+def test_business_context_is_prerendered_from_the_catalog():
+    snap = build_catalog_snapshot(ROWS, TENANT)
+    assert snap.business_context == format_business_context(
+        TENANT.business_rules, snap.product_catalog
+    )
+    assert "Café Honey" not in snap.business_context
+
+
+def test_version_is_count_and_latest_update():
+    snap = build_catalog_snapshot(ROWS, TENANT)
+    assert snap.version == (3, T0 + timedelta(days=2))
+    assert build_catalog_snapshot([], TENANT).version == (0, None)
+
+
+# ---------------------------------------------------------------------------
+# get_catalog_snapshot — caching
+# ---------------------------------------------------------------------------
+def test_snapshot_is_built_once_and_reused(clock):
+    session = FakeSession([ROWS])
+    first = asyncio.run(get_catalog_snapshot(session, TENANT))
+    second = asyncio.run(get_catalog_snapshot(session, TENANT))
+    assert first is second
+    assert session.round_trips == 1
+
+
+def test_unchanged_version_past_ttl_costs_one_probe(clock):
+    session = FakeSession([ROWS, (3, T0 + timedelta(days=2))])
+    first = asyncio.run(get_catalog_snapshot(session, TENANT))
+    clock.now += 31
+    assert asyncio.run(get_catalog_snapshot(session, TENANT)) is first
+    assert session.round_trips == 2
+
+
+def test_product_edit_rebuilds_the_snapshot(clock):
+    edited = ROWS[:2] + [_product("Café Natural", updated_at=T0 + timedelta(days=5))]
+    session = FakeSession([ROWS, (3, T0 + timedelta(days=5)), edited])
+    asyncio.run(get_catalog_snapshot(session, TENANT))
+    clock.now += 31
+    snap = asyncio.run(get_catalog_snapshot(session, TENANT))
+    assert snap.version == (3, T0 + timedelta(days=5))
+    assert session.round_trips == 3
+
+
+def test_business_rules_change_rerenders_without_a_products_query(clock):
+    session = FakeSession([ROWS])
+    asyncio.run(get_catalog_snapshot(session, TENANT))
+    usd_tenant = replace(
+        TENANT, business_rules={"currency": "USD"}, updated_at=T0 + timedelta(days=1)
+    )
+    snap = asyncio.run(get_catalog_snapshot(session, usd_tenant))
+    assert "USD" in snap.business_context
+    assert snap.rules_version == usd_tenant.updated_at
+    assert session.round_trips == 1
@@ -0,0 +1,289 @@
+"""Compaction queue — claim / enqueue / sweep statements, retry policy and job
+outcomes.
+
+Pure: statements are compiled for the Postgres dialect, never executed; job
+processing runs against stub sessions with summarize_conversation patched.
+"""
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.services import compaction
+from app.services.summary_scheduler import FairScheduler
+from app.services.compaction import (
+    JOB_DONE,
+    JOB_EMPTY,
+    JOB_FAILED,
+    JOB_RETRY,
+    JOB_SUPERSEDED,
+    ClaimedJob,
+    backoff,
+    claim_stmt,
+    enqueue_stmt,
+    process_job,
+    sweep_quiet_stmt,
+)
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def _job(attempts=1, reason="closed", client_id=None):
+    return ClaimedJob(
+        id=uuid.uuid4(),
+        conversation_id=uuid.uuid4(),
+        reason=reason,
+        attempts=attempts,
+        run_after=datetime.now(timezone.utc) - timedelta(seconds=3),
+        client_id=client_id or uuid.uuid4(),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Statements
+# ---------------------------------------------------------------------------
+def test_claim_skips_locked_rows_and_takes_a_lease():
+    sql = _sql(claim_stmt(4, 120))
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert sql.startswith("UPDATE compaction_jobs SET status=")
+    assert "attempts=(compaction_jobs.attempts +" in sql
+    # Due pending jobs, and running ones whose lease expired.
+    assert "compaction_jobs.run_after <= now()" in sql
+    assert "compaction_jobs.locked_until < now()" in sql
+    assert "RETURNING compaction_jobs.id, compaction_jobs.conversation_id" in sql
+    assert sql.rstrip().endswith("compaction_jobs.run_after, compaction_jobs.client_id")
+
+
+def test_claim_takes_turns_between_tenants():
+    sql = _sql(claim_stmt(4, 120))
+    # Each tenant's oldest due jobs, locked per tenant ...
+    assert "SELECT DISTINCT compaction_jobs.client_id" in sql
+    assert "JOIN LATERAL (SELECT compaction_jobs.id" in sql
+    assert "WHERE compaction_jobs.client_id = tenants.client_id" in sql
+    # ... then first turns of every tenant before second turns of any.
+    assert "row_number() OVER (PARTITION BY tenants.client_id ORDER BY candidates.run_after)" in sql
+    assert "ORDER BY ranked.turn, ranked.run_after" in sql
+
+
+def test_enqueue_resets_an_existing_job_unless_running():
+    sql = _sql(enqueue_stmt(uuid.uuid4(), uuid.uuid4(), "returning"))
+    assert "ON CONFLICT (conversation_id) DO UPDATE" in sql
+    assert "run_after = now()" in sql
+    assert "WHERE compaction_jobs.status !=" in sql
+
+
+def test_sweep_only_enqueues_the_latest_unsummarized_conversation():
+    sql = _sql(sweep_quiet_stmt())
+    assert sql.startswith("INSERT INTO compaction_jobs (client_id, conversation_id, reason) SELECT")
+    assert "ON CONFLICT (conversation_id) DO NOTHING" in sql
+    assert "NOT (EXISTS (SELECT conversations_1.id" in sql
+    assert "IS DISTINCT FROM CAST(conversations.id AS TEXT)" in sql
+
+
+def test_backoff_doubles_and_caps():
+    assert [backoff(n).total_seconds() for n in (1, 2, 3, 4)] == [30, 60, 120, 240]
+    assert backoff(20) == timedelta(hours=1)
+
+
+# ---------------------------------------------------------------------------
+# Job outcomes
+# ---------------------------------------------------------------------------
+class _StubSession:
+    def __init__(self, log, results=()):
+        self.log = log
+        self.results = list(results)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        self.log.append(stmt)
+        return self.results.pop(0) if self.results else None
+
+    async def commit(self):
+        self.log.append("commit")
+
+
+def _factory(log):
+    return lambda: _StubSession(log)
+
+
+@pytest.fixture
+def summarize(monkeypatch):
+    calls = []
+
+    async def no_skip(session, conversation_id):
+        return None
+
+    def install(result=None, error=None):
+        async def fake(session, conversation_id, *, llm=None, raise_errors=False, fallback=False):
+            calls.append((conversation_id, raise_errors, fallback))
+            if error is not None:
+                raise error
+            return result
+
+        monkeypatch.setattr(compaction, "summarize_conversation", fake)
+        return calls
+
+    monkeypatch.setattr(compaction, "_skip_reason", no_skip)
+    return install
+
+
+def test_done_job_is_marked_in_its_own_transaction(summarize):
+    calls = summarize(result={"summary": "ok"})
+    log = []
+    job = _job()
+    assert asyncio.run(process_job(job, session_factory=_factory(log))) == JOB_DONE
+    assert calls == [(job.conversation_id, True, False)]
+    # Profile write commits, THEN the job row is touched.
+    assert log[0] == "commit"
+    assert "SET status=%(status)s::VARCHAR" in _sql(log[1])
+    assert log[1].compile().params["status"] == "done"
+    assert log[2] == "commit"
+
+
+def test_empty_conversation_finishes_without_retry(summarize):
+    summarize(result=None)
+    log = []
+    assert asyncio.run(process_job(_job(), session_factory=_factory(log))) == JOB_EMPTY
+    assert log[1].compile().params["status"] == "done"
+
+
+def test_failure_backs_off_then_gives_up(summarize):
+    summarize(error=ConnectionError("openai down"))
+    log = []
+    assert asyncio.run(process_job(_job(attempts=2), session_factory=_factory(log), max_attempts=3)) == JOB_RETRY
+    params = log[-2].compile().params
+    assert params["status"] == "pending"
+    assert params["last_error"] == "ConnectionError: openai down"
+    assert "run_after=(now() +" in _sql(log[-2])
+
+    log.clear()
+    assert asyncio.run(process_job(_job(attempts=3), session_factory=_factory(log), max_attempts=3)) == JOB_FAILED
+    assert log[-2].compile().params["status"] == "failed"
+    assert "run_after" not in _sql(log[-2])
+
+
+def test_a_later_summary_supersedes_the_job():
+    later = uuid.uuid4()
+    ended = datetime(2026, 5, 1, tzinfo=timezone.utc)
+    session = _StubSession([], [
+        SimpleNamespace(one_or_none=lambda: SimpleNamespace(
+            last_message_at=ended,
+            profile={"last_conversation_summary": {"conversation_id": str(later)}},
+        )),
+        SimpleNamespace(scalar_one_or_none=lambda: ended + timedelta(days=2)),
+    ])
+    assert asyncio.run(compaction._skip_reason(session, uuid.uuid4())) == JOB_SUPERSEDED
+
+
+def test_a_summary_of_the_same_conversation_is_refreshed():
+    conversation_id = uuid.uuid4()
+    session = _StubSession([], [
+        SimpleNamespace(one_or_none=lambda: SimpleNamespace(
+            last_message_at=datetime(2026, 5, 1, tzinfo=timezone.utc),
+            profile={"last_conversation_summary": {"conversation_id": str(conversation_id)}},
+        )),
+    ])
+    # Handed off, then closed: the close re-runs the summary.
+    assert asyncio.run(compaction._skip_reason(session, conversation_id)) is None
+
+
+def test_last_attempt_falls_back_to_the_extractive_summary(summarize):
+    calls = summarize(result={"summary": "extractivo"})
+    log = []
+    job = _job(attempts=3)
+    assert asyncio.run(process_job(job, session_factory=_factory(log), max_attempts=3)) == JOB_DONE
+    assert calls == [(job.conversation_id, True, True)]
+
+
+def test_jobs_run_in_their_tenants_scheduler_slot(summarize, monkeypatch):
+    summarize()  # no skip
+    tenant = uuid.uuid4()
+    scheduler = FairScheduler(max_concurrency=1)
+    seen = []
+
+    async def fake(session, conversation_id, **kwargs):
+        seen.append((scheduler.running, scheduler.depth(str(tenant))))
+        await asyncio.sleep(0)
+        return {"summary": "ok"}
+
+    monkeypatch.setattr(compaction, "summarize_conversation", fake)
+
+    async def go():
+        jobs = [_job(client_id=tenant) for _ in range(3)]
+        return await asyncio.gather(*(
+            process_job(job, session_factory=_factory([]), scheduler=scheduler) for job in jobs
+        ))
+
+    assert asyncio.run(go()) == [JOB_DONE] * 3
+    # One at a time under the cap; the others queued behind it.
+    assert [running for running, _ in seen] == [1, 1, 1]
+    assert max(depth for _, depth in seen) > 0
+    assert scheduler.running == 0 and scheduler.depth() == 0
+
+
+def test_worker_keeps_claiming_while_a_slow_job_holds_the_slot(summarize, monkeypatch):
+    """A slow LLM call must not hold up the next claim: the worker claims up
+    to max_claimed and the surplus queues in the scheduler, which serves the
+    other tenant before the slow tenant's second job."""
+    summarize()  # no skip
+    slow, other = uuid.uuid4(), uuid.uuid4()
+    backlog = [_job(client_id=slow), _job(client_id=slow), _job(client_id=other)]
+    first, second, newcomer = (job.conversation_id for job in backlog)
+    scheduler = FairScheduler(max_concurrency=1)
+    served = []
+
+    async def claim_one(session_factory=None, batch=1):
+        taken = backlog[:batch]
+        del backlog[:batch]
+        return taken
+
+    async def no_sweep(session_factory=None):
+        return 0
+
+    monkeypatch.setattr(compaction, "COMPACTION_BATCH", 1)
+    monkeypatch.setattr(compaction, "claim_jobs", claim_one)
+    monkeypatch.setattr(compaction, "sweep_quiet", no_sweep)
+    monkeypatch.setattr(compaction, "sweep_summary_cache", no_sweep)
+
+    async def go():
+        stop, release = asyncio.Event(), asyncio.Event()
+
+        async def fake(session, conversation_id, **kwargs):
+            if conversation_id == first:
+                await release.wait()
+            served.append(conversation_id)
+            return {"summary": "ok"}
+
+        monkeypatch.setattr(compaction, "summarize_conversation", fake)
+        worker = asyncio.create_task(compaction.run_worker(
+            stop, session_factory=_factory([]), poll_seconds=5,
+            scheduler=scheduler, max_claimed=3,
+        ))
+        for _ in range(100):
+            if scheduler.depth() == 2:
+                break
+            await asyncio.sleep(0)
+        queued = (scheduler.running, scheduler.depth(str(slow)), scheduler.depth(str(other)))
+        release.set()
+        stop.set()
+        await asyncio.wait_for(worker, timeout=5)
+        return queued
+
+    assert asyncio.run(go()) == (1, 1, 1)
+    assert backlog == []
+    assert served == [first, newcomer, second]
+    assert scheduler.running == 0 and scheduler.depth() == 0
@@ -0,0 +1,253 @@
+"""Tests for the rapid-fire debounce (P7) — pure decision + response contract.
+
+The turn is no longer decided by sleeping inside the ingest request: ingest
+returns at once and n8n polls /ingest/turn. These tests pin the decision
+(evaluate_turn) and that every non-responding answer is a VALID
+IngestMessageResponse — the old early-return wasn't, and 500'd on every
+coalesced message (deuda #13).
+"""
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.api.v1.ingest import IngestMessageResponse
+from app.services.debounce import (
+    TURN_ALREADY_CLAIMED,
+    TURN_PENDING,
+    TURN_READY,
+    TURN_SUPERSEDED,
+    evaluate_turn,
+    respond_after,
+)
+from app.services import ingest, ingest_fastpath
+from app.services.ingest import (
+    _inbound_counters_stmt,
+    _newest_inbound_stmt,
+    _turn_not_ready,
+    ingest_message,
+)
+from app.services.tenant_config import TenantConfig, tenant_configs
+
+LAST_INBOUND_AT = datetime(2026, 8, 19, 19, 41, 31, tzinfo=timezone.utc)
+WINDOW = 5.0
+
+
+def _evaluate(**kw):
+    args = {
+        "polled_message_id": "wamid.2",
+        "newest_inbound_message_id": "wamid.2",
+        "last_message_at": LAST_INBOUND_AT,
+        "last_strategy_at": None,
+        "now": LAST_INBOUND_AT + timedelta(seconds=6),
+        "window_seconds": WINDOW,
+    }
+    args.update(kw)
+    return evaluate_turn(**args)
+
+
+# ---------------------------------------------------------------------------
+# evaluate_turn
+# ---------------------------------------------------------------------------
+def test_quiet_window_closed_is_ready():
+    assert _evaluate() == TURN_READY
+
+
+def test_window_still_open_is_pending():
+    assert _evaluate(now=LAST_INBOUND_AT + timedelta(seconds=2)) == TURN_PENDING
+
+
+def test_window_boundary_is_ready():
+    assert _evaluate(now=respond_after(LAST_INBOUND_AT, WINDOW)) == TURN_READY
+
+
+def test_older_message_of_a_burst_is_superseded():
+    """The burst case from 2026-08-19: the newer inbound's poll answers."""
+    assert _evaluate(polled_message_id="wamid.1") == TURN_SUPERSEDED
+
+
+def test_superseded_wins_over_pending():
+    """A superseded execution must stop for good, not keep polling."""
+    got = _evaluate(
+        polled_message_id="wamid.1",
+        now=LAST_INBOUND_AT + timedelta(seconds=1),
+    )
+    assert got == TURN_SUPERSEDED
+
+
+def test_second_claim_of_the_same_burst_is_rejected():
+    """Exactly once: the winning claim stamped last_strategy_at."""
+    claimed_at = LAST_INBOUND_AT + timedelta(seconds=5, milliseconds=300)
+    got = _evaluate(
+        last_strategy_at=claimed_at,
+        now=claimed_at + timedelta(seconds=1),
+    )
+    assert got == TURN_ALREADY_CLAIMED
+
+
+def test_new_inbound_after_a_claim_reopens_the_turn():
+    previous_claim = LAST_INBOUND_AT - timedelta(minutes=2)
+    assert _evaluate(last_strategy_at=previous_claim) == TURN_READY
+
+
+def test_conversation_with_no_inbound_is_never_ready():
+    assert _evaluate(newest_inbound_message_id=None) == TURN_SUPERSEDED
+
+
+def test_respond_after_is_anchored_to_last_message():
+    assert respond_after(LAST_INBOUND_AT, 5) == LAST_INBOUND_AT + timedelta(seconds=5)
+
+
+def test_newest_inbound_is_the_last_persisted_not_the_latest_timestamp():
+    """WhatsApp timestamps have second resolution and a burst shares seconds:
+    ordering by created_at left the tie to Postgres, and every poll could be
+    superseded. The newest inbound is the last one persisted (ingest_seq)."""
+    sql = str(_newest_inbound_stmt(uuid.uuid4()))
+    assert "messages.direction" in sql
+    assert "ORDER BY messages.ingest_seq DESC" in sql
+    assert "created_at" not in sql
+    assert "LIMIT" in sql
+
+
+# ---------------------------------------------------------------------------
+# last_message_at — stamped with the conversation lock held
+# ---------------------------------------------------------------------------
+CLIENT_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
+
+class _TickingClock(datetime):
+    """ingest's clock: every reading is 1 ms after the previous one."""
+
+    current = LAST_INBOUND_AT
+
+    @classmethod
+    def now(cls, tz=None):
+        cls.current += timedelta(milliseconds=1)
+        return cls.current
+
+
+class _Result:
+    def __init__(self, value):
+        self._value = value
+
+    def scalar_one(self):
+        return self._value
+
+    def scalar_one_or_none(self):
+        return self._value
+
+
+class _DelayedIngestSession:
+    """An ORM ingest whose advisory lock is held by a claim_turn: the claim
+    commits (stamps last_strategy_at) while this ingest waits for the lock."""
+
+    def __init__(self, conversation):
+        self.conversation = conversation
+        self.claimed_at = None
+
+    async def execute(self, stmt, params=None):
+        sql = str(stmt)
+        if "pg_advisory_xact_lock" in sql:
+            self.claimed_at = _TickingClock.now()
+            return _Result(None)
+        if sql.startswith("UPDATE conversations"):
+            arrived_at = stmt.compile().params["greatest_1"]
+            return _Result(max(self.conversation.last_message_at, arrived_at))
+        if "FROM client_users" in sql:
+            return _Result(SimpleNamespace(id=uuid.uuid4(), is_blocked=False, profile={}))
+        if "FROM conversations" in sql:
+            return _Result(self.conversation)
+        return _Result(None)  # duplicate check
+
+    def add(self, obj):
+        pass
+
+    async def flush(self):
+        pass
+
+
+@pytest.fixture
+def _orm_ingest(monkeypatch):
+    monkeypatch.setattr(ingest_fastpath, "INGEST_FAST_PATH", False)
+    monkeypatch.setattr(ingest, "datetime", _TickingClock)
+    tenant_configs.clear()
+    tenant_configs.put(
+        CLIENT_ID,
+        TenantConfig(
+            id=CLIENT_ID, is_active=True, system_prompt_template="", ai_model="gpt-4o-mini",
+            ai_temperature=Decimal("0.3"), business_rules={}, updated_at=LAST_INBOUND_AT,
+        ),
+        LAST_INBOUND_AT,
+    )
+    yield
+    tenant_configs.clear()
+
+
+def test_counters_never_move_last_message_at_backwards():
+    sql = str(_inbound_counters_stmt(uuid.uuid4(), LAST_INBOUND_AT))
+    assert "last_message_at=greatest(conversations.last_message_at" in sql
+    assert "RETURNING conversations.last_message_at" in sql
+
+
+def test_ingest_that_persists_after_a_claim_reopens_the_turn(_orm_ingest):
+    """The request started before the claim but got the lock after it. Stamped
+    with the request-start clock, its last_message_at was older than the
+    claim's last_strategy_at and the newest message's poll got
+    already_claimed — the customer was never answered."""
+    conversation = SimpleNamespace(
+        id=uuid.uuid4(), state="active", strategy_version=3,
+        message_count=4, last_message_at=LAST_INBOUND_AT,
+    )
+    session = _DelayedIngestSession(conversation)
+
+    ack = asyncio.run(ingest_message(
+        session, CLIENT_ID, chakra_message_id="wamid.late", content="¿y envío?",
+        bsuid="CO.0000000000001234",
+    ))
+
+    assert conversation.last_message_at > session.claimed_at
+    assert ack["respond_after"] == respond_after(conversation.last_message_at)
+    assert _evaluate(
+        polled_message_id="wamid.late",
+        newest_inbound_message_id="wamid.late",
+        last_message_at=conversation.last_message_at,
+        last_strategy_at=session.claimed_at,
+        now=respond_after(conversation.last_message_at),
+    ) == TURN_READY
+
+
+# ---------------------------------------------------------------------------
+# Non-responding answers validate against the response model (deuda #13)
+# ---------------------------------------------------------------------------
+def _conversation():
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        state="active",
+        strategy_version=7,
+        last_message_at=LAST_INBOUND_AT,
+    )
+
+
+def test_pending_ack_is_a_valid_response_with_respond_after():
+    conv = _conversation()
+    resp = IngestMessageResponse(**_turn_not_ready(conv, TURN_PENDING))
+    assert resp.should_respond is False
+    assert resp.reason == TURN_PENDING
+    assert resp.conversation_id == conv.id
+    assert resp.respond_after == respond_after(LAST_INBOUND_AT)
+    assert resp.strategy_version == 7
+
+
+def test_superseded_answer_is_a_valid_response_without_respond_after():
+    resp = IngestMessageResponse(**_turn_not_ready(_conversation(), TURN_SUPERSEDED))
+    assert resp.should_respond is False
+    assert resp.reason == TURN_SUPERSEDED
+    assert resp.respond_after is None
+    assert resp.recent_messages == []
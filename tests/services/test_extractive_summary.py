@@ -0,0 +1,112 @@
+"""Extractive summarizer — schema-shaped output from state, checkpoint,
+extracted context and keyword tags; prompt round trip.
+
+Pure: no DB, no network.
+"""
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.services.conversation_summary import (
+    SUMMARY_SCHEMA,
+    _build_system_prompt,
+    _build_user_prompt,
+)
+from app.services.extractive_summary import (
+    ExtractiveSummarizer,
+    communication_style,
+    extractive_summary,
+    parse_prompts,
+    tag_objections,
+    worth_an_llm_summary,
+)
+
+CATALOG = {"p1": "Café Arenillo 340g", "p2": "Café Tostado 500g"}
+
+
+def _summary(**overrides):
+    fields = dict(
+        state="active", checkpoint="shipping_info_collected", progress_pct=40,
+        extracted={"product_id": "p1", "quantity": "2"},
+        inbound=["Hola, quiero el Arenillo", "el envío está muy caro"],
+        outbound=["Claro, ¿a qué ciudad?"],
+        product_map=CATALOG,
+    )
+    fields.update(overrides)
+    return extractive_summary(**fields)
+
+
+def test_output_matches_the_schema_fields_and_enums():
+    out = _summary()
+    props = SUMMARY_SCHEMA["schema"]["properties"]
+    assert set(out) == set(SUMMARY_SCHEMA["schema"]["required"])
+    for key in ("outcome", "interest_level", "language", "communication_style"):
+        assert out[key] in props[key]["enum"]
+
+
+def test_unfinished_sale_keeps_the_pending_intent():
+    out = _summary()
+    assert out["outcome"] == "abandoned_at_shipping"
+    assert out["interest_level"] == "high"
+    assert out["products_discussed"] == ["p1"]
+    assert out["pending_intent"] == {"product_id": "p1", "quantity": 2, "notes": None}
+    assert "Café Arenillo 340g (cantidad: 2)" in out["summary"]
+
+
+def test_outcome_follows_state_and_payment():
+    assert _summary(state="human_handoff")["outcome"] == "handed_off"
+    paid = _summary(state="closed", extracted={"product_id": "p1", "payment_confirmation": True})
+    assert paid["outcome"] == "purchased" and paid["pending_intent"] is None
+    idle = _summary(checkpoint="product_matched", extracted={}, inbound=["hola"], outbound=[])
+    assert idle["outcome"] == "no_intent" and idle["interest_level"] == "low"
+    assert not worth_an_llm_summary(idle)
+
+
+def test_objections_are_tagged_from_customer_words_only():
+    assert tag_objections(["el envío está muy caro"]) == ["envío_caro"]
+    assert tag_objections(["está caro", "cuánto demora en llegar?"]) == ["precio", "tiempo_entrega"]
+    assert tag_objections(["lo voy a pensar"]) == ["indeciso"]
+    # The agent saying "precio" is not an objection.
+    assert _summary(inbound=["hola"], outbound=["el envío es caro"])["objections"] == []
+
+
+def test_style_and_language_come_from_the_customer():
+    assert communication_style(["Buenas tardes, usted tiene café?"]) == "formal"
+    assert communication_style(["precio?", "ok"]) == "direct"
+    assert communication_style(["hola! me encantó el café que me mandaron la otra vez"]) == "casual"
+    assert _summary(inbound=["I want to buy coffee beans please"])["language"] == "en"
+
+
+def test_previous_products_and_objections_are_kept():
+    out = _summary(previous={"products_discussed": ["p2"], "objections": ["confianza"]})
+    assert out["products_discussed"] == ["p1", "p2"]
+    assert out["objections"] == ["confianza", "envío_caro"]
+
+
+def test_prompts_round_trip_through_the_summarizer_protocol():
+    conversation = SimpleNamespace(
+        state="active", current_checkpoint="user_confirmed", progress_pct=60,
+        extracted_context={"product_id": "p2", "quantity": 3, "user_confirmation": False},
+    )
+    messages = [
+        SimpleNamespace(direction="inbound", content="Quiero el Tostado 500g"),
+        SimpleNamespace(direction="outbound", content="Perfecto"),
+    ]
+    previous = {"summary": "Preguntó precios.", "objections": ["precio"]}
+    system = _build_system_prompt(CATALOG)
+    user = _build_user_prompt(conversation, messages, CATALOG, previous=previous)
+
+    fields = parse_prompts(system, user)
+    assert fields["product_map"] == CATALOG
+    assert fields["checkpoint"] == "user_confirmed" and fields["progress_pct"] == 60
+    assert fields["extracted"] == {"product_id": "p2", "quantity": "3", "user_confirmation": False}
+    assert fields["inbound"] == ["Quiero el Tostado 500g"] and fields["outbound"] == ["Perfecto"]
+    assert fields["previous"] == previous
+
+    out = asyncio.run(ExtractiveSummarizer()(system, user))
+    assert out["outcome"] == "abandoned_at_confirmation"
+    assert out["objections"] == ["precio"]
+    assert out["pending_intent"]["quantity"] == 3
@@ -0,0 +1,70 @@
+"""gather_reads — independent reads overlapped on pooled sessions.
+
+Pure: reads are coroutines that sleep and report which session they got;
+the session factory and the pool's lendable count are injected.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.core.database import gather_reads, get_fanout_stats
+
+
+class FakeSession:
+    def __init__(self, name):
+        self.name = name
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _read(seconds=0.02):
+    async def read(session):
+        await asyncio.sleep(seconds)
+        return session.name
+
+    return read
+
+
+def _gather(reads, stage, lendable=10):
+    side = iter(FakeSession(f"side-{i}") for i in range(10))
+    return asyncio.run(
+        gather_reads(
+            FakeSession("main"),
+            reads,
+            stage=stage,
+            session_factory=lambda: next(side),
+            lendable=lambda: lendable,
+        )
+    )
+
+
+def test_first_read_stays_on_the_callers_session_others_get_their_own():
+    result = _gather({"recent": _read(), "catalog": _read(), "tenant": _read()}, "t.split")
+    assert result == {"recent": "main", "catalog": "side-0", "tenant": "side-1"}
+
+
+def test_overlapping_reads_save_wall_clock_time():
+    _gather({"a": _read(0.03), "b": _read(0.03)}, "t.saved")
+    stats = get_fanout_stats()["t.saved"]
+    assert stats["fanouts"] == 1
+    assert stats["reads_ms"] >= 60
+    assert stats["saved_ms"] >= 20
+    assert stats["wall_ms"] < stats["reads_ms"]
+
+
+def test_exhausted_pool_runs_the_reads_in_sequence_on_one_session():
+    result = _gather({"a": _read(0), "b": _read(0)}, "t.busy", lendable=0)
+    assert result == {"a": "main", "b": "main"}
+    assert get_fanout_stats()["t.busy"]["sequential"] == 1
+
+
+def test_stats_accumulate_per_stage():
+    for _ in range(3):
+        _gather({"a": _read(0), "b": _read(0)}, "t.count")
+    assert get_fanout_stats()["t.count"]["fanouts"] == 3
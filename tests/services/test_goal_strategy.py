@@ -290,3 +290,224 @@ def test_23_order_details_wording_captures_not_asks():
     assert "if the customer mentions" in prompt
     assert "Do NOT ask for these proactively" in prompt
     assert "ask for grind" not in prompt
+
+
+# ---------------------------------------------------------------------------
+# Compiled plans (memoized per goal + relevant business rules)
+# ---------------------------------------------------------------------------
+
+def test_24_plan_is_shared_across_calls_and_irrelevant_rules():
+    from app.services.goal_strategy import compile_goal
+
+    plan = compile_goal("close_sale", {"currency": "COP"})
+    assert compile_goal("close_sale", {"currency": "USD", "payment_methods": []}) is plan
+    assert compile_goal("close_sale") is plan
+    skipped = compile_goal("close_sale", {"skip_lead_qualification": True})
+    assert skipped is not plan
+    assert "lead_qualified" not in [cp.name for cp in skipped.checkpoints]
+    assert compile_goal("unknown_goal") is None
+
+
+def test_25_plan_is_immutable():
+    from dataclasses import FrozenInstanceError
+
+    from app.services.goal_strategy import compile_goal
+
+    plan = compile_goal("close_sale")
+    with pytest.raises(FrozenInstanceError):
+        plan.checkpoints[0].required_fields = ("x",)
+    assert isinstance(plan.checkpoints[0].required_fields, tuple)
+
+
+def test_26_checkpoints_are_topologically_sorted(monkeypatch):
+    """A goal declared out of order is evaluated dependencies-first.
+
+    Everything — builder registry, Checkpoint, engine — comes from the one
+    module object imported here: another test file may have re-imported
+    app.* since the module-level ``engine`` was built."""
+    from app.services import goal_strategy
+
+    def out_of_order(rules):
+        return [
+            goal_strategy.Checkpoint(
+                name="paid", required_fields=["payment_confirmation"], blocked_by=["picked"]
+            ),
+            goal_strategy.Checkpoint(name="picked", required_fields=["product_id"]),
+        ]
+
+    monkeypatch.setitem(goal_strategy.GOAL_BUILDERS, "test_out_of_order", out_of_order)
+    plan = goal_strategy.compile_goal("test_out_of_order")
+    assert [cp.name for cp in plan.checkpoints] == ["picked", "paid"]
+
+    d = goal_strategy.GoalStrategyEngine().compute(
+        "test_out_of_order", {"payment_confirmation": True}
+    )
+    assert d.current_checkpoint == "picked"
+    assert d.completed_checkpoints == ["paid"]
+
+
+def test_27_cyclic_goal_is_rejected(monkeypatch):
+    from app.services import goal_strategy
+
+    def cyclic(rules):
+        return [
+            goal_strategy.Checkpoint(name="a", required_fields=["x"], blocked_by=["b"]),
+            goal_strategy.Checkpoint(name="b", required_fields=["y"], blocked_by=["a"]),
+        ]
+
+    monkeypatch.setitem(goal_strategy.GOAL_BUILDERS, "test_cyclic", cyclic)
+    with pytest.raises(ValueError, match="cycle"):
+        goal_strategy.compile_goal("test_cyclic")
+
+
+# ---------------------------------------------------------------------------
+# Tenant-declared goals (business_rules["goals"])
+# ---------------------------------------------------------------------------
+
+BOOKING_RULES = {
+    "goals": {
+        "book_appointment": {
+            "checkpoints": [
+                {
+                    "name": "slot_booked",
+                    "required_fields": ["date", "time"],
+                    "blocked_by": ["service_chosen"],
+                },
+                {
+                    "name": "service_chosen",
+                    "label": "Service chosen",
+                    "required_fields": ["service_id"],
+                    "hints": {"service_id": "Help the customer pick a service."},
+                },
+            ]
+        }
+    }
+}
+
+
+def test_28_declared_goal_is_navigated():
+    d = engine.compute("book_appointment", {}, BOOKING_RULES)
+    assert d.current_checkpoint == "service_chosen"
+    assert d.current_checkpoint_label == "Service chosen"
+    assert d.next_action == "Help the customer pick a service."
+
+    d = engine.compute("book_appointment", {"service_id": "corte", "date": "2026-11-02"}, BOOKING_RULES)
+    assert d.current_checkpoint == "slot_booked"
+    assert d.missing_fields == ["time"]
+    assert d.progress_pct == 50
+    assert d.next_action == "Ask for the customer's time."
+
+    d = engine.compute(
+        "book_appointment", {"service_id": "corte", "date": "2026-11-02", "time": "10:00"}, BOOKING_RULES
+    )
+    assert d.all_complete
+
+
+def test_29_declared_plan_is_compiled_once_per_definition():
+    from app.services.goal_strategy import compile_goal
+
+    plan = compile_goal("book_appointment", BOOKING_RULES)
+    assert compile_goal("book_appointment", BOOKING_RULES) is plan
+    assert [cp.name for cp in plan.checkpoints] == ["service_chosen", "slot_booked"]
+
+
+def test_30_declared_goal_overrides_builtin():
+    rules = {"goals": {"close_sale": {"checkpoints": [{"name": "paid", "required_fields": ["receipt"]}]}}}
+    d = engine.compute("close_sale", {}, rules)
+    assert d.current_checkpoint == "paid"
+    assert d.missing_fields == ["receipt"]
+
+
+@pytest.mark.parametrize(
+    "goals, message",
+    [
+        ([], "must be an object"),
+        ({"g": {"checkpoints": []}}, "non-empty list"),
+        ({"g": {"checkpoints": [{"required_fields": ["x"]}]}}, "needs a 'name'"),
+        ({"g": {"checkpoints": [{"name": "a", "required_fields": []}]}}, "required_fields"),
+        ({"g": {"checkpoints": [{"name": "a", "required_fields": ["x"], "blocked_by": "b"}]}}, "blocked_by"),
+        ({"g": {"checkpoints": [{"name": "a", "required_fields": ["x"], "blocked_by": ["zzz"]}]}}, "unknown"),
+        (
+            {"g": {"checkpoints": [
+                {"name": "a", "required_fields": ["x"]},
+                {"name": "a", "required_fields": ["y"]},
+            ]}},
+            "duplicate",
+        ),
+        (
+            {"g": {"checkpoints": [
+                {"name": "a", "required_fields": ["x"], "blocked_by": ["b"]},
+                {"name": "b", "required_fields": ["y"], "blocked_by": ["a"]},
+            ]}},
+            "cycle",
+        ),
+    ],
+)
+def test_31_invalid_declarations_are_rejected(goals, message):
+    from app.services.goal_strategy import GoalDefinitionError, validate_goal_definitions
+
+    with pytest.raises(GoalDefinitionError, match=message):
+        validate_goal_definitions({"goals": goals})
+
+
+def test_32_valid_declarations_pass_validation():
+    from app.services.goal_strategy import validate_goal_definitions
+
+    validate_goal_definitions(BOOKING_RULES)
+    validate_goal_definitions({})
+    validate_goal_definitions(None)
+
+
+def test_33_invalid_declared_goal_degrades_to_unknown_directive():
+    """A definition that slipped past validation never breaks a turn."""
+    rules = {"goals": {"broken": {"checkpoints": [
+        {"name": "a", "required_fields": ["x"], "blocked_by": ["a"]},
+    ]}}}
+    d = engine.compute("broken", {}, rules)
+    assert d.current_checkpoint == "unknown"
+    assert not d.all_complete
+
+
+# ---------------------------------------------------------------------------
+# Batch evaluation
+# ---------------------------------------------------------------------------
+
+CLOSE_SALE_FIELDS = [
+    "product_id", "full_name", "phone", "shipping_address",
+    "shipping_city", "user_confirmation", "payment_confirmation",
+]
+
+
+@pytest.mark.parametrize("rules", [{}, {"skip_lead_qualification": True}])
+def test_34_batch_matches_compute_for_every_presence_pattern(rules):
+    contexts = [
+        {f: "x" for bit, f in enumerate(CLOSE_SALE_FIELDS) if pattern & (1 << bit)}
+        for pattern in range(2 ** len(CLOSE_SALE_FIELDS))
+    ]
+    batch = engine.compute_batch("close_sale", contexts, rules)
+    assert len(batch) == len(contexts)
+    for i, data in enumerate(contexts):
+        d = engine.compute("close_sale", data, rules)
+        assert batch.progress_pct[i] == d.progress_pct
+        assert batch.current_checkpoint[i] == d.current_checkpoint
+        assert list(batch.missing_fields[i]) == d.missing_fields
+        assert batch.all_complete[i] == d.all_complete
+
+
+def test_35_batch_treats_falsy_values_and_missing_context_as_absent():
+    batch = engine.compute_batch(
+        "close_sale",
+        [None, {}, {"product_id": ""}, {"product_id": "abc", "full_name": None}],
+    )
+    assert batch.current_checkpoint == ["product_matched"] * 3 + ["lead_qualified"]
+    assert batch.missing_fields[3] == ("full_name", "phone")
+
+
+def test_36_batch_of_declared_and_unknown_goals():
+    batch = engine.compute_batch("book_appointment", [{"service_id": "corte"}], BOOKING_RULES)
+    assert batch.current_checkpoint == ["slot_booked"]
+    assert batch.progress_pct == [50]
+
+    batch = engine.compute_batch("no_such_goal", [{}, {"x": 1}])
+    assert batch.current_checkpoint == ["unknown", "unknown"]
+    assert batch.missing_fields == [(), ()]
@@ -0,0 +1,266 @@
+"""Idempotency — duplicate chakra_message_ids are cheap and replay the original ack.
+
+Pure: the tenant config cache is pre-seeded so step 1 is free, and the
+session stub counts every round trip the duplicate check would cost.
+"""
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.api.v1.ingest import IngestMessageResponse
+from app.core.cache import RecentKeys, ReplayStore
+from app.models.core import Conversation
+from app.services import ingest
+from app.services.ingest import (
+    DuplicateMessageError,
+    _json_safe,
+    _turn_not_ready,
+    get_idempotency_stats,
+    ingest_message,
+    remember_message_id,
+    replay_ingest,
+)
+from app.services.tenant_config import TenantConfig, tenant_configs
+
+CLIENT_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+T0 = datetime(2026, 8, 1, tzinfo=timezone.utc)
+
+
+class _Result:
+    def __init__(self, row):
+        self._row = row
+
+    def scalar_one_or_none(self):
+        return self._row
+
+    def scalar_one(self):
+        return self._row
+
+    def one_or_none(self):
+        return self._row
+
+
+class FakeSession:
+    def __init__(self, results=()):
+        self._results = list(results)
+        self.round_trips = 0
+
+    async def execute(self, statement):
+        self.round_trips += 1
+        return _Result(self._results.pop(0))
+
+
+@pytest.fixture(autouse=True)
+def _warm_tenant_and_fresh_front(monkeypatch):
+    monkeypatch.setattr(ingest, "_seen_message_ids", RecentKeys(maxsize=3))
+    tenant_configs.clear()
+    tenant_configs.put(
+        CLIENT_ID,
+        TenantConfig(
+            id=CLIENT_ID,
+            is_active=True,
+            system_prompt_template="",
+            ai_model="gpt-4o-mini",
+            ai_temperature=Decimal("0.3"),
+            business_rules={},
+            updated_at=T0,
+        ),
+        T0,
+    )
+    yield
+    tenant_configs.clear()
+
+
+def _ingest(session, chakra_message_id):
+    return asyncio.run(
+        ingest_message(
+            session,
+            CLIENT_ID,
+            chakra_message_id=chakra_message_id,
+            content="hola",
+            phone_number="570000005678",
+        )
+    )
+
+
+# ---------------------------------------------------------------------------
+# RecentKeys
+# ---------------------------------------------------------------------------
+def test_recent_keys_evicts_the_least_recently_seen():
+    keys = RecentKeys(maxsize=2)
+    keys.add("a")
+    keys.add("b")
+    assert "a" in keys          # refreshes "a"
+    keys.add("c")               # evicts "b", not "a"
+    assert "a" in keys and "c" in keys
+    assert "b" not in keys
+    assert len(keys) == 2
+
+
+def test_recent_keys_stats():
+    keys = RecentKeys(maxsize=4)
+    keys.add("a")
+    "a" in keys
+    "z" in keys
+    assert keys.stats() == {
+        "entries": 1, "maxsize": 4, "hits": 1, "misses": 1, "hit_ratio": 0.5,
+    }
+
+
+# ---------------------------------------------------------------------------
+# ingest_message step 2
+# ---------------------------------------------------------------------------
+def test_redelivery_of_a_committed_message_costs_no_round_trip():
+    remember_message_id("wamid.1")
+    session = FakeSession()
+    with pytest.raises(DuplicateMessageError):
+        _ingest(session, "wamid.1")
+    assert session.round_trips == 0
+    assert get_idempotency_stats()["hits"] == 1
+
+
+def test_db_duplicate_is_remembered_for_the_next_retry():
+    session = FakeSession([uuid.uuid4()])  # step 2: the Message row exists
+    with pytest.raises(DuplicateMessageError):
+        _ingest(session, "wamid.2")
+    assert session.round_trips == 1
+
+    with pytest.raises(DuplicateMessageError):
+        _ingest(session, "wamid.2")
+    assert session.round_trips == 1
+
+
+def test_unseen_id_still_asks_the_db():
+    session = FakeSession([uuid.uuid4()])
+    with pytest.raises(DuplicateMessageError):
+        _ingest(session, "wamid.evicted-or-other-replica")
+    assert session.round_trips == 1
+
+
+# ---------------------------------------------------------------------------
+# ReplayStore
+# ---------------------------------------------------------------------------
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_replay_store_replays_within_ttl_only():
+    clock = FakeClock()
+    store = ReplayStore(maxsize=10, ttl_seconds=60, clock=clock)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return f"ack-{len(calls)}"
+
+    assert asyncio.run(store.run("k", compute)) == "ack-1"
+    assert asyncio.run(store.run("k", compute)) == "ack-1"
+    clock.now += 60
+    assert asyncio.run(store.run("k", compute)) == "ack-2"
+    assert store.stats()["replays"] == 1
+
+
+def test_concurrent_duplicates_single_flight_onto_the_first():
+    store = ReplayStore(maxsize=10, ttl_seconds=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "ack"
+
+    async def burst():
+        return await asyncio.gather(*(store.run("k", compute) for _ in range(5)))
+
+    assert asyncio.run(burst()) == ["ack"] * 5
+    assert len(calls) == 1
+    assert store.stats()["coalesced"] == 4
+
+
+def test_a_failed_first_attempt_is_neither_shared_nor_stored():
+    store = ReplayStore(maxsize=10, ttl_seconds=60)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("pool timeout")
+        return "ack"
+
+    async def burst():
+        return await asyncio.gather(
+            store.run("k", flaky), store.run("k", flaky), return_exceptions=True
+        )
+
+    first, second = asyncio.run(burst())
+    assert isinstance(first, RuntimeError)
+    assert second == "ack"
+    assert asyncio.run(store.run("k", flaky)) == "ack"
+    assert len(attempts) == 2
+
+
+def test_store_if_keeps_only_matching_values():
+    store = ReplayStore(maxsize=10, ttl_seconds=60)
+
+    async def compute():
+        return "skip"
+
+    asyncio.run(store.run("k", compute, store_if=lambda v: v != "skip"))
+    assert len(store) == 0
+
+
+def test_replay_store_is_bounded():
+    store = ReplayStore(maxsize=2, ttl_seconds=60)
+    for key in "abc":
+        store.put(key, key)
+    assert store.get("a") is None and len(store) == 2
+
+
+# ---------------------------------------------------------------------------
+# replay_ingest — the DB-backed fallback
+# ---------------------------------------------------------------------------
+def _conversation() -> Conversation:
+    conv = Conversation()
+    conv.id = uuid.uuid4()
+    conv.state = "active"
+    conv.strategy_version = 3
+    conv.last_message_at = T0
+    return conv
+
+
+def test_replay_returns_the_stored_ack_verbatim():
+    original = _turn_not_ready(_conversation(), ingest.TURN_PENDING)
+    stored = _json_safe(original)
+    row = SimpleNamespace(conversation_id=original["conversation_id"],
+                          new_value={"response": stored})
+    replayed = asyncio.run(replay_ingest(FakeSession([row]), CLIENT_ID, "wamid.1"))
+
+    assert replayed == stored
+    assert IngestMessageResponse(**replayed) == IngestMessageResponse(**original)
+
+
+def test_replay_rebuilds_the_ack_for_rows_without_a_stored_one():
+    conv = _conversation()
+    row = SimpleNamespace(conversation_id=conv.id, new_value={"chakra_message_id": "x"})
+    replayed = asyncio.run(replay_ingest(FakeSession([row, conv]), CLIENT_ID, "wamid.1"))
+
+    assert replayed["conversation_id"] == conv.id
+    assert replayed["reason"] == "debounce_pending"
+    assert replayed["respond_after"] is not None
+
+
+def test_replay_of_an_unknown_id_is_none():
+    assert asyncio.run(replay_ingest(FakeSession([None]), CLIENT_ID, "wamid.x")) is None
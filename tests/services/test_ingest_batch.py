@@ -0,0 +1,210 @@
+"""Batch ingest — grouping, per-group isolation, one turn per conversation.
+
+Pure: ingest_message / claim_turn_now are replaced by fakes that record the
+order they were called in; the session only hands out savepoints.
+"""
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.api.v1.ingest import IngestBatchResponse
+from app.services import ingest_batch as batch
+from app.services.ingest import ClientNotFoundError, DuplicateMessageError, UserBlockedError
+from app.services.ingest_batch import group_batch, ingest_batch
+
+CLIENT_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+T0 = datetime(2026, 8, 1, 12, 0, tzinfo=timezone.utc)
+CONV = {"CO.ana": uuid.uuid4(), "CO.bea": uuid.uuid4(), "CO.blocked": uuid.uuid4()}
+
+
+def _msg(mid, bsuid=None, phone=None, at=None, content=None):
+    return {
+        "chakra_message_id": mid,
+        "bsuid": bsuid,
+        "phone_number": phone,
+        "content": content or f"text of {mid}",
+        "display_name": None,
+        "message_type": "text",
+        "timestamp": at,
+    }
+
+
+class _Savepoint:
+    def __init__(self, log):
+        self._log = log
+
+    async def commit(self):
+        self._log.append("release")
+
+    async def rollback(self):
+        self._log.append("rollback")
+
+
+class FakeSession:
+    def __init__(self):
+        self.savepoints = []
+
+    async def begin_nested(self):
+        return _Savepoint(self.savepoints)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = {"ingested": [], "claimed": []}
+
+    async def fake_tenant(session, client_id):
+        return SimpleNamespace(is_active=client_id == CLIENT_ID)
+
+    async def fake_ingest(session, client_id, *, chakra_message_id, bsuid, **kw):
+        if chakra_message_id.startswith("dup"):
+            raise DuplicateMessageError(chakra_message_id)
+        if bsuid == "CO.blocked":
+            raise UserBlockedError("User ****cked is blocked")
+        if chakra_message_id == "boom":
+            raise RuntimeError("deadlock detected")
+        calls["ingested"].append(chakra_message_id)
+        return {
+            "should_respond": False,
+            "reason": "debounce_pending",
+            "conversation_id": CONV[bsuid],
+            "conversation_state": "active",
+            "strategy_version": 0,
+            "respond_after": T0,
+        }
+
+    async def fake_claim(session, client_id, conversation_id, content):
+        calls["claimed"].append(content)
+        return {
+            "should_respond": True,
+            "conversation_id": conversation_id,
+            "conversation_state": "active",
+            "strategy_version": 1,
+        }
+
+    async def fake_replay(session, client_id, chakra_message_id):
+        return {"should_respond": False, "conversation_id": CONV["CO.ana"],
+                "conversation_state": "active"}
+
+    monkeypatch.setattr(batch, "get_tenant_config", fake_tenant)
+    monkeypatch.setattr(batch, "ingest_message", fake_ingest)
+    monkeypatch.setattr(batch, "claim_turn_now", fake_claim)
+    monkeypatch.setattr(batch, "replay_ingest", fake_replay)
+    return calls
+
+
+def _run(messages, session=None, client_id=CLIENT_ID):
+    return asyncio.run(ingest_batch(session or FakeSession(), client_id, messages))
+
+
+# ---------------------------------------------------------------------------
+# group_batch — pure
+# ---------------------------------------------------------------------------
+def test_groups_per_customer():
+    messages = [
+        _msg("1", bsuid="CO.ana"),
+        _msg("2", phone="573001"),
+        _msg("3", bsuid="CO.ana"),
+        _msg("4", phone="573001"),
+    ]
+    assert group_batch(messages) == [[0, 2], [1, 3]]
+
+
+def test_groups_run_in_customer_key_order_whatever_the_payload_order():
+    """Two batches naming the same customers in opposite order take their
+    locks in the same order — no deadlock between overlapping flushes."""
+    messages = [
+        _msg("1", phone="573001"),
+        _msg("2", bsuid="CO.luis"),
+        _msg("3", bsuid="CO.ana"),
+        _msg("4", phone="573001"),
+    ]
+    assert group_batch(messages) == [[2], [1], [0, 3]]
+    assert group_batch(messages[::-1]) == [[1], [2], [0, 3]]
+
+
+def test_group_is_sorted_by_whatsapp_timestamp():
+    messages = [
+        _msg("late", bsuid="CO.ana", at=T0 + timedelta(seconds=9)),
+        _msg("early", bsuid="CO.ana", at=T0),
+    ]
+    assert group_batch(messages) == [[1, 0]]
+
+
+def test_group_without_every_timestamp_keeps_batch_order():
+    messages = [
+        _msg("a", bsuid="CO.ana", at=T0 + timedelta(seconds=9)),
+        _msg("b", bsuid="CO.ana"),
+    ]
+    assert group_batch(messages) == [[0, 1]]
+
+
+# ---------------------------------------------------------------------------
+# ingest_batch
+# ---------------------------------------------------------------------------
+def test_only_the_newest_message_per_conversation_gets_the_turn(calls):
+    outcomes = _run([
+        _msg("a2", bsuid="CO.ana", at=T0 + timedelta(seconds=2), content="¿tienen honey?"),
+        _msg("b1", bsuid="CO.bea", at=T0),
+        _msg("a1", bsuid="CO.ana", at=T0, content="hola"),
+    ])
+
+    assert calls["ingested"] == ["a1", "a2", "b1"]
+    assert calls["claimed"] == ["¿tienen honey?", "text of b1"]
+    by_id = {o["chakra_message_id"]: o for o in outcomes}
+    assert by_id["a2"]["response"]["should_respond"] is True
+    assert by_id["a1"]["response"]["reason"] == "debounce_superseded"
+    assert by_id["b1"]["response"]["should_respond"] is True
+    assert [o["chakra_message_id"] for o in outcomes] == ["a2", "b1", "a1"]
+
+
+def test_blocked_customer_rolls_back_only_its_group(calls):
+    session = FakeSession()
+    outcomes = _run(
+        [_msg("x1", bsuid="CO.blocked"), _msg("a1", bsuid="CO.ana")], session
+    )
+
+    assert [o["status"] for o in outcomes] == ["blocked", "accepted"]
+    assert outcomes[0]["response"] is None
+    # CO.ana runs first (key order); outcomes stay in request order.
+    assert session.savepoints[:2] == ["release", "rollback"]
+
+
+def test_unexpected_error_fails_the_group_not_the_batch(calls):
+    outcomes = _run([
+        _msg("a1", bsuid="CO.ana"),
+        _msg("boom", bsuid="CO.ana"),
+        _msg("b1", bsuid="CO.bea"),
+    ])
+
+    assert [o["status"] for o in outcomes] == ["failed", "failed", "accepted"]
+    assert "deadlock" in outcomes[0]["error"]
+    assert calls["claimed"] == ["text of b1"]
+
+
+def test_duplicate_carries_the_original_ack_and_claims_nothing(calls):
+    outcomes = _run([_msg("dup-1", bsuid="CO.ana")])
+
+    assert outcomes[0]["status"] == "duplicate"
+    assert outcomes[0]["response"]["conversation_id"] == CONV["CO.ana"]
+    assert calls["claimed"] == []
+
+
+def test_inactive_tenant_fails_the_whole_batch(calls):
+    with pytest.raises(ClientNotFoundError):
+        _run([_msg("a1", bsuid="CO.ana")], client_id=uuid.uuid4())
+
+
+def test_outcomes_fit_the_response_schema(calls):
+    outcomes = _run([
+        _msg("a1", bsuid="CO.ana"),
+        _msg("a2", bsuid="CO.ana"),
+        _msg("x1", bsuid="CO.blocked"),
+    ])
+    IngestBatchResponse(results=outcomes)
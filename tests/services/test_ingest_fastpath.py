@@ -0,0 +1,171 @@
+"""Single-round-trip ingest (migration 013) — the Python side.
+
+The SQL function itself needs Postgres; these pin what Python owns: the
+lock key the function must reproduce, decoding its answer, and how
+ingest_message maps each status (including falling back to the ORM path).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.api.v1.ingest import IngestMessageResponse
+from app.core.cache import RecentKeys
+from app.services import ingest, ingest_fastpath
+from app.services.ingest import (
+    ClientNotFoundError,
+    DuplicateMessageError,
+    UserBlockedError,
+    ingest_message,
+)
+from app.services.conversation_lock import conversation_lock_key
+from app.services.ingest_fastpath import parse_fast_result
+from app.services.tenant_config import TenantConfig, tenant_configs
+
+CLIENT_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+CONV_ID = uuid.UUID("7c9e6679-7425-40de-944b-e07fc1f90ae7")
+T0 = datetime(2026, 8, 1, tzinfo=timezone.utc)
+
+
+def _ok_payload(**overrides) -> dict:
+    response = {
+        "should_respond": False,
+        "reason": "debounce_pending",
+        "conversation_id": str(CONV_ID),
+        "conversation_state": "active",
+        "strategy_version": 2,
+        "respond_after": "2026-08-01T00:00:05+00:00",
+    }
+    response.update(overrides)
+    return {"status": "ok", "response": response}
+
+
+class _Result:
+    def __init__(self, row):
+        self._row = row
+
+    def scalar_one(self):
+        return self._row
+
+    def scalar_one_or_none(self):
+        return self._row
+
+
+class FakeSession:
+    def __init__(self, results):
+        self._results = list(results)
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return _Result(self._results.pop(0))
+
+
+@pytest.fixture(autouse=True)
+def _fast_path_on(monkeypatch):
+    monkeypatch.setattr(ingest_fastpath, "INGEST_FAST_PATH", True)
+    monkeypatch.setattr(ingest, "_seen_message_ids", RecentKeys(maxsize=10))
+    tenant_configs.clear()
+    tenant_configs.put(
+        CLIENT_ID,
+        TenantConfig(
+            id=CLIENT_ID,
+            is_active=True,
+            system_prompt_template="",
+            ai_model="gpt-4o-mini",
+            ai_temperature=Decimal("0.3"),
+            business_rules={},
+            updated_at=T0,
+        ),
+        T0,
+    )
+    yield
+    tenant_configs.clear()
+
+
+def _ingest(session, chakra_message_id="wamid.1"):
+    return asyncio.run(
+        ingest_message(
+            session,
+            CLIENT_ID,
+            chakra_message_id=chakra_message_id,
+            content="hola",
+            bsuid="CO.0000000000001234",
+        )
+    )
+
+
+# ---------------------------------------------------------------------------
+# Lock key — conversation_lock_key() in SQL takes the last 16 hex digits of
+# sha1 with the sign bit cleared; it must equal Python's sha1 mod 2^63.
+# ---------------------------------------------------------------------------
+@pytest.mark.parametrize("conversation_id", [CONV_ID, uuid.UUID(int=0), uuid.UUID(int=2**128 - 1)])
+def test_sql_lock_key_formula_matches_python(conversation_id):
+    hexdigest = hashlib.sha1(str(conversation_id).encode()).hexdigest()
+    sql_formula = int(hexdigest[-16:], 16) & (2**63 - 1)
+    assert conversation_lock_key(conversation_id) == sql_formula
+
+
+# ---------------------------------------------------------------------------
+# parse_fast_result — pure
+# ---------------------------------------------------------------------------
+def test_ok_payload_decodes_to_the_orm_ack_shape():
+    respond_after = T0 + timedelta(seconds=5)
+    status, ack = parse_fast_result(json.dumps(_ok_payload()), respond_after)
+
+    assert status == "ok"
+    assert ack["conversation_id"] == CONV_ID
+    assert ack["respond_after"] is respond_after
+    IngestMessageResponse(**ack)
+
+
+@pytest.mark.parametrize("status", ["duplicate", "blocked", "client_not_found", "fallback"])
+def test_non_ok_statuses_carry_no_ack(status):
+    assert parse_fast_result({"status": status}, T0) == (status, None)
+
+
+# ---------------------------------------------------------------------------
+# ingest_message with INGEST_FAST_PATH on
+# ---------------------------------------------------------------------------
+def test_fast_path_is_one_round_trip():
+    session = FakeSession([json.dumps(_ok_payload())])
+    ack = _ingest(session)
+
+    assert len(session.statements) == 1
+    assert "ingest_message_fast" in str(session.statements[0])
+    assert ack["conversation_id"] == CONV_ID
+
+
+def test_fast_path_duplicate_is_remembered():
+    session = FakeSession([{"status": "duplicate"}])
+    with pytest.raises(DuplicateMessageError):
+        _ingest(session)
+    with pytest.raises(DuplicateMessageError):
+        _ingest(session)  # second time: in-memory, no round trip
+    assert len(session.statements) == 1
+
+
+@pytest.mark.parametrize(
+    "status,error",
+    [("blocked", UserBlockedError), ("client_not_found", ClientNotFoundError)],
+)
+def test_fast_path_failures_raise_the_orm_exceptions(status, error):
+    with pytest.raises(error):
+        _ingest(FakeSession([{"status": status}]))
+
+
+def test_fallback_continues_down_the_orm_path():
+    # fallback → ORM step 2 finds the row (stands in for "ORM path ran").
+    session = FakeSession([{"status": "fallback"}, uuid.uuid4()])
+    with pytest.raises(DuplicateMessageError):
+        _ingest(session)
+    assert len(session.statements) == 2
+    assert "ingest_message_fast" not in str(session.statements[1])
@@ -0,0 +1,114 @@
+"""Key Vault secret store — concurrent reads, cache, background refresh and
+password rotation on new connections.
+
+Pure: the vault is a fake reader injected into SecretStore; the engine is
+created but never connects.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.core import database, keyvault
+from app.core.keyvault import SecretStore
+
+
+class FakeVault:
+    def __init__(self, values, delay=0.0):
+        self.values = dict(values)
+        self.delay = delay
+        self.reads = []
+        self.failing = set()
+        self._lock = threading.Lock()
+        self.in_flight = self.peak = 0
+
+    def __call__(self, name):
+        with self._lock:
+            self.reads.append(name)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if name in self.failing:
+                raise ConnectionError("vault unreachable")
+            return self.values[name]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_get_many_reads_concurrently_and_caches():
+    vault = FakeVault({"a": "1", "b": "2", "c": "3"}, delay=0.05)
+    store = SecretStore("https://kv.invalid/", fetch=vault)
+
+    started = time.perf_counter()
+    assert asyncio.run(store.get_many(["a", "b", "c"])) == {"a": "1", "b": "2", "c": "3"}
+    assert time.perf_counter() - started < 0.12  # ~one read, not three
+    assert vault.peak == 3
+
+    assert asyncio.run(store.get("b")) == "2"
+    assert sorted(vault.reads) == ["a", "b", "c"]  # served from the cache
+
+
+def test_refresh_reports_rotations_and_keeps_values_on_failure():
+    vault = FakeVault({"DBPASSWORD": "old", "openai-key": "sk-1"})
+    store = SecretStore("https://kv.invalid/", fetch=vault)
+    asyncio.run(store.get_many(["DBPASSWORD", "openai-key"]))
+
+    vault.values["DBPASSWORD"] = "new"
+    vault.failing.add("openai-key")
+    assert asyncio.run(store.refresh()) == {"DBPASSWORD"}
+    assert store.cached("DBPASSWORD") == "new"
+    assert store.cached("openai-key") == "sk-1"
+
+
+def test_refresher_runs_until_stopped_and_reports_changes():
+    vault = FakeVault({"openai-key": "sk-1"})
+    store = SecretStore("https://kv.invalid/", fetch=vault)
+    seen = []
+
+    async def on_change(changed):
+        seen.append(changed)
+
+    async def go():
+        await store.get("openai-key")
+        stop = asyncio.Event()
+        task = asyncio.create_task(store.run_refresher(stop, interval=0.01, on_change=on_change))
+        vault.values["openai-key"] = "sk-2"
+        await asyncio.sleep(0.05)
+        stop.set()
+        await asyncio.wait_for(task, timeout=1)
+
+    asyncio.run(go())
+    assert seen == [{"openai-key"}]
+
+
+def test_engine_is_deferred_and_new_connections_take_the_rotated_password(monkeypatch):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setenv("KEY_VAULT_URL", "https://kv.invalid/")
+    vault = FakeVault({"DBUSERNAME": "app", "DBPASSWORD": "old", "DBHOST": "db", "DBNAME": "sales"})
+    store = SecretStore("https://kv.invalid/", fetch=vault)
+    keyvault.set_secret_store(store)
+    monkeypatch.setattr(database, "engine", None)
+
+    async def go():
+        engine = await database.init_engine()
+        assert await database.init_engine() is engine  # once
+        vault.values["DBPASSWORD"] = "rotated"
+        await store.refresh()
+        cparams = {"password": "old"}
+        for listener in engine.sync_engine.dialect.dispatch.do_connect:
+            listener(engine.dialect, None, [], cparams)
+        await database.dispose_engine()
+        return engine, cparams
+
+    try:
+        engine, cparams = asyncio.run(go())
+    finally:
+        keyvault.set_secret_store(None)
+    assert engine.url.host == "db"
+    assert cparams["password"] == "rotated"
+    assert database.engine is None
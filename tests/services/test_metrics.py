@@ -0,0 +1,90 @@
+"""Metric families and the Prometheus text rendering behind GET /metrics.
+
+Pure: a private Registry per test, no app.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.core.metrics import CACHE_COUNTERS, Registry
+
+
+def test_counter_per_label_tuple():
+    registry = Registry()
+    skips = registry.counter("t_skips_total", "Skips.", ("reason",))
+    skips.inc("debounce_pending")
+    skips.inc("debounce_pending")
+    skips.inc("already_claimed")
+
+    out = registry.render()
+    assert "# TYPE t_skips_total counter" in out
+    assert 't_skips_total{reason="debounce_pending"} 2' in out
+    assert 't_skips_total{reason="already_claimed"} 1' in out
+
+
+def test_gauge_goes_up_and_down():
+    registry = Registry()
+    in_flight = registry.gauge("t_in_flight", "In flight.", ("route",))
+    in_flight.inc("/turn")
+    in_flight.inc("/turn")
+    in_flight.dec("/turn")
+    assert in_flight.value("/turn") == 1
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    registry = Registry()
+    latency = registry.histogram("t_ms", "Latency.", ("route",), bounds=(10, 100))
+    for value in (5, 50, 500):
+        latency.observe(value, "/turn")
+
+    out = registry.render()
+    assert 't_ms_bucket{route="/turn",le="10"} 1' in out
+    assert 't_ms_bucket{route="/turn",le="100"} 2' in out
+    assert 't_ms_bucket{route="/turn",le="+Inf"} 3' in out
+    assert 't_ms_sum{route="/turn"} 555' in out
+    assert 't_ms_count{route="/turn"} 3' in out
+
+
+def test_registering_twice_returns_the_same_family():
+    registry = Registry()
+    first = registry.counter("t_total", "Once.")
+    assert registry.counter("t_total", "Once.") is first
+
+
+def test_stats_sources_sharing_a_prefix_get_one_type_line():
+    registry = Registry()
+    registry.register_stats("t_cache", "cache", lambda: {"tenant": {"hits": 3, "hit_ratio": 0.75}})
+    registry.register_stats("t_cache", "cache", lambda: {"catalog": {"hits": 1, "note": "x"}})
+
+    out = registry.render()
+    assert out.count("# TYPE t_cache_hits gauge") == 1
+    assert 't_cache_hits{cache="tenant"} 3' in out
+    assert 't_cache_hits{cache="catalog"} 1' in out
+    assert 't_cache_hit_ratio{cache="tenant"} 0.75' in out
+    assert "note" not in out  # non-numeric stats are skipped
+
+
+def test_monotonic_stats_are_exported_as_counters():
+    registry = Registry()
+    registry.register_stats(
+        "t_cache", "cache", lambda: {"tenant": {"hits": 3, "entries": 7, "hit_ratio": 0.75}},
+        CACHE_COUNTERS,
+    )
+    registry.register_stats("t_cache", "cache", lambda: {"catalog": {"hits": 1}}, CACHE_COUNTERS)
+
+    out = registry.render()
+    assert out.count("# TYPE t_cache_hits_total counter") == 1
+    assert 't_cache_hits_total{cache="tenant"} 3' in out
+    assert 't_cache_hits_total{cache="catalog"} 1' in out
+    assert "t_cache_hits{" not in out
+    # Sizes and ratios go up and down: still gauges.
+    assert "# TYPE t_cache_entries gauge" in out
+    assert "# TYPE t_cache_hit_ratio gauge" in out
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    errors = registry.counter("t_errors_total", "Errors.", ("error",))
+    errors.inc('say "hi"\\now')
+    assert 't_errors_total{error="say \\"hi\\"\\\\now"} 1' in registry.render()
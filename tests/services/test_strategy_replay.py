@@ -0,0 +1,153 @@
+"""Strategy replay — per-turn outcomes, diff aggregation, chunked streaming.
+
+Pure: conversations are lists of extracted_data dicts / JSON texts; the
+streaming test feeds rows through a stub session instead of Postgres.
+"""
+import asyncio
+import json
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.services.strategy_replay import (
+    ConversationTurns,
+    ReplayReport,
+    ReplayRules,
+    replay_chunk,
+    replay_conversation,
+    stream_chunks,
+)
+
+CLIENT_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
+# A sale where the LLM proposes user_confirmation before it has the address.
+TURNS = [
+    {"product_id": "p1"},
+    {"full_name": "Ana", "phone": "3001234567"},
+    {"shipping_city": "Cali", "user_confirmation": True},
+    {"shipping_address": "Calle 5", "user_confirmation": True},
+]
+
+RELAXED = ReplayRules.from_json(
+    {"user_confirmation_requires": ["full_name", "phone", "shipping_city"]}
+)
+
+
+def test_baseline_replay_threads_context_through_turns():
+    outcomes = replay_conversation(TURNS, ReplayRules(), {})
+    assert [o.checkpoint for o in outcomes] == [
+        "lead_qualified", "shipping_info_collected", "shipping_info_collected", "payment_confirmed",
+    ]
+    assert "user_confirmation" in outcomes[2].rejected
+    assert [o.user_confirmed for o in outcomes] == [False, False, False, True]
+    assert not any(o.all_complete for o in outcomes)
+
+
+def test_relaxed_gate_is_reported_as_diff():
+    report = ReplayReport()
+    conversation_id = uuid.uuid4()
+    report.add(
+        conversation_id,
+        replay_conversation(TURNS, ReplayRules(), {}),
+        replay_conversation(TURNS, RELAXED, {}),
+    )
+    assert report.turns == 4
+    assert report.turns_changed == 2  # turn 3 accepts it; turn 4 no longer "first"
+    assert report.fields_gained["user_confirmation"] == 1
+    assert report.rejections_removed["user_confirmation"] == 1
+    assert report.confirmation_notices == {"candidate": 1, "baseline": 1}
+    assert report.conversations_changed == 1
+    assert report.examples["accepted"] == [str(conversation_id)]
+
+
+def test_business_rule_candidate_moves_checkpoints_and_escalation():
+    turns = [*TURNS, {"payment_confirmation": True}]
+    declared = ReplayRules.from_json({
+        "business_rules": {"goals": {"close_sale": {"checkpoints": [
+            {"name": "product_matched", "required_fields": ["product_id"]},
+            {"name": "user_confirmed", "required_fields": ["user_confirmation"],
+             "blocked_by": ["product_matched"]},
+        ]}}}
+    })
+    report = ReplayReport()
+    report.add("c1", replay_conversation(turns, ReplayRules(), {}), replay_conversation(turns, declared, {}))
+    assert report.checkpoint_moves["lead_qualified → user_confirmed"] == 1
+    # The two-step DAG completes on the confirming turn; close_sale never does
+    # (payment_confirmation is operator-only and dropped).
+    assert report.escalation == {"gained": 1}
+
+
+def test_identical_rules_produce_no_diff():
+    report = replay_chunk(
+        [ConversationTurns(uuid.uuid4(), CLIENT_ID, None, [json.dumps(t) for t in TURNS])],
+        rules_by_client={CLIENT_ID: {}},
+        baseline=ReplayRules(),
+        candidate=ReplayRules(),
+    )
+    assert (report.conversations, report.turns, report.turns_changed) == (1, 4, 0)
+    assert "0 turns / 0 conversations change" in report.format()
+
+
+def test_chunk_skips_unreadable_turns_and_uses_tenant_rules():
+    chunk = [ConversationTurns(uuid.uuid4(), CLIENT_ID, None, [None, "not json", "[1]", '{"product_id": "p"}'])]
+    report = replay_chunk(
+        chunk,
+        rules_by_client={CLIENT_ID: {"skip_lead_qualification": True}},
+        baseline=ReplayRules(),
+        candidate=ReplayRules.from_json({"business_rules": {"skip_lead_qualification": False}}),
+    )
+    assert report.unreadable_turns == 2
+    assert report.turns == 4
+    assert report.checkpoint_moves["shipping_info_collected → lead_qualified"] == 1
+
+
+def test_reports_merge():
+    a, b = ReplayReport(), ReplayReport()
+    a.add("c1", replay_conversation(TURNS, ReplayRules(), {}), replay_conversation(TURNS, RELAXED, {}))
+    b.add("c2", replay_conversation(TURNS, ReplayRules(), {}), replay_conversation(TURNS, RELAXED, {}))
+    a.merge(b)
+    assert a.conversations == 2
+    assert a.fields_gained["user_confirmation"] == 2
+    assert a.examples["accepted"] == ["c1", "c2"]
+    assert json.dumps(a.to_dict())
+
+
+class _StubStream:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __aiter__(self):
+        return self._gen()
+
+    async def _gen(self):
+        for row in self.rows:
+            yield row
+
+
+class _StubSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def stream(self, stmt):
+        self.statements.append(stmt)
+        return _StubStream(self.rows)
+
+
+def test_stream_chunks_never_split_a_conversation():
+    ids = [uuid.uuid4() for _ in range(4)]
+    rows = [(ids[0], CLIENT_ID, None, "{}")] * 3 + [(ids[1], CLIENT_ID, None, "{}")] * 2 \
+        + [(ids[2], CLIENT_ID, "close_sale", "{}")] + [(ids[3], CLIENT_ID, None, "{}")] * 4
+    session = _StubSession(rows)
+
+    async def collect():
+        return [chunk async for chunk in stream_chunks(session, chunk_rows=4)]
+
+    chunks = asyncio.run(collect())
+    assert [[len(c.extracted_data) for c in chunk] for chunk in chunks] == [[3, 2], [1, 4]]
+    assert chunks[1][0].active_goal == "close_sale"
+    sql = str(session.statements[0])
+    assert "CAST(messages.extracted_data AS TEXT)" in sql
+    assert "ORDER BY messages.conversation_id" in sql
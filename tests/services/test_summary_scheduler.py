@@ -0,0 +1,114 @@
+"""FairScheduler — global cap, per-tenant weighted fair dequeueing,
+cancellation and queue-depth bookkeeping.
+
+Pure asyncio: the "summaries" are coroutines that record their start order.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.core.metrics import REGISTRY
+from app.services.summary_scheduler import FairScheduler, parse_weights
+
+
+async def _run_all(scheduler, tenants):
+    """Queue one run per entry of ``tenants`` (in order) behind a blocker and
+    return the tenants in the order they got a slot."""
+    order = []
+    gate = asyncio.Event()
+
+    async def blocker():
+        async with scheduler.slot("blocker"):
+            await gate.wait()
+
+    async def job(tenant):
+        async with scheduler.slot(tenant):
+            order.append(tenant)
+            await asyncio.sleep(0)
+
+    blocking = [asyncio.create_task(blocker()) for _ in range(scheduler.max_concurrency)]
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(job(t)) for t in tenants]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(*blocking, *tasks)
+    return order
+
+
+def test_a_backlog_does_not_starve_a_newcomer():
+    scheduler = FairScheduler(max_concurrency=1)
+    order = asyncio.run(_run_all(scheduler, ["big"] * 6 + ["small"] * 2))
+    # "small" queued last but alternates with "big" instead of waiting for it.
+    assert order[:4] == ["big", "small", "big", "small"]
+    assert order.count("big") == 6
+
+
+def test_weights_share_slots_proportionally():
+    scheduler = FairScheduler(max_concurrency=1, weights={"gold": 2})
+    order = asyncio.run(_run_all(scheduler, ["plain"] * 6 + ["gold"] * 6))
+    assert order[:6].count("gold") == 4 and order[:6].count("plain") == 2
+
+
+def test_cap_bounds_runs_in_flight():
+    scheduler = FairScheduler(max_concurrency=2)
+    peak = 0
+
+    async def job(tenant):
+        nonlocal peak
+        async with scheduler.slot(tenant):
+            peak = max(peak, scheduler.running)
+            await asyncio.sleep(0.001)
+
+    async def go():
+        await asyncio.gather(*(job(f"t{k % 3}") for k in range(9)))
+
+    asyncio.run(go())
+    assert peak == 2
+    assert scheduler.running == 0 and scheduler.depth() == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    scheduler = FairScheduler(max_concurrency=1)
+
+    async def go():
+        gate = asyncio.Event()
+        order = []
+
+        async def hold():
+            async with scheduler.slot("a"):
+                await gate.wait()
+
+        async def job(tenant):
+            async with scheduler.slot(tenant):
+                order.append(tenant)
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        doomed = asyncio.create_task(job("b"))
+        waiting = asyncio.create_task(job("c"))
+        await asyncio.sleep(0)
+        assert scheduler.depth() == 2
+        doomed.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.depth("b") == 0
+        gate.set()
+        await asyncio.gather(holder, waiting)
+        return order
+
+    assert asyncio.run(go()) == ["c"]
+    assert scheduler.running == 0
+
+
+def test_queue_depth_is_exported_per_tenant():
+    scheduler = FairScheduler(max_concurrency=1)
+    asyncio.run(_run_all(scheduler, ["t-metrics"] * 2))
+    text = REGISTRY.render()
+    assert 'sales_ai_summarizer_queue_depth{tenant="t-metrics"} 0' in text
+    assert 'sales_ai_summarizer_queue_wait_ms_count{tenant="t-metrics"} 2' in text
+    assert "sales_ai_summarizer_in_flight 0" in text
+
+
+def test_parse_weights_ignores_malformed_entries():
+    assert parse_weights("a=2, b=0.5,c=x,d=-1,=3,") == {"a": 2.0, "b": 0.5}
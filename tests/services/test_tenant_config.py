@@ -0,0 +1,159 @@
+"""Tests for the tenant configuration cache.
+
+Pure: the session is a stub that replays canned answers and counts round
+trips; the clock is injected so TTL expiry needs no sleeping.
+"""
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.core.cache import VersionedTTLCache
+from app.models.core import Client
+from app.services import tenant_config
+from app.services.tenant_config import (
+    get_tenant_cache_stats,
+    get_tenant_config,
+    invalidate_tenant_config,
+)
+
+CLIENT_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+V1 = datetime(2026, 8, 1, tzinfo=timezone.utc)
+V2 = V1 + timedelta(days=3)
+
+
+class _Result:
+    def __init__(self, row):
+        self._row = row
+
+    def scalar_one_or_none(self):
+        return self._row
+
+
+class FakeSession:
+    def __init__(self, results):
+        self._results = list(results)
+        self.round_trips = 0
+
+    async def execute(self, statement):
+        self.round_trips += 1
+        return _Result(self._results.pop(0))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _client(updated_at=V1, rules=None, is_active=True) -> Client:
+    c = Client()
+    c.id = CLIENT_ID
+    c.is_active = is_active
+    c.system_prompt_template = "Eres Sebastian…"
+    c.ai_model = "gpt-4o-mini"
+    c.ai_temperature = Decimal("0.30")
+    c.business_rules = rules if rules is not None else {"currency": "COP"}
+    c.updated_at = updated_at
+    return c
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(
+        tenant_config, "tenant_configs", VersionedTTLCache(ttl_seconds=60, clock=clock)
+    )
+    return clock
+
+
+def _get(session):
+    return asyncio.run(get_tenant_config(session, CLIENT_ID))
+
+
+def test_first_read_loads_then_hits_without_round_trips(clock):
+    session = FakeSession([_client()])
+    first = _get(session)
+    second = _get(session)
+
+    assert first is second
+    assert first.business_rules == {"currency": "COP"}
+    assert session.round_trips == 1
+    stats = get_tenant_cache_stats()
+    assert (stats["misses"], stats["hits"]) == (1, 1)
+
+
+def test_expired_entry_with_same_version_is_revalidated_not_reloaded(clock):
+    session = FakeSession([_client(), V1])
+    first = _get(session)
+    clock.now += 61
+    second = _get(session)
+
+    assert second is first
+    assert session.round_trips == 2  # the load + one tiny probe
+    assert get_tenant_cache_stats()["revalidations"] == 1
+
+
+def test_expired_entry_with_new_updated_at_reloads(clock):
+    session = FakeSession([_client(), V2, _client(V2, {"currency": "USD"})])
+    _get(session)
+    clock.now += 61
+    fresh = _get(session)
+
+    assert fresh.business_rules == {"currency": "USD"}
+    assert fresh.updated_at == V2
+    assert get_tenant_cache_stats()["misses"] == 2
+
+
+def test_deleted_client_is_dropped_and_absence_is_not_cached(clock):
+    session = FakeSession([_client(), None, None, None])
+    _get(session)
+    clock.now += 61
+    assert _get(session) is None  # probe → gone, reload → gone
+    assert _get(session) is None  # not cached: asks again
+    assert session.round_trips == 4
+
+
+def test_inactive_client_is_returned_for_the_caller_to_judge(clock):
+    config = _get(FakeSession([_client(is_active=False)]))
+    assert config is not None and config.is_active is False
+
+
+def test_invalidate_forces_reload(clock):
+    session = FakeSession([_client(), _client(V2)])
+    _get(session)
+    invalidate_tenant_config(CLIENT_ID)
+    assert _get(session).updated_at == V2
+    assert session.round_trips == 2
+
+
+def test_invalidate_with_older_version_keeps_the_newer_entry(clock):
+    session = FakeSession([_client(V2)])
+    _get(session)
+    invalidate_tenant_config(CLIENT_ID, updated_at=V1)  # late, out-of-order
+    _get(session)
+    assert session.round_trips == 1
+    assert get_tenant_cache_stats()["invalidations"] == 0
+
+
+def test_config_snapshot_is_immutable(clock):
+    config = _get(FakeSession([_client()]))
+    with pytest.raises(AttributeError):
+        config.ai_model = "gpt-4o"
+
+
+def test_hit_ratio_counts_revalidations_as_hits(clock):
+    session = FakeSession([_client(), V1])
+    _get(session)           # miss
+    _get(session)           # hit
+    clock.now += 61
+    _get(session)           # revalidation
+    assert get_tenant_cache_stats()["hit_ratio"] == pytest.approx(2 / 3)
@@ -0,0 +1,125 @@
+"""Stage timing — Server-Timing / log fields per request, histograms per stage.
+
+Pure: stages wrap sleeps; no app, no database.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../sales_agent_api"))
+
+from app.core.metrics import Histogram
+from app.core.timing import (
+    StageTimer,
+    bind_timer,
+    current_timer,
+    get_stage_stats,
+    stage,
+    unbind_timer,
+)
+
+
+def _timed(coro_fn):
+    """Run ``coro_fn`` with a fresh timer bound, like the middleware does."""
+    timer = StageTimer()
+
+    async def run():
+        token = bind_timer(timer)
+        try:
+            await coro_fn()
+        finally:
+            unbind_timer(token)
+
+    asyncio.run(run())
+    return timer
+
+
+def test_stages_land_in_the_bound_timer_in_order():
+    async def request():
+        with stage("t.lock"):
+            await asyncio.sleep(0.01)
+        with stage("t.persist"):
+            pass
+
+    timer = _timed(request)
+    stages = timer.stages()
+    assert list(stages) == ["t.lock", "t.persist"]
+    assert stages["t.lock"] >= 10
+    assert current_timer() is None
+
+
+def test_repeated_stage_is_summed():
+    async def request():
+        for _ in range(3):
+            with stage("t.repeat"):
+                await asyncio.sleep(0.005)
+
+    assert _timed(request).stages()["t.repeat"] >= 15
+
+
+def test_overlapped_reads_report_into_the_same_timer():
+    async def read(name):
+        with stage(name):
+            await asyncio.sleep(0.01)
+
+    async def request():
+        await asyncio.gather(read("t.catalog"), read("t.recent"))
+
+    assert set(_timed(request).stages()) == {"t.catalog", "t.recent"}
+
+
+def test_a_stage_that_raises_is_still_recorded():
+    async def request():
+        with pytest.raises(RuntimeError):
+            with stage("t.boom"):
+                raise RuntimeError("lock timeout")
+
+    assert "t.boom" in _timed(request).stages()
+    assert get_stage_stats()["t.boom"]["count"] >= 1
+
+
+def test_server_timing_and_log_fields():
+    timer = StageTimer()
+    timer.record("lock", 4.04)
+    timer.record("catalog", 12.0)
+
+    header = timer.server_timing()
+    assert header.startswith("lock;dur=4.0, catalog;dur=12.0, total;dur=")
+    fields = timer.log_fields()
+    assert fields["lock_ms"] == 4.0 and fields["catalog_ms"] == 12.0
+    assert "total_ms" in fields
+
+
+def test_without_a_timer_stages_only_feed_the_histograms():
+    before = get_stage_stats().get("t.unbound", {"count": 0})["count"]
+    with stage("t.unbound"):
+        pass
+    assert get_stage_stats()["t.unbound"]["count"] == before + 1
+
+
+# ---------------------------------------------------------------------------
+# Histogram
+# ---------------------------------------------------------------------------
+def test_histogram_buckets_are_cumulative():
+    h = Histogram(bounds=(10, 100))
+    for value in (1, 10, 50, 500):
+        h.observe(value)
+    assert h.cumulative() == [(10, 2), (100, 3), (float("inf"), 4)]
+    assert h.count == 4 and h.sum == 561
+
+
+def test_histogram_quantiles_separate_fast_from_slow():
+    h = Histogram()
+    for _ in range(95):
+        h.observe(3)
+    for _ in range(5):
+        h.observe(400)
+    snap = h.snapshot()
+    assert 2.5 <= snap["p50"] <= 5
+    assert 250 <= snap["p99"] <= 500
+
+
+def test_empty_histogram_has_no_quantile():
+    assert Histogram().quantile(0.5) is None
@@ -209,3 +209,157 @@ def test_operator_endpoint_500_when_token_unconfigured(monkeypatch):
         assert response.status_code == 500
 
     asyncio.run(_run())
+
+
+def test_responses_carry_server_timing(monkeypatch):
+    """Every response — even a rejected one — reports its total duration."""
+    from httpx import AsyncClient
+    from httpx._transports.asgi import ASGITransport
+
+    application = _reload_app(monkeypatch)
+
+    async def _run():
+        async with AsyncClient(
+            transport=ASGITransport(app=application), base_url="http://test"
+        ) as client:
+            ok = await client.get("/health")
+            rejected = await client.post("/api/v1/ingest/message", json={})
+        assert ok.headers["Server-Timing"].startswith("total;dur=")
+        assert rejected.status_code == 401
+        assert "total;dur=" in rejected.headers["Server-Timing"]
+
+    asyncio.run(_run())
+
+
+def test_metrics_is_public_and_counts_requests_per_route(monkeypatch):
+    """GET /metrics needs no auth and reports route templates, not raw URLs."""
+    from httpx import AsyncClient
+    from httpx._transports.asgi import ASGITransport
+
+    application = _reload_app(monkeypatch)
+    from app.core.database import dispose_engine, init_engine
+
+    async def _run():
+        # ASGITransport skips the lifespan, which is what creates the engine.
+        await init_engine()
+        async with AsyncClient(
+            transport=ASGITransport(app=application), base_url="http://test"
+        ) as client:
+            await client.get("/health")
+            await client.get("/no-such-page")
+            response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert 'sales_ai_http_requests_total{method="GET",route="/health",status="200"} 1' in body
+        assert 'route="unmatched",status="401"' in body  # auth runs before routing
+        assert "/no-such-page" not in body
+        assert "# TYPE sales_ai_db_pool_checkout_ms histogram" in body
+        assert 'sales_ai_db_pool_size{pool="default"} 5' in body
+        await dispose_engine()
+
+    asyncio.run(_run())
+
+
+def test_import_resolves_no_secrets_and_builds_no_engine(monkeypatch):
+    """Startup work is deferred to the lifespan: importing the app with only
+    KEY_VAULT_URL set must not reach the vault nor create the engine."""
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setenv("KEY_VAULT_URL", "https://unreachable.vault.invalid/")
+    for mod in list(sys.modules.keys()):
+        if mod.startswith("app"):
+            del sys.modules[mod]
+
+    from app.core import database
+    from app.main import app  # noqa: F401
+
+    assert database.engine is None
+
+
+def test_startup_reads_vault_secrets_concurrently(monkeypatch):
+    """Four DB secrets + the OpenAI key: one round of concurrent reads, then
+    the engine is created with them."""
+    import threading
+    import time
+
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setenv("OPENAI_API_KEY", "")  # restored after the startup writes it
+    monkeypatch.setenv("KEY_VAULT_URL", "https://bench.vault.invalid/")
+    monkeypatch.setenv("SALES_AI_SERVICE_TOKEN", "test-token-ci")
+    for mod in list(sys.modules.keys()):
+        if mod.startswith("app"):
+            del sys.modules[mod]
+
+    from app.core import database, keyvault
+    from app import main
+
+    reading = 0
+    peak = 0
+    lock = threading.Lock()
+    values = {"DBUSERNAME": "u", "DBPASSWORD": "p", "DBHOST": "db", "DBNAME": "sales",
+              "openai-key": "sk-test"}
+
+    def slow_read(name):
+        nonlocal reading, peak
+        with lock:
+            reading += 1
+            peak = max(peak, reading)
+        time.sleep(0.05)
+        with lock:
+            reading -= 1
+        return values[name]
+
+    keyvault.set_secret_store(keyvault.SecretStore("https://bench.vault.invalid/", fetch=slow_read))
+
+    async def _run():
+        elapsed_ms = await main.startup()
+        url = database.get_engine().url
+        await database.dispose_engine()
+        return elapsed_ms, url
+
+    elapsed_ms, url = asyncio.run(_run())
+    assert peak == 5  # every read in flight at once
+    assert elapsed_ms < 5 * 50  # not the sum of five round trips
+    assert (url.username, url.host, url.database) == ("u", "db", "sales")
+    assert os.environ["OPENAI_API_KEY"] == "sk-test"
+    keyvault.set_secret_store(None)
+
+
+def test_openai_key_rotation_does_not_stall_the_refresher(monkeypatch):
+    """The rotated key swaps the summarizer at once; the old client's grace
+    period runs in the background, not inside the refresher's callback."""
+    import time
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-old")
+    monkeypatch.setenv("KEY_VAULT_URL", "https://bench.vault.invalid/")
+    monkeypatch.setenv("SALES_AI_SERVICE_TOKEN", "test-token-ci")
+    for mod in list(sys.modules.keys()):
+        if mod.startswith("app"):
+            del sys.modules[mod]
+
+    from app.core import keyvault
+    from app import main
+    from app.services import conversation_summary
+
+    store = keyvault.SecretStore("https://bench.vault.invalid/", fetch=lambda name: "sk-new")
+    keyvault.set_secret_store(store)
+    old = conversation_summary.get_default_summarizer()
+
+    async def _run():
+        await store.get("openai-key")
+        started = time.perf_counter()
+        await main._on_secrets_rotated({"openai-key"})
+        elapsed = time.perf_counter() - started
+        swapped = conversation_summary.get_default_summarizer() is not old
+        retiring = len(conversation_summary._retiring)
+        await conversation_summary.close_default_summarizer()  # lifespan shutdown
+        return elapsed, swapped, retiring
+
+    try:
+        elapsed, swapped, retiring = asyncio.run(_run())
+    finally:
+        keyvault.set_secret_store(None)
+    assert elapsed < 1
+    assert swapped and retiring == 1
+    assert os.environ["OPENAI_API_KEY"] == "sk-new"
+    assert not conversation_summary._retiring